@@ -0,0 +1,168 @@
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import stat
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR_NAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Fingerprinted files never change under the same name
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Only text assets are worth precompressing
+COMPRESSIBLE_EXTENSIONS = {".js", ".css", ".svg", ".json", ".html", ".txt"}
+
+# Preferred first
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def fingerprinted_name(file_name: str, content: bytes) -> str:
+    """main.js -> main.<content hash>.js"""
+    stem, ext = os.path.splitext(file_name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+def build_assets(static_dir: str = STATIC_DIR) -> dict:
+    """
+    Copies each top-level static file into static/dist/ under a content-hashed name, writes
+    .gz (and .br, when the brotli package is installed) siblings for text assets, and writes
+    the name -> hashed path manifest used by asset_url(). Older builds are left in place so
+    pages rendered before a deploy can still load their assets.
+    """
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        logger.warning("brotli not installed, writing .gz variants only (pip install brotli)")
+
+    dist_dir = os.path.join(static_dir, DIST_DIR_NAME)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    manifest = {}
+    for entry in sorted(os.scandir(static_dir), key=lambda e: e.name):
+        if not entry.is_file() or entry.name.startswith("."):
+            continue
+        with open(entry.path, "rb") as f:
+            content = f.read()
+
+        hashed_name = fingerprinted_name(entry.name, content)
+        outputs = {hashed_name: content}
+        if os.path.splitext(entry.name)[1] in COMPRESSIBLE_EXTENSIONS:
+            # mtime=0 keeps the .gz byte-identical across builds
+            outputs[hashed_name + ".gz"] = gzip.compress(content, compresslevel=9, mtime=0)
+            if brotli is not None:
+                outputs[hashed_name + ".br"] = brotli.compress(content, quality=11)
+
+        for name, data in outputs.items():
+            path = os.path.join(dist_dir, name)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        manifest[entry.name] = f"{DIST_DIR_NAME}/{hashed_name}"
+        logger.info("%s -> %s (%d file(s))", entry.name, manifest[entry.name], len(outputs))
+
+    # Written last, so a worker never sees a manifest pointing at files that don't exist yet
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+_manifest = None
+
+def load_manifest(static_dir: str = STATIC_DIR) -> dict:
+    """Reads dist/manifest.json once per worker. Empty (unhashed names) when assets haven't been built."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(static_dir, DIST_DIR_NAME, MANIFEST_NAME)) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            logger.warning("No static asset manifest, serving unhashed files (run: python -m backend.assets)")
+            _manifest = {}
+    return _manifest
+
+def asset_url(file_name: str) -> str:
+    """Jinja helper: URL of the fingerprinted build of a static file, or the plain file in development"""
+    return f"/static/{load_manifest().get(file_name, file_name)}"
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves fingerprinted dist/ files as immutable, picking the .br/.gz
+    sibling written by build_assets() when the client accepts it.
+    """
+
+    async def get_response(self, path: str, scope) -> FileResponse:
+        if not path.startswith(DIST_DIR_NAME + os.sep):
+            return await super().get_response(path, scope)
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accept_encoding:
+                continue
+            full_path, stat_result = await run_in_threadpool(self.lookup_path, path + suffix)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding}
+                )
+                break
+        else:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+class DynamicGZipMiddleware(GZipMiddleware):
+    """
+    GZip for dynamically rendered HTML/JSON. Static assets are precompressed at build time,
+    and audio is already compressed (and gzipping it would break Range requests). A strong ETag
+    on a compressed response is made weak: it was computed over the identity bytes, and the two
+    encodings must not share a strong validator.
+    """
+
+    def __init__(self, app, skip_prefixes=("/static", "/audio"), **kwargs):
+        super().__init__(app, **kwargs)
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == "gzip":
+                    headers["etag"] = "W/" + etag
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_weak_etag)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress backend/static assets into static/dist/")
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    args = parser.parse_args()
+
+    from backend.logs import configure_logging
+    configure_logging(name="")
+    built = build_assets(args.static_dir)
+    print(f"Built {len(built)} asset(s) into {os.path.join(args.static_dir, DIST_DIR_NAME)}")
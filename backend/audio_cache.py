@@ -0,0 +1,138 @@
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from backend.telemetry import record_cache
+
+logger = logging.getLogger(__name__)
+
+class AudioDiskCache:
+    """
+    Size-bounded local disk cache of podcast MP3s, shared by all workers on the box.
+    Files are written atomically (temp file + rename) and evicted least-recently-played first.
+    Access time is tracked with os.utime on atime only, so mtime (and the ETag derived from it) stays stable.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._ready = False
+
+    def _ensure_directory(self):
+        """Creates the cache directory on first write, falling back to a temp dir if it isn't writable"""
+        if self._ready:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            fallback = os.path.join(tempfile.gettempdir(), "papercast-audio")
+            logger.warning("Audio cache dir %s unusable (%s), caching in %s instead (set AUDIO_CACHE_DIR)",
+                           self.directory, e, fallback)
+            self.directory = fallback
+            os.makedirs(self.directory, exist_ok=True)
+        self._ready = True
+
+    def path_for(self, file_name: str) -> str:
+        # Only ever a flat file inside the cache directory
+        return os.path.join(self.directory, os.path.basename(file_name))
+
+    def _lock_for(self, file_name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(file_name, threading.Lock())
+
+    def get(self, file_name: str) -> str:
+        """Returns the local path if the file is cached (and marks it as recently used), else None"""
+        path = self.path_for(file_name)
+        try:
+            st = os.stat(path)
+            os.utime(path, times=(time.time(), st.st_mtime))
+            return path
+        except OSError:
+            return None
+
+    def put_bytes(self, file_name: str, content: bytes) -> str:
+        self._ensure_directory()
+        tmp_path = self.path_for(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        return self._commit(tmp_path, file_name)
+
+    def fetch(self, s3, bucket: str, file_name: str) -> str:
+        """Returns the cached path, downloading from S3 first on a miss. None if the object doesn't exist."""
+        path = self.get(file_name)
+        record_cache("audio_disk", path is not None)
+        if path:
+            return path
+
+        # One download per file per worker; concurrent requests wait for it instead of racing
+        with self._lock_for(file_name):
+            path = self.get(file_name)
+            if path:
+                return path
+            self._ensure_directory()
+            tmp_path = self.path_for(f".{uuid.uuid4().hex}.tmp")
+            try:
+                logger.info("Audio cache miss, downloading %s from S3", file_name)
+                s3.download_file(bucket, file_name, tmp_path)
+            except Exception as e:
+                logger.error("Audio cache download failed for %s: %s", file_name, e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+            return self._commit(tmp_path, file_name)
+
+    def _commit(self, tmp_path: str, file_name: str) -> str:
+        path = self.path_for(file_name)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def discard(self, file_name: str):
+        try:
+            os.remove(self.path_for(file_name))
+        except OSError:
+            pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.startswith("."):
+                self.discard(name)
+
+    def evict(self):
+        """Removes least recently played files until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # removed by another worker
+            entries.append((st.st_atime, st.st_size, entry.path))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+# Singleton instance
+audio_cache = AudioDiskCache(
+    # The default matches the /_audio_cache/ alias in deploy/nginx.conf (AUDIO_ACCEL_REDIRECT)
+    os.getenv("AUDIO_CACHE_DIR", "/var/cache/papercast/audio"),
+    int(os.getenv("AUDIO_CACHE_MAX_MB", "1024")) * 1024 * 1024
+)
@@ -0,0 +1,70 @@
+
+import time
+import logging
+import jwt
+from jwt import PyJWKClient
+from backend.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ADMIN_GROUP = "admins"
+
+class CognitoTokenVerifier:
+    """
+    Verifies Cognito ID tokens locally (RS256 signature, issuer, audience, expiry, token_use)
+    against the user pool's JWKS, which is fetched once and refreshed periodically.
+    """
+
+    def __init__(self, region: str, user_pool_id: str, client_id: str, jwks_ttl: float = 3600):
+        self.client_id = client_id
+        self.issuer = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+        # PyJWKClient caches the key set for `lifespan` seconds and refetches early on an unknown 'kid' (key rotation)
+        self.jwks = PyJWKClient(f"{self.issuer}/.well-known/jwks.json", cache_jwk_set=True, lifespan=jwks_ttl)
+        # Already-verified tokens, so repeat requests skip the RSA check (entries never outlive the token)
+        self._verified = TTLCache(ttl=300, max_size=4096)
+
+    def verify(self, token: str, verify_exp: bool = True) -> dict:
+        """Returns the token claims, or None if the token is invalid (or expired, when verify_exp is set)"""
+        if not token:
+            return None
+        if verify_exp:
+            claims = self._verified.get(token)
+            if claims and claims["exp"] > time.time():
+                return claims
+
+        try:
+            signing_key = self.jwks.get_signing_key_from_jwt(token)
+            claims = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=["RS256"],
+                audience=self.client_id,
+                issuer=self.issuer,
+                options={"verify_exp": verify_exp, "require": ["exp", "iss", "aud"]}
+            )
+        except Exception as e:
+            if verify_exp and not isinstance(e, jwt.ExpiredSignatureError):
+                logger.info("Rejected ID token: %s", e)
+            return None
+
+        if claims.get("token_use") != "id":
+            return None
+        if verify_exp:
+            self._verified.set(token, claims, ttl=min(300, max(0, claims["exp"] - time.time())))
+        return claims
+
+def identity_from_claims(claims: dict) -> tuple:
+    """(username, is_admin) from verified ID token claims"""
+    if not claims:
+        return None, False
+    username = claims.get("cognito:username") or claims.get("username")
+    return username, ADMIN_GROUP in (claims.get("cognito:groups") or [])
+
+_verifier = None
+
+def get_verifier(config: dict) -> CognitoTokenVerifier:
+    """Per-worker verifier singleton (keeps the JWKS cache warm across requests)"""
+    global _verifier
+    if _verifier is None:
+        _verifier = CognitoTokenVerifier(config["region"], config["user_pool_id"], config["client_id"])
+    return _verifier
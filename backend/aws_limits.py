@@ -0,0 +1,154 @@
+
+import logging
+import os
+import random
+import threading
+import time
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from backend.aws_usage import THROTTLE_ERROR_CODES
+from backend.telemetry import AWS_CONCURRENCY_LIMIT, AWS_LIMITER_WAIT_SECONDS, AWS_LIMITER_RETRIES, AWS_BUSY
+
+logger = logging.getLogger(__name__)
+
+# Per-worker concurrency ceilings for the AI services ("service=limit,..."). Each limit starts
+# at its ceiling and adapts to throttling; size them as (account quota / gunicorn workers).
+DEFAULT_AI_CONCURRENCY = "bedrock-runtime=4,polly=8,translate=8,comprehend=8"
+
+# The limiters do the retrying for these clients (see aws_client), so botocore makes one attempt
+LIMITED_CLIENT_CONFIG = Config(retries={"mode": "standard", "total_max_attempts": 1})
+
+class ServiceBusy(Exception):
+    """An AI service stayed throttled (or saturated) through every retry; try again later"""
+
+def retry_reason(error: Exception) -> str:
+    """'throttle' / 'transient' for errors worth retrying, None otherwise"""
+    if isinstance(error, ClientError):
+        if error.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES:
+            return "throttle"
+        if error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0) >= 500:
+            return "transient"
+        return None
+    if isinstance(error, (BotoConnectionError, HTTPClientError)):
+        return "transient"
+    return None
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one service, shared by every thread in the worker.
+    Each success raises the limit by 1/limit (about +1 per limit's worth of calls), a throttle
+    halves it (at most once per `cooldown` seconds, so one burst of throttles counts once).
+    Throttled and transient failures are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, service: str, max_limit: int, min_limit: int = 1, backoff_factor: float = 0.5,
+                 cooldown: float = 1.0, max_attempts: int = 6, base_delay: float = 0.25, max_delay: float = 8.0,
+                 queue_timeout: float = 30.0):
+        self.service = service
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.backoff_factor = backoff_factor
+        self.cooldown = cooldown
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue_timeout = queue_timeout
+        self.limit = float(self.max_limit)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight >= max(self.min_limit, int(self.limit)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._in_flight += 1
+            return True
+
+    def release(self, throttled: bool = False):
+        with self._condition:
+            # Only grow a limit that is actually being used, or an idle worker would drift to the ceiling
+            saturated = self._in_flight >= int(self.limit)
+            self._in_flight -= 1
+            if throttled:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                    self._last_decrease = now
+                    logger.info("%s throttled, concurrency limit now %.1f", self.service, self.limit)
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            AWS_CONCURRENCY_LIMIT.labels(self.service).set(self.limit)
+            self._condition.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) within the limit, retrying throttles and transient errors"""
+        for attempt in range(self.max_attempts):
+            started = time.perf_counter()
+            if not self.acquire(self.queue_timeout):
+                AWS_BUSY.labels(self.service).inc()
+                raise ServiceBusy(f"{self.service}: no free slot within {self.queue_timeout:.0f}s")
+            AWS_LIMITER_WAIT_SECONDS.labels(self.service).observe(time.perf_counter() - started)
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                reason = retry_reason(e)
+                self.release(throttled=reason == "throttle")
+                if reason is None:
+                    raise
+                if attempt + 1 == self.max_attempts:
+                    if reason == "throttle":
+                        AWS_BUSY.labels(self.service).inc()
+                        raise ServiceBusy(f"{self.service} still throttled after {self.max_attempts} attempts") from e
+                    raise
+                AWS_LIMITER_RETRIES.labels(self.service, reason).inc()
+                delay = self.backoff(attempt)
+                logger.debug("%s %s error, retrying in %.2fs (attempt %d): %s", self.service, reason, delay, attempt + 1, e)
+                time.sleep(delay)
+            else:
+                self.release()
+                return result
+
+def parse_limits(spec: str) -> dict:
+    """'polly=8,translate=4' -> {'polly': 8, 'translate': 4}"""
+    limits = {}
+    for part in spec.split(","):
+        service, _, value = part.partition("=")
+        if service.strip() and value.strip().isdigit():
+            limits[service.strip()] = int(value)
+    return limits
+
+class ServiceLimits:
+    """Per-worker registry of AdaptiveLimiters, one per rate-limited AI service"""
+
+    def __init__(self, limits: dict, **limiter_kwargs):
+        self.limiters = {service: AdaptiveLimiter(service, limit, **limiter_kwargs) for service, limit in limits.items()}
+
+    @classmethod
+    def from_env(cls):
+        limits = parse_limits(DEFAULT_AI_CONCURRENCY)
+        limits.update(parse_limits(os.getenv("AI_CONCURRENCY", "")))
+        return cls(
+            limits,
+            max_attempts=int(os.getenv("AI_RETRY_ATTEMPTS", "6")),
+            queue_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", "30"))
+        )
+
+    def manages(self, service: str) -> bool:
+        return service in self.limiters
+
+    def call(self, service: str, func, *args, **kwargs):
+        limiter = self.limiters.get(service)
+        if limiter is None:
+            return func(*args, **kwargs)
+        return limiter.call(func, *args, **kwargs)
+
+service_limits = ServiceLimits.from_env()
@@ -0,0 +1,241 @@
+
+import contextvars
+import math
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from backend.telemetry import AWS_CALLS, AWS_CALL_SECONDS, AWS_RETRIES, AWS_THROTTLES, AWS_BILLABLE_UNITS, AWS_COST
+
+# Podcast (DynamoDB ArticleID) that AWS calls made in the current request are billed to
+podcast_usage_var = contextvars.ContextVar("podcast_usage", default=None)
+
+# Error codes botocore's retry handlers treat as throttling (botocore.retries.standard)
+THROTTLE_ERROR_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "TooManyRequestsException", "ProvisionedThroughputExceededException", "TransactionInProgressException",
+    "RequestLimitExceeded", "BandwidthLimitExceeded", "LimitExceededException", "RequestThrottled",
+    "SlowDown", "PriorRequestNotComplete"
+}
+
+# USD per billable unit, us-east-1 on-demand list prices. Operations without an entry
+# (DynamoDB, Cognito, most S3 reads) are counted and timed but not costed.
+BEDROCK_TOKEN_PRICES = {
+    # model id: (per input token, per output token)
+    "amazon.nova-micro-v1:0": (0.035 / 1e6, 0.14 / 1e6),
+    "amazon.nova-lite-v1:0": (0.06 / 1e6, 0.24 / 1e6),
+    "amazon.nova-pro-v1:0": (0.8 / 1e6, 3.2 / 1e6),
+}
+POLLY_CHARACTER_PRICES = {"standard": 4 / 1e6, "neural": 16 / 1e6, "generative": 30 / 1e6, "long-form": 100 / 1e6}
+COMPREHEND_UNIT_PRICE = 0.0001  # per 100-character unit, 3 units minimum per request
+TRANSLATE_CHARACTER_PRICE = 15 / 1e6
+S3_REQUEST_PRICES = {"PutObject": 0.005 / 1000, "CopyObject": 0.005 / 1000, "ListObjectsV2": 0.005 / 1000,
+                     "GetObject": 0.0004 / 1000, "HeadObject": 0.0004 / 1000}
+
+# How much history each worker keeps in memory
+USAGE_DAYS = 14
+USAGE_PODCASTS = 512
+
+def billable_units(service: str, operation: str, request: dict, parsed: dict) -> tuple:
+    """({unit: quantity}, cost in USD) of one successful call. `request` holds the sizes captured by _before_call."""
+    if service == "bedrock-runtime" and operation in ("Converse", "ConverseStream"):
+        usage = parsed.get("usage") or {}
+        tokens_in, tokens_out = usage.get("inputTokens", 0), usage.get("outputTokens", 0)
+        price_in, price_out = BEDROCK_TOKEN_PRICES.get(request.get("model_id"), (0, 0))
+        return {"input_tokens": tokens_in, "output_tokens": tokens_out}, tokens_in * price_in + tokens_out * price_out
+    if service == "polly" and operation == "SynthesizeSpeech":
+        characters = parsed.get("RequestCharacters") or request.get("characters", 0)
+        return {"characters": characters}, characters * POLLY_CHARACTER_PRICES.get(request.get("engine") or "standard", 0)
+    if service == "comprehend" and operation.startswith("Detect"):
+        units = max(3, math.ceil(request.get("characters", 0) / 100))
+        return {"units": units}, units * COMPREHEND_UNIT_PRICE
+    if service == "comprehend" and operation.startswith("BatchDetect"):
+        # Billed per document, like the single-document calls
+        units = sum(max(3, math.ceil(characters / 100)) for characters in request.get("documents", []))
+        return {"units": units}, units * COMPREHEND_UNIT_PRICE
+    if service == "translate" and operation == "TranslateText":
+        characters = request.get("characters", 0)
+        return {"characters": characters}, characters * TRANSLATE_CHARACTER_PRICE
+    if service == "s3":
+        return {"requests": 1}, S3_REQUEST_PRICES.get(operation, 0)
+    return {}, 0.0
+
+def _new_row() -> dict:
+    return {"calls": 0, "errors": 0, "throttles": 0, "retries": 0, "seconds": 0.0, "units": {}, "cost": 0.0}
+
+def _add(row: dict, calls: int, errors: int, throttles: int, retries: int, seconds: float, units: dict, cost: float):
+    row["calls"] += calls
+    row["errors"] += errors
+    row["throttles"] += throttles
+    row["retries"] += retries
+    row["seconds"] += seconds
+    row["cost"] += cost
+    for unit, quantity in units.items():
+        row["units"][unit] = row["units"].get(unit, 0) + quantity
+
+class UsageLedger:
+    """
+    Per-process AWS call aggregates, keyed by "<service>.<Operation>", for each UTC day
+    (last USAGE_DAYS) and for each podcast being generated (last USAGE_PODCASTS).
+    """
+
+    def __init__(self, days: int = USAGE_DAYS, max_podcasts: int = USAGE_PODCASTS):
+        self.days = days
+        self.max_podcasts = max_podcasts
+        self._daily = OrderedDict()     # "YYYY-MM-DD" -> {operation key: row}
+        self._podcasts = OrderedDict()  # podcast id -> {operation key: row}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, podcast_id: str = None, **call):
+        day = time.strftime("%Y-%m-%d", time.gmtime())
+        with self._lock:
+            if day not in self._daily:
+                self._daily[day] = {}
+                while len(self._daily) > self.days:
+                    self._daily.popitem(last=False)
+            _add(self._daily[day].setdefault(key, _new_row()), **call)
+
+            if podcast_id:
+                rows = self._podcasts.pop(podcast_id, {})
+                self._podcasts[podcast_id] = rows
+                while len(self._podcasts) > self.max_podcasts:
+                    self._podcasts.popitem(last=False)
+                _add(rows.setdefault(key, _new_row()), **call)
+
+    def take_podcast(self, podcast_id: str) -> dict:
+        """Removes and returns a podcast's {operation key: row}"""
+        with self._lock:
+            return self._podcasts.pop(podcast_id, {})
+
+    def daily(self) -> dict:
+        with self._lock:
+            return {day: {key: dict(row, units=dict(row["units"])) for key, row in rows.items()} for day, rows in self._daily.items()}
+
+ledger = UsageLedger()
+
+def _throttled(parsed: dict) -> bool:
+    return (parsed or {}).get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+def _before_call(params, model, context, **kwargs):
+    """before-parameter-build: start the clock and keep only the sizes needed for billing"""
+    usage = {"started": time.perf_counter(), "model": model, "throttles": 0, "podcast_id": podcast_usage_var.get()}
+    if "Text" in params:
+        usage["characters"] = len(params["Text"])
+    if "TextList" in params:
+        usage["documents"] = [len(text) for text in params["TextList"]]
+    if "Engine" in params:
+        usage["engine"] = params["Engine"]
+    if "modelId" in params:
+        usage["model_id"] = params["modelId"]
+    context["usage"] = usage
+
+def _needs_retry(request_dict, response=None, **kwargs):
+    """needs-retry fires once per attempt; count the throttled ones (botocore decides whether to retry)"""
+    usage = (request_dict.get("context") or {}).get("usage")
+    if usage is not None and response is not None and _throttled(response[1]):
+        usage["throttles"] += 1
+
+def _finish(context, parsed: dict = None, failed: bool = False):
+    usage = context.get("usage")
+    if usage is None:
+        return
+    service, operation = usage["model"].service_model.service_name, usage["model"].name
+    seconds = time.perf_counter() - usage["started"]
+    retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    # The last attempt's throttle is only seen here when retries ran out
+    throttles = max(usage["throttles"], 1 if _throttled(parsed) else 0)
+    units, cost = ({}, 0.0) if failed else billable_units(service, operation, usage, parsed or {})
+
+    AWS_CALLS.labels(service, operation, "error" if failed else "ok").inc()
+    AWS_CALL_SECONDS.labels(service, operation).observe(seconds)
+    if retries:
+        AWS_RETRIES.labels(service, operation).inc(retries)
+    if throttles:
+        AWS_THROTTLES.labels(service, operation).inc(throttles)
+    for unit, quantity in units.items():
+        AWS_BILLABLE_UNITS.labels(service, unit).inc(quantity)
+    if cost:
+        AWS_COST.labels(service).inc(cost)
+
+    ledger.record(f"{service}.{operation}", usage["podcast_id"], calls=1, errors=int(failed), throttles=throttles,
+                  retries=retries, seconds=seconds, units=units, cost=cost)
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    _finish(context, parsed, failed=http_response.status_code >= 300)
+
+def _after_call_error(exception, context, **kwargs):
+    """Connection/timeout errors never reach after-call"""
+    _finish(context, failed=True)
+
+def instrument_client(client):
+    """Registers the usage hooks on a boto3 client (applies to every call it makes)"""
+    events = client.meta.events
+    events.register("before-parameter-build", _before_call)
+    events.register("needs-retry", _needs_retry)
+    events.register("after-call", _after_call)
+    events.register("after-call-error", _after_call_error)
+    return client
+
+def to_item(rows: dict) -> dict:
+    """A podcast's ledger rows as a DynamoDB map (DynamoDB has no float type)"""
+    def number(value):
+        return Decimal(str(round(value, 6)))
+
+    operations = {
+        key: {
+            "calls": row["calls"], "errors": row["errors"], "throttles": row["throttles"], "retries": row["retries"],
+            "ms": int(row["seconds"] * 1000), "units": row["units"], "cost_usd": number(row["cost"])
+        } for key, row in rows.items()
+    }
+    return {"cost_usd": number(sum(row["cost"] for row in rows.values())), "operations": operations}
+
+def cost_report(items: list, days: int = USAGE_DAYS) -> dict:
+    """
+    Aggregates the aws_usage maps stored on podcast records into a per-day table, a per-operation
+    ranking (what to optimize or cache first) and the most expensive podcasts.
+    """
+    cutoff = time.time() - days * 86400
+    by_day, by_operation, podcasts = {}, {}, []
+    total_cost = 0.0
+    for item in items:
+        usage = item.get("aws_usage")
+        if not usage:
+            continue
+        cost = float(usage.get("cost_usd", 0))
+        total_cost += cost
+        podcasts.append({"id": item["ArticleID"], "title": item.get("title", ""), "cost": cost})
+
+        updated = int(item.get("updated_at", 0)) / 1000
+        day_row = None
+        if updated >= cutoff:
+            day = time.strftime("%Y-%m-%d", time.gmtime(updated))
+            day_row = by_day.setdefault(day, dict(_new_row(), day=day, podcasts=0))
+            day_row["podcasts"] += 1
+
+        for key, op in usage.get("operations", {}).items():
+            call = {
+                "calls": int(op.get("calls", 0)), "errors": int(op.get("errors", 0)),
+                "throttles": int(op.get("throttles", 0)), "retries": int(op.get("retries", 0)),
+                "seconds": int(op.get("ms", 0)) / 1000,
+                "units": {unit: int(quantity) for unit, quantity in (op.get("units") or {}).items()},
+                "cost": float(op.get("cost_usd", 0))
+            }
+            _add(by_operation.setdefault(key, dict(_new_row(), operation=key)), **call)
+            if day_row is not None:
+                _add(day_row, **call)
+
+    for row in by_operation.values():
+        row["avg_ms"] = int(row["seconds"] * 1000 / row["calls"]) if row["calls"] else 0
+    return {
+        "total_cost": total_cost,
+        "days": sorted(by_day.values(), key=lambda row: row["day"], reverse=True),
+        "operations": sorted(by_operation.values(), key=lambda row: (row["cost"], row["seconds"]), reverse=True),
+        "top_podcasts": sorted(podcasts, key=lambda row: row["cost"], reverse=True)[:10]
+    }
+
+def worker_report() -> list:
+    """Today's calls in this worker, including ones not tied to a podcast (auth, admin, library reads)"""
+    rows = ledger.daily().get(time.strftime("%Y-%m-%d", time.gmtime()), {})
+    report = [dict(row, operation=key, avg_ms=int(row["seconds"] * 1000 / row["calls"]) if row["calls"] else 0)
+              for key, row in rows.items()]
+    return sorted(report, key=lambda row: (row["throttles"], row["retries"], row["calls"]), reverse=True)
@@ -0,0 +1,142 @@
+
+import logging
+import os
+import time
+from backend.aws_limits import ServiceBusy
+from backend.aws_usage import podcast_usage_var, ledger as usage_ledger, to_item as usage_item
+from backend.news_service import news_service
+from backend.telemetry import span, record_cache
+
+logger = logging.getLogger(__name__)
+
+# GNews top-headlines categories a briefing can be made for
+BRIEFING_CATEGORIES = ["general", "world", "nation", "business", "technology", "entertainment", "sports", "science", "health"]
+BRIEFING_STORIES = int(os.getenv("BRIEFING_STORIES", "5"))
+
+# A request that finds the hour's briefing being generated elsewhere waits this long for it
+BRIEFING_WAIT_SECONDS = float(os.getenv("BRIEFING_WAIT_SECONDS", "90"))
+BRIEFING_POLL_INTERVAL = 2
+
+class BriefingUnavailable(Exception):
+    """The briefing could not be produced (no headlines, synthesis or upload failed)"""
+
+def briefing_id(category: str, language: str, now: float = None) -> str:
+    """ArticleID of a briefing: one per category, language and UTC hour"""
+    return f"briefing_{category}_{language}_{time.strftime('%Y%m%d%H', time.gmtime(now))}"
+
+def combine_insights(results: list) -> dict:
+    """Merges per-story Comprehend insights: MIXED when the stories disagree, first five unique phrases/entities"""
+    sentiments = {r["sentiment"] for r in results if r["sentiment"] != "UNKNOWN"}
+    if not sentiments:
+        sentiment = "UNKNOWN"
+    elif len(sentiments) == 1:
+        sentiment = sentiments.pop()
+    else:
+        sentiment = "MIXED"
+
+    def top(field):
+        # Round-robin over the stories so every one of them is represented
+        merged = []
+        for rank in range(max((len(r[field]) for r in results), default=0)):
+            for r in results:
+                if rank < len(r[field]) and r[field][rank] not in merged:
+                    merged.append(r[field][rank])
+        return merged[:5]
+
+    return {"sentiment": sentiment, "key_phrases": top("key_phrases"), "entities": top("entities")}
+
+def generate_briefing(aws_service, cache_id: str, category: str, language: str, user: str) -> dict:
+    """
+    One pipeline pass for the category's top stories: a single batched Comprehend pass, a single
+    Bedrock call for the whole script and one (segment-parallel) Polly synthesis. Returns the saved record.
+    """
+    with span("briefing.headlines"):
+        articles = news_service.get_top_headlines(category=category)[:BRIEFING_STORIES]
+    if not articles:
+        raise BriefingUnavailable("No headlines available for this category right now.")
+
+    logger.info("Generating briefing %s from %d stories", cache_id, len(articles))
+    podcast_usage_var.set(cache_id)
+
+    with span("briefing.comprehend"):
+        nlp_insights = combine_insights(aws_service.analyze_texts_comprehend([a["content"] for a in articles]))
+
+    with span("briefing.summarize"):
+        insights = aws_service.summarize_briefing(articles)
+    if isinstance(insights.get("summary"), list):
+        insights["summary"] = " ".join(insights["summary"])
+
+    if language != "en":
+        with span("briefing.translate"):
+            aws_service.translate_insights(insights, language)
+
+    with span("briefing.synthesize"):
+        audio_variants = aws_service.generate_speech_variants(insights["script"], language)
+    if not audio_variants:
+        raise BriefingUnavailable("Polly generation failed")
+
+    host_voice, expert_voice = aws_service.get_voice_names(language)
+    insights["script"] = insights["script"].replace("[HOST]", f"[HOST ({host_voice})]").replace("[EXPERT]", f"[EXPERT ({expert_voice})]")
+
+    with span("briefing.upload"):
+        stored_variants = aws_service.upload_audio_variants(cache_id, audio_variants)
+    if not stored_variants:
+        raise BriefingUnavailable("S3 upload failed")
+
+    record = {
+        "article_id": cache_id,
+        "kind": "briefing",
+        "language": language,
+        "status": "completed",
+        "title": f"{category.capitalize()} Briefing, {time.strftime('%b %d %H:00 UTC', time.gmtime())}",
+        "source": "Papercast Briefing",
+        "time": time.strftime("%Y-%m-%dT%H:00:00Z", time.gmtime()),
+        "stories": [{"id": a["id"], "title": a["title"], "source": a["source"], "url": a.get("url") or ""} for a in articles],
+        "summary": insights.get("summary", ""),
+        "key_points": insights.get("key_points", []),
+        "tldr": insights.get("tldr", ""),
+        "script": insights.get("script", ""),
+        "nlp_sentiment": nlp_insights["sentiment"],
+        "nlp_key_phrases": nlp_insights["key_phrases"],
+        "nlp_entities": nlp_insights["entities"],
+        "audio_variants": stored_variants
+    }
+    with span("briefing.save"):
+        aws_service.save_article_metadata(cache_id, dict(record, aws_usage=usage_item(usage_ledger.take_podcast(cache_id))), user_id=user)
+    logger.info("Briefing generated and saved for %s", cache_id)
+    return record
+
+def _completed(record) -> bool:
+    return bool(record and record.get("status") == "completed")
+
+def get_briefing(aws_service, category: str, language: str, user: str) -> tuple:
+    """
+    Returns (cache_id, record, status) for the current hour's briefing, generating it when no
+    worker has yet. Only the worker that claims the record generates; others poll for its result.
+    """
+    cache_id = briefing_id(category, language)
+    with span("briefing.lookup"):
+        record = aws_service.get_article_metadata(cache_id)
+    record_cache("briefing", _completed(record))
+    if _completed(record):
+        if user not in (record.get("subscribers") or set()):
+            aws_service.add_subscriber(cache_id, user)
+        return cache_id, record, "cached"
+
+    deadline = time.monotonic() + BRIEFING_WAIT_SECONDS
+    while not aws_service.claim_generation(cache_id):
+        # Someone else is generating this hour's briefing; a failed attempt releases its claim
+        if time.monotonic() >= deadline:
+            raise ServiceBusy(f"briefing {cache_id} still being generated after {BRIEFING_WAIT_SECONDS:.0f}s")
+        time.sleep(BRIEFING_POLL_INTERVAL)
+        record = aws_service.get_article_metadata(cache_id)
+        if _completed(record):
+            aws_service.add_subscriber(cache_id, user)
+            return cache_id, record, "cached"
+
+    try:
+        return cache_id, generate_briefing(aws_service, cache_id, category, language, user), "generated"
+    except Exception:
+        usage_ledger.take_podcast(cache_id)
+        aws_service.release_generation(cache_id)
+        raise
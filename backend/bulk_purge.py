@@ -0,0 +1,157 @@
+
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from backend.telemetry import with_trace
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH = 1000
+
+class BulkPurger:
+    """
+    Streams ArticleIDs out of a parallel scan and deletes them in 1000-key chunks.
+    Each chunk removes the S3 audio first and then the DynamoDB records whose audio is gone,
+    so an interrupted purge can simply be re-run: whatever is still in the table is still to do.
+    """
+
+    def __init__(self, s3, table, bucket: str, scanner, max_workers: int = 4, progress_callback=None, audio_keys=None):
+        self.s3 = s3
+        self.table = table
+        self.bucket = bucket
+        self.scanner = scanner
+        self.max_workers = max(1, int(max_workers))
+        self.progress_callback = progress_callback or self._log_progress
+        if audio_keys:
+            self.audio_keys = audio_keys
+        self._lock = threading.Lock()
+        self.progress = {}
+
+    def _log_progress(self, progress: dict):
+        logger.info(
+            "Purge progress: %d/%d records, %d S3 objects, %d failed (%.1fs)",
+            progress['records_deleted'], progress['records_seen'], progress['objects_deleted'],
+            progress['failed'], progress['elapsed']
+        )
+
+    def audio_keys(self, article_id: str) -> list:
+        """All S3 keys belonging to one podcast record"""
+        return [f"{article_id}.mp3"]
+
+    def _purge_chunk(self, article_ids: list):
+        """Deletes one chunk of podcasts: S3 objects first, then the matching DynamoDB items"""
+        key_owner = {}
+        for article_id in article_ids:
+            for key in self.audio_keys(article_id):
+                key_owner[key] = article_id
+        keys = list(key_owner)
+
+        failed_ids = set()
+        objects_deleted = 0
+        for start in range(0, len(keys), S3_DELETE_BATCH):
+            batch = keys[start:start + S3_DELETE_BATCH]
+            response = self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            # Quiet mode only reports failures
+            errors = response.get('Errors', [])
+            objects_deleted += len(batch) - len(errors)
+            for error in errors:
+                logger.error("S3 purge failed for %s: %s", error.get('Key'), error.get('Code'))
+                failed_ids.add(key_owner.get(error.get('Key')))
+
+        # Keep records whose audio could not be removed, so the next run retries them
+        to_delete = [article_id for article_id in article_ids if article_id not in failed_ids]
+        with self.table.batch_writer() as batch:
+            for article_id in to_delete:
+                batch.delete_item(Key={'ArticleID': article_id})
+
+        with self._lock:
+            self.progress["objects_deleted"] += objects_deleted
+            self.progress["records_deleted"] += len(to_delete)
+            self.progress["failed"] += len(failed_ids)
+            self.progress["elapsed"] = time.time() - self.progress["started"]
+            snapshot = dict(self.progress)
+        self.progress_callback(snapshot)
+
+    def _purge_chunk_counted(self, article_ids: list):
+        """_purge_chunk, counting the whole chunk as failed if it raises (whatever it left in the table is retried on the next run)"""
+        try:
+            self._purge_chunk(article_ids)
+        except Exception as e:
+            logger.error("Purge chunk of %d records failed: %s", len(article_ids), e)
+            with self._lock:
+                self.progress["failed"] += len(article_ids)
+                self.progress["elapsed"] = time.time() - self.progress["started"]
+                snapshot = dict(self.progress)
+            self.progress_callback(snapshot)
+
+    def run(self, **scan_kwargs) -> dict:
+        """Purges every record matched by scan_kwargs (the whole table by default). Returns the final progress."""
+        self.progress = {
+            "records_seen": 0,
+            "records_deleted": 0,
+            "objects_deleted": 0,
+            "failed": 0,
+            "started": time.time(),
+            "elapsed": 0.0
+        }
+        scan_kwargs.setdefault("ProjectionExpression", "ArticleID")
+
+        # Bound the number of chunks waiting on the pool so the scan can't run away from the deletes
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def submit(chunk):
+            in_flight.acquire()
+            future = executor.submit(with_trace(self._purge_chunk_counted), chunk)
+            future.add_done_callback(lambda _: in_flight.release())
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="purge") as executor:
+            pending = []
+            for items in self.scanner.iter_pages(**scan_kwargs):
+                for item in items:
+                    if 'ArticleID' in item:
+                        pending.append(item['ArticleID'])
+                with self._lock:
+                    self.progress["records_seen"] += len(items)
+
+                while len(pending) >= S3_DELETE_BATCH:
+                    submit(pending[:S3_DELETE_BATCH])
+                    pending = pending[S3_DELETE_BATCH:]
+
+            if pending:
+                submit(pending)
+
+        self.progress["elapsed"] = time.time() - self.progress["started"]
+        return dict(self.progress)
+
+# --- Maintenance CLI ---
+# Usage: python -m backend.bulk_purge --yes [--workers 8]
+# Safe to interrupt and re-run: completed chunks are gone from the table, the rest is picked up again.
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from backend.logs import configure_logging
+    from backend.real_aws import RealAWSService, audio_file_names
+    configure_logging(name="")
+
+    parser = argparse.ArgumentParser(description="Delete every generated podcast and its audio from the configured storage")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent delete chunks")
+    parser.add_argument("--yes", action="store_true", help="Confirm the purge")
+    args = parser.parse_args()
+
+    if not args.yes:
+        print("Refusing to purge without --yes", file=sys.stderr)
+        sys.exit(1)
+
+    aws_service = RealAWSService()
+    # STORAGE_BACKEND=local purges the SQLite records and audio directory instead (see storage.py)
+    result = aws_service.metadata.purge(aws_service.audio, audio_file_names, max_workers=args.workers)
+    print(f"Purge finished: {result['records_deleted']} records, {result['objects_deleted']} objects, {result['failed']} failed")
+    sys.exit(1 if result["failed"] else 0)
@@ -0,0 +1,144 @@
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from urllib.parse import urlparse
+from backend.news_service import news_service
+from backend.telemetry import with_trace, ENRICHMENTS
+
+logger = logging.getLogger(__name__)
+
+# Concurrent page fetches per worker, and per publisher domain
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "4"))
+ENRICH_PER_DOMAIN = int(os.getenv("ENRICH_PER_DOMAIN", "1"))
+# Minimum seconds between two requests to the same domain
+ENRICH_DOMAIN_INTERVAL = float(os.getenv("ENRICH_DOMAIN_INTERVAL", "1.0"))
+# How long generate_audio waits for an extraction that is still running before using the stub
+ENRICH_WAIT_SECONDS = float(os.getenv("ENRICH_WAIT_SECONDS", "3"))
+# A page that failed to extract is not retried for this long
+ENRICH_RETRY_AFTER = 600
+
+class ArticleEnricher:
+    """
+    Fetches the full text of discovered headlines in the background (GNews `content` is
+    truncated) and swaps it into the discovery cache, so generation summarizes the whole article
+    without extracting it on the request path. Fetches are bounded per worker and per domain:
+    each domain has its own queue, and a fetch is only handed to the pool once its domain has a
+    free slot and its spacing has elapsed, so a busy publisher never parks worker threads.
+    """
+
+    def __init__(self, workers: int = ENRICH_WORKERS, per_domain: int = ENRICH_PER_DOMAIN,
+                 domain_interval: float = ENRICH_DOMAIN_INTERVAL):
+        self.per_domain = max(1, per_domain)
+        self.domain_interval = domain_interval
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="enrich")
+        self._futures = {}       # article_id -> Future of the queued or running extraction
+        self._failed = {}        # article_id -> time of the last failed extraction
+        self._queues = {}        # domain -> deque of (article_id, url, future) waiting for the domain
+        self._active = {}        # domain -> fetches in flight
+        self._next_request = {}  # domain -> earliest time.monotonic() for the next fetch
+        self._timers = {}        # domain -> Timer that re-dispatches it once its spacing has elapsed
+        self._lock = threading.Lock()
+
+    def enrich(self, articles: list) -> int:
+        """Queues full-text extraction for the articles not yet enriched. Returns how many were queued."""
+        queued = []
+        with self._lock:
+            for article in articles:
+                article_id, url = article.get("id"), article.get("url")
+                if not url or article.get("full_text") or article_id in self._futures:
+                    continue
+                if time.time() - self._failed.get(article_id, 0) < ENRICH_RETRY_AFTER:
+                    continue
+                future = Future()
+                future.add_done_callback(lambda _, article_id=article_id: self._done(article_id))
+                self._futures[article_id] = future
+                domain = urlparse(url).netloc.lower()
+                self._queues.setdefault(domain, deque()).append((article_id, url, future))
+                queued.append(domain)
+            for domain in set(queued):
+                self._dispatch(domain)
+        return len(queued)
+
+    def wait(self, article_id: str, timeout: float = ENRICH_WAIT_SECONDS) -> bool:
+        """Waits up to `timeout` for a queued or running extraction of the article. Returns whether none is left."""
+        with self._lock:
+            future = self._futures.get(article_id)
+        if future is None:
+            return True
+        try:
+            future.result(timeout)
+            return True
+        except FutureTimeout:
+            return False
+        except Exception:
+            return True
+
+    def _done(self, article_id: str):
+        with self._lock:
+            self._futures.pop(article_id, None)
+
+    def _dispatch(self, domain: str):
+        """Submits the domain's queued fetches it has room for; otherwise re-checks when its spacing ends (lock held)"""
+        queue = self._queues.get(domain)
+        while queue and self._active.get(domain, 0) < self.per_domain:
+            wait = self._next_request.get(domain, 0) - time.monotonic()
+            if wait > 0:
+                if domain not in self._timers:
+                    timer = threading.Timer(wait, self._on_timer, args=(domain,))
+                    timer.daemon = True
+                    self._timers[domain] = timer
+                    timer.start()
+                return
+            article_id, url, future = queue.popleft()
+            self._active[domain] = self._active.get(domain, 0) + 1
+            self._next_request[domain] = time.monotonic() + self.domain_interval
+            self._executor.submit(with_trace(self._run), domain, article_id, url, future)
+        if not queue:
+            self._queues.pop(domain, None)
+
+    def _on_timer(self, domain: str):
+        with self._lock:
+            self._timers.pop(domain, None)
+            self._dispatch(domain)
+
+    def _run(self, domain: str, article_id: str, url: str, future: Future):
+        try:
+            self._enrich_one(article_id, url)
+        except Exception as e:
+            logger.debug("Enrichment failed for %s: %s", article_id, e)
+        finally:
+            with self._lock:
+                self._active[domain] -= 1
+                if not self._active[domain]:
+                    del self._active[domain]
+                self._dispatch(domain)
+            # Outside the lock: the done callback takes it
+            future.set_result(None)
+
+    def _enrich_one(self, article_id: str, url: str):
+        try:
+            _, content = news_service.fetch_full_text(url)
+        except Exception as e:
+            logger.debug("Full-text extraction failed for %s: %s", url, e)
+            content = None
+
+        article = news_service.cache.get(article_id)
+        if article is None:
+            return
+        if not content or len(content) <= len(article.get("content") or ""):
+            # Paywalled or script-rendered pages give less than the GNews stub; keep the stub
+            with self._lock:
+                now = time.time()
+                self._failed = {key: at for key, at in self._failed.items() if now - at < ENRICH_RETRY_AFTER}
+                self._failed[article_id] = now
+            ENRICHMENTS.labels("failed" if content is None else "short").inc()
+            return
+        news_service.cache[article_id] = dict(article, content=content, full_text=True)
+        ENRICHMENTS.labels("ok").inc()
+        logger.debug("Enriched %s: %d -> %d characters", article_id, len(article.get("content") or ""), len(content))
+
+article_enricher = ArticleEnricher()
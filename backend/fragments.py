@@ -0,0 +1,51 @@
+
+import os
+import threading
+from markupsafe import Markup
+from backend.ttl_cache import TTLCache
+from backend.telemetry import record_cache
+
+class FragmentCache:
+    """
+    Cache of rendered per-podcast HTML fragments (library cards, admin modals).
+    Entries are keyed by (template, ArticleID) and tagged with the record's `updated_at`,
+    so a regenerated podcast re-renders on its next view even before it is invalidated.
+    """
+
+    def __init__(self, ttl: float = 3600, max_size: int = 2048):
+        self._cache = TTLCache(ttl=ttl, max_size=max_size)
+        self._templates = set()
+        self._lock = threading.Lock()
+
+    def render(self, env, template_name: str, podcast: dict) -> Markup:
+        article_id = podcast.get("ArticleID")
+        version = podcast.get("updated_at", 0)
+        key = (template_name, article_id)
+
+        cached = self._cache.get(key)
+        hit = bool(cached) and cached[0] == version
+        record_cache("fragment", hit)
+        if hit:
+            return cached[1]
+
+        html = Markup(env.get_template(template_name).render(podcast=podcast))
+        if article_id:
+            with self._lock:
+                self._templates.add(template_name)
+            self._cache.set(key, (version, html))
+        return html
+
+    def render_all(self, env, template_name: str, podcasts: list) -> list:
+        return [self.render(env, template_name, podcast) for podcast in podcasts]
+
+    def invalidate(self, article_id: str):
+        with self._lock:
+            template_names = list(self._templates)
+        for template_name in template_names:
+            self._cache.delete((template_name, article_id))
+
+    def clear(self):
+        self._cache.clear()
+
+# Singleton instance (per worker)
+fragment_cache = FragmentCache(max_size=int(os.getenv("FRAGMENT_CACHE_SIZE", "2048")))
@@ -0,0 +1,116 @@
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from backend.telemetry import trace_id_var
+
+# Every module logs through logging.getLogger(__name__), i.e. under the "backend" logger
+ROOT_LOGGER = "backend"
+
+# Argument types a caller can't change after logging, so formatting them later is safe
+IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "trace_id"}
+
+class TraceIdFilter(logging.Filter):
+    """Stamps each record with the current request/job trace ID (runs on the logging thread, before queueing)"""
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get() or "-"
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as top-level keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Hands records to a queue and formats/writes them on a listener thread, off the request path.
+    Message interpolation and traceback rendering are deferred to the listener too, unless the
+    record's args include mutable objects: those are formatted right away, so the line shows
+    their value at logging time. The listener is started lazily in whichever process logs, so it
+    survives gunicorn's fork.
+    """
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def prepare(self, record):
+        # A dict as args is the caller's own (mutable) mapping
+        if not isinstance(record.args, dict) and all(isinstance(arg, IMMUTABLE_ARG_TYPES) for arg in record.args or ()):
+            return copy.copy(record)
+        return super().prepare(record)
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # A queue inherited from the parent process may still hold its records
+            self.queue = queue.SimpleQueue()
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Flushes queued records and stops the listener (registered with atexit)"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+_handler = None
+
+def configure_logging(level: str = None, fmt: str = None, name: str = ROOT_LOGGER):
+    """
+    Attaches the background handler to the "backend" logger (CLIs pass name="" for the root logger,
+    which also covers their __main__ module). LOG_LEVEL (default INFO) and LOG_FORMAT ("text" or
+    "json") come from the environment unless given. Calls below the level are dropped before
+    their message is even formatted.
+    """
+    global _handler
+    if _handler is None:
+        output = logging.StreamHandler()
+        output.setFormatter(JsonFormatter() if (fmt or os.getenv("LOG_FORMAT", "text")) == "json" else logging.Formatter(TEXT_FORMAT))
+        _handler = BackgroundQueueHandler(output)
+        _handler.addFilter(TraceIdFilter())
+        atexit.register(_handler.stop)
+
+    logger = logging.getLogger(name)
+    logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+    if name:
+        # Uvicorn/gunicorn own the root logger; keep our records out of their handlers
+        logger.propagate = False
+    return logger
@@ -2,33 +2,180 @@ import os
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Form, Response
 import uuid
-from fastapi.responses import RedirectResponse
+from typing import Optional
+import json
+import hashlib
+from time import perf_counter
+from fastapi.responses import RedirectResponse, FileResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Levelled, trace-tagged logging written from a background thread (LOG_LEVEL / LOG_FORMAT)
+import logging
+from backend.logs import configure_logging
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI()
 
-app.mount("/static", StaticFiles(directory="backend/static"), name="static")
+# Fingerprinted, precompressed assets (python -m backend.assets) plus gzip for rendered pages and JSON
+from backend.assets import PrecompressedStaticFiles, DynamicGZipMiddleware, asset_url
+app.add_middleware(DynamicGZipMiddleware, minimum_size=1024)
+app.mount("/static", PrecompressedStaticFiles(directory="backend/static"), name="static")
 templates = Jinja2Templates(directory="backend/templates")
+templates.env.globals["asset_url"] = asset_url
+
+# Compiled templates are kept on disk so fresh workers skip Jinja's parse/compile step
+from jinja2 import FileSystemBytecodeCache
+_bytecode_dir = os.getenv("JINJA_BYTECODE_CACHE_DIR", "/tmp/papercast-jinja")
+os.makedirs(_bytecode_dir, exist_ok=True)
+templates.env.bytecode_cache = FileSystemBytecodeCache(_bytecode_dir)
 
 import re
+HOST_MARKER = re.compile(r'\[HOST([^\]]*)\]:?\s*')
+EXPERT_MARKER = re.compile(r'\[EXPERT([^\]]*)\]:?\s*')
+
 def format_script(text):
     if not text: return ""
-    text = re.sub(r'\[HOST([^\]]*)\]:?\s*', lambda m: f'<span class="speaker-host">[HOST{m.group(1)}]</span>', text)
-    text = re.sub(r'\[EXPERT([^\]]*)\]:?\s*', lambda m: f'<span class="speaker-expert">[EXPERT{m.group(1)}]</span>', text)
+    text = HOST_MARKER.sub(r'<span class="speaker-host">[HOST\1]</span>', text)
+    text = EXPERT_MARKER.sub(r'<span class="speaker-expert">[EXPERT\1]</span>', text)
     return text
 
 templates.env.filters["format_script"] = format_script
 
 from backend.news_service import news_service
-from backend.real_aws import RealAWSService
+from backend.real_aws import RealAWSService, COGNITO_USER_STATUSES, load_aws_config
+from backend.briefing import BRIEFING_CATEGORIES, BriefingUnavailable, get_briefing
+from backend.enrichment import article_enricher
+from backend.aws_limits import ServiceBusy
+from backend.subscriber_queue import subscriber_queue
+from backend.auth import get_verifier, identity_from_claims
+from backend.fragments import fragment_cache
+from backend.telemetry import trace_id_var, new_trace_id, span, record_cache, render_metrics, REQUEST_SECONDS
+from backend.aws_usage import podcast_usage_var, ledger as usage_ledger, to_item as usage_item
+
+AUTH_CONFIG = load_aws_config()
+
+@app.middleware("http")
+async def authenticate_request(request: Request, call_next):
+    """
+    Verifies the id_token cookie locally (cached JWKS, no Cognito call) on every page request
+    and exposes the result as request.state.user / request.state.is_admin.
+    """
+    request.state.user, request.state.is_admin = None, False
+    refreshed, refresh_failed = None, False
+
+    token = request.cookies.get("id_token")
+    if token and not request.url.path.startswith("/static"):
+        verifier = get_verifier(AUTH_CONFIG)
+        # Verification can fetch the JWKS (unknown key ID, periodic refresh), so it runs off the event loop
+        claims = await run_in_threadpool(verifier.verify, token)
+
+        # Genuine but expired token: trade the refresh token for a new one (one Cognito call per hour)
+        if not claims and request.cookies.get("refresh_token"):
+            expired_claims = await run_in_threadpool(verifier.verify, token, verify_exp=False)
+            if expired_claims:
+                username, _ = identity_from_claims(expired_claims)
+                result = await run_in_threadpool(
+                    RealAWSService().refresh_tokens, request.cookies["refresh_token"], username
+                )
+                if result:
+                    refreshed = result["IdToken"]
+                    claims = await run_in_threadpool(verifier.verify, refreshed)
+                else:
+                    # Revoked/expired refresh token: drop both cookies so later requests don't retry it
+                    refresh_failed = True
+
+        request.state.user, request.state.is_admin = identity_from_claims(claims)
+
+    response = await call_next(request)
+    if refreshed:
+        response.set_cookie(key="id_token", value=refreshed, httponly=True)
+    elif refresh_failed:
+        response.delete_cookie("id_token")
+        response.delete_cookie("refresh_token")
+    return response
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    """Assigns the request a trace ID (reusing X-Request-ID from nginx) and records its latency per route"""
+    token = trace_id_var.set(new_trace_id(request.headers.get("x-request-id")))
+    started = perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Trace-ID"] = trace_id_var.get()
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_SECONDS.labels(request.method, route.path if route else "unmatched", str(status)).observe(perf_counter() - started)
+        trace_id_var.reset(token)
+
+@app.exception_handler(ServiceBusy)
+async def service_busy(request: Request, exc: ServiceBusy):
+    """An AI service stayed throttled through every retry: ask the client to come back instead of serving degraded output"""
+    logger.warning("Generation deferred: %s", exc)
+    return JSONResponse(
+        {"error": "The broadcast studio is busy right now. Please try again in a minute.", "status": "failed"},
+        status_code=503,
+        headers={"Retry-After": "30"}
+    )
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (nginx only allows it from localhost)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def login_response(auth_result: dict):
+    """Redirects a freshly authenticated user, reading admin status from the ID token's cognito:groups claim"""
+    claims = get_verifier(AUTH_CONFIG).verify(auth_result['IdToken'])
+    if not claims:
+        return None
+    _, is_admin = identity_from_claims(claims)
+    response = RedirectResponse(url="/admin" if is_admin else "/dashboard", status_code=303)
+    response.set_cookie(key="id_token", value=auth_result['IdToken'], httponly=True)
+    if auth_result.get('RefreshToken'):
+        response.set_cookie(key="refresh_token", value=auth_result['RefreshToken'], httponly=True)
+    return response
+
+@app.on_event("shutdown")
+def flush_pending_writes():
+    # Drain write-behind subscriber additions before the worker exits
+    subscriber_queue.drain()
+
+def audio_variant_urls(cache_id: str, variants) -> dict:
+    """Maps each stored encoding of an episode to its /audio URL (older records only have 'standard')"""
+    urls = {"standard": f"/audio/{cache_id}"}
+    for variant in variants or []:
+        if variant != "standard":
+            urls[variant] = f"/audio/{cache_id}?variant={variant}"
+    return urls
+
+def episode_response(cache_id: str, record: dict, status: str, language: str) -> dict:
+    """The JSON the player renders for a completed podcast record"""
+    # Audio is delivered through our own /audio endpoint (local disk cache, Range support)
+    return {
+        "audio_url": f"/audio/{cache_id}",
+        "audio_variants": audio_variant_urls(cache_id, record.get("audio_variants")),
+        "status": status,
+        "summary": record.get("summary"),
+        "key_points": record.get("key_points"),
+        "tldr": record.get("tldr"),
+        "script": record.get("script"),
+        "nlp_sentiment": record.get("nlp_sentiment"),
+        "nlp_key_phrases": record.get("nlp_key_phrases", []),
+        "nlp_entities": record.get("nlp_entities", []),
+        "language": language
+    }
 
 @app.get("/login")
 def login_page(request: Request):
-    user = request.cookies.get("session")
+    user = request.state.user
     return templates.TemplateResponse("login.html", {"request": request, "user": user})
 
 # Validates user and sets cookie
@@ -38,13 +185,8 @@ async def login(request: Request, username: str = Form(...), password: str = For
     
     # Real Cognito Auth
     auth_result = aws_service.authenticate_user(username, password)
-    if auth_result:
-        groups = aws_service.get_user_groups(username)
-        is_admin = "admins" in groups
-        response = RedirectResponse(url="/admin" if is_admin else "/dashboard", status_code=303)
-        response.set_cookie(key="session", value=username, httponly=True)
-        response.set_cookie(key="id_token", value=auth_result['IdToken'], httponly=True)
-        response.set_cookie(key="is_admin", value="true" if is_admin else "false", httponly=True)
+    response = await run_in_threadpool(login_response, auth_result) if auth_result else None
+    if response:
         return response
     else:
         return templates.TemplateResponse("login.html", {"request": request, "error": "Invalid Cognito credentials"})
@@ -52,14 +194,16 @@ async def login(request: Request, username: str = Form(...), password: str = For
 @app.get("/logout")
 def logout(response: Response):
     response = RedirectResponse(url="/login", status_code=303)
-    response.delete_cookie("session")
     response.delete_cookie("id_token")
+    response.delete_cookie("refresh_token")
+    # Cookies set by older versions of the app
+    response.delete_cookie("session")
     response.delete_cookie("is_admin")
     return response
 
 @app.get("/signup")
 def signup_page(request: Request):
-    user = request.cookies.get("session")
+    user = request.state.user
     return templates.TemplateResponse("signup.html", {"request": request, "user": user})
 
 @app.post("/signup")
@@ -69,13 +213,8 @@ async def signup(request: Request, username: str = Form(...), password: str = Fo
     if success == "EXISTS":
         # Seamless UX: Try to log them in automatically if they entered the right password
         auth_result = aws_service.authenticate_user(username, password)
-        if auth_result:
-            groups = aws_service.get_user_groups(username)
-            is_admin = "admins" in groups
-            response = RedirectResponse(url="/admin" if is_admin else "/dashboard", status_code=303)
-            response.set_cookie(key="session", value=username, httponly=True)
-            response.set_cookie(key="id_token", value=auth_result['IdToken'], httponly=True)
-            response.set_cookie(key="is_admin", value="true" if is_admin else "false", httponly=True)
+        response = await run_in_threadpool(login_response, auth_result) if auth_result else None
+        if response:
             return response
         else:
             return templates.TemplateResponse("signup.html", {"request": request, "error": "Account exists! Please use the Log In page."})
@@ -86,12 +225,12 @@ async def signup(request: Request, username: str = Form(...), password: str = Fo
 
 @app.get("/")
 def landing_page(request: Request):
-    user = request.cookies.get("session")
+    user = request.state.user
     return templates.TemplateResponse("landing.html", {"request": request, "user": user})
 
 @app.get("/dashboard")
 def dashboard(request: Request, category: str = "general", q: str = None, language: str = "en", sort_by: str = "relevancy"):
-    user = request.cookies.get("session")
+    user = request.state.user
     if not user:
         return RedirectResponse(url="/login")
         
@@ -110,20 +249,24 @@ def dashboard(request: Request, category: str = "general", q: str = None, langua
     
     # User specifically requested TOP FIVE
     top_five = news_articles[:5]
+    # Fetch their full text in the background while the page renders (GNews content is truncated)
+    article_enricher.enrich(top_five)
         
     return templates.TemplateResponse("dashboard.html", {
         "request": request, 
         "user": user,
         "news": top_five,
         "current_category": display_title,
+        # Briefings exist for headline categories only
+        "briefing_category": None if q else category,
         "search_query": q or ""
     })
 
 
 @app.get("/admin")
 def admin_dashboard(request: Request):
-    user = request.cookies.get("session")
-    is_admin = request.cookies.get("is_admin") == "true"
+    user = request.state.user
+    is_admin = request.state.is_admin
     
     if not is_admin:
         return RedirectResponse(url="/")
@@ -140,18 +283,34 @@ def admin_dashboard(request: Request):
     })
 
 @app.get("/admin/users")
-def admin_users(request: Request):
-    user = request.cookies.get("session")
-    is_admin = request.cookies.get("is_admin") == "true"
+def admin_users(request: Request, status: str = None, enabled: str = None, email: str = None, token: str = None, page_size: int = 50):
+    user = request.state.user
+    is_admin = request.state.is_admin
     if not is_admin: return RedirectResponse(url="/")
     
     aws_service = RealAWSService()
-    users = aws_service.list_all_users()
-    return templates.TemplateResponse("admin_users.html", {"request": request, "user": user, "users": users})
+    # enabled comes as 'true' / 'false' (or empty for "any") from the filter form
+    enabled_filter = {"true": True, "false": False}.get(enabled)
+    page = aws_service.list_users_page(
+        page_size=page_size,
+        page_token=token,
+        status=status or None,
+        enabled=enabled_filter,
+        email_prefix=email
+    )
+    filters = {"status": status or "", "enabled": enabled or "", "email": email or ""}
+    return templates.TemplateResponse("admin_users.html", {
+        "request": request,
+        "user": user,
+        "users": page["users"],
+        "next_token": page["next_token"],
+        "filters": filters,
+        "statuses": COGNITO_USER_STATUSES
+    })
 
 @app.post("/admin/users/toggle")
 async def toggle_user(request: Request, username: str = Form(...), enabled: str = Form(...)):
-    is_admin = request.cookies.get("is_admin") == "true"
+    is_admin = request.state.is_admin
     if not is_admin: return {"error": "Unauthorized"}
     
     aws_service = RealAWSService()
@@ -161,30 +320,38 @@ async def toggle_user(request: Request, username: str = Form(...), enabled: str
 
 @app.get("/admin/podcasts")
 def admin_podcasts(request: Request):
-    user = request.cookies.get("session")
-    is_admin = request.cookies.get("is_admin") == "true"
+    user = request.state.user
+    is_admin = request.state.is_admin
     if not is_admin: return RedirectResponse(url="/")
     
     aws_service = RealAWSService()
     podcasts = aws_service.get_all_podcasts()
-    return templates.TemplateResponse("admin_podcasts.html", {"request": request, "user": user, "podcasts": podcasts})
+    return templates.TemplateResponse("admin_podcasts.html", {
+        "request": request,
+        "user": user,
+        "podcasts": podcasts,
+        # The heavy per-podcast modals come out of the fragment cache
+        "podcast_modals": fragment_cache.render_all(templates.env, "_admin_podcast_modal.html", podcasts)
+    })
 
 @app.post("/admin/podcasts/delete/{article_id}")
 async def delete_podcast(request: Request, article_id: str):
-    is_admin = request.cookies.get("is_admin") == "true"
+    is_admin = request.state.is_admin
     if not is_admin: return {"error": "Unauthorized"}
     
     aws_service = RealAWSService()
     success = aws_service.delete_podcast(article_id)
+    fragment_cache.invalidate(article_id)
     return RedirectResponse(url="/admin/podcasts?msg=Podcast+Deleted", status_code=303)
 
 @app.post("/admin/podcasts/purge")
 async def purge_podcasts(request: Request):
-    is_admin = request.cookies.get("is_admin") == "true"
+    is_admin = request.state.is_admin
     if not is_admin: return {"error": "Unauthorized"}
     
     aws_service = RealAWSService()
     success = aws_service.purge_all_podcasts()
+    fragment_cache.clear()
     return RedirectResponse(url="/admin/podcasts?msg=All+Podcasts+Purged", status_code=303)
 
 @app.post("/api/generate_audio/{article_id}")
@@ -199,44 +366,41 @@ async def generate_audio(request: Request, article_id: str):
     except:
         target_language = "en"
         
-    user = request.cookies.get("session")
+    user = request.state.user
     if not user:
         return {"error": "Unauthorized. Please log in.", "status": "failed"}
-    print(f"DEBUG: Audio request for {article_id} by user {user} in language {target_language}")
-    aws_service = RealAWSService()
-    
-    # 1. Try to get content from Memory Cache (Fresh Discovery)
-    article = news_service.get_article_by_id(article_id)
-    
-    # 2. If not in memory, check DynamoDB (Already Generated)
+    logger.info("Audio request for %s by %s in %s", article_id, user, target_language)
+    # The pipeline blocks (AWS calls, and limiter waits/backoff when throttled), so it runs on
+    # the threadpool instead of stalling every other request on this worker's event loop
+    return await run_in_threadpool(generate_episode, RealAWSService(), article_id, target_language, user)
+
+def generate_episode(aws_service, article_id: str, target_language: str, user: str) -> dict:
+    """Serves the podcast from the cache or runs the Comprehend/Bedrock/Translate/Polly pipeline for it"""
+    # 1. Check DynamoDB (Already Generated)
     # Note: If they request a DIFFERENT language than what's cached, we'd ideally regenerate.
     # For this demo, we'll append the language to the ID to cache them separately.
     cache_id = f"{article_id}_{target_language}" if target_language != "en" else article_id
     
-    article_data = aws_service.get_article_metadata(cache_id)
+    with span("generate.lookup"):
+        article_data = aws_service.get_article_metadata(cache_id)
     
     # Handle already completed podcasts (from DB)
+    record_cache("generation", bool(article_data and article_data.get("status") == "completed"))
     if article_data and article_data.get("status") == "completed":
-        print(f"DEBUG: Found already completed podcast for {cache_id}")
-        
-        # Hydrate the audio_url on demand based on our architectural pattern
-        audio_url = aws_service.get_audio_url(f"{cache_id}.mp3")
+        logger.debug("Found already completed podcast for %s", cache_id)
         
         # MULTI-TENANT FIX: Even on a cache hit, ensure this user is appended to the subscribers list
-        aws_service.save_article_metadata(cache_id, {}, user_id=user)
+        # (skipped when the record already lists them; otherwise queued and written in the background)
+        if user not in (article_data.get("subscribers") or set()):
+            aws_service.add_subscriber(cache_id, user)
         
-        return {
-            "audio_url": audio_url, 
-            "status": "cached",
-            "summary": article_data.get("summary"),
-            "key_points": article_data.get("key_points"),
-            "tldr": article_data.get("tldr"),
-            "script": article_data.get("script"),
-            "nlp_sentiment": article_data.get("nlp_sentiment"),
-            "nlp_key_phrases": article_data.get("nlp_key_phrases", []),
-            "nlp_entities": article_data.get("nlp_entities", []),
-            "language": target_language
-        }
+        return episode_response(cache_id, article_data, "cached", target_language)
+
+    # 2. Get content from Memory Cache (Fresh Discovery), briefly waiting for its background
+    # full-text extraction if that is still running (only now: cache hits never use it)
+    with span("generate.enrichment_wait"):
+        article_enricher.wait(article_id)
+    article = news_service.get_article_by_id(article_id)
 
     # 3. If we have the article in memory, generate it!
     if article:
@@ -251,35 +415,35 @@ async def generate_audio(request: Request, article_id: str):
         source = article_data.get("source")
         time = article_data.get("time")
     else:
-        print(f"DEBUG ERROR: Article {article_id} not found in memory or DB!")
+        logger.warning("Article %s not found in memory or DB", article_id)
         return {"error": "Article content expired. Please refresh headlines.", "status": "failed"}
 
-    print(f"DEBUG: Generating audio for: {title[:30]}...")
+    logger.info("Generating audio for %s: %.30s", cache_id, title)
+    # AWS calls from here on (including Polly worker threads) are billed to this podcast.
+    # The variable is request-scoped, so nothing leaks into other requests.
+    podcast_usage_var.set(cache_id)
     
     # 3. Perform Generation
     # Extract Comprehend Insights (Based on original English text)
-    nlp_insights = aws_service.analyze_text_comprehend(content)
+    with span("generate.comprehend"):
+        nlp_insights = aws_service.analyze_text_comprehend(content)
     
     # Extract Summarization & Script via Bedrock (In English)
-    insights = aws_service.summarize_article(content)
+    with span("generate.summarize"):
+        insights = aws_service.summarize_article(content)
     
     # Translation Step (If language is not English)
     if target_language != "en":
-        print(f"DEBUG: Translating insights to {target_language}")
-        insights['script'] = aws_service.translate_text(insights['script'], target_language)
-        insights['summary'] = aws_service.translate_text(insights['summary'], target_language)
-        insights['tldr'] = aws_service.translate_text(insights['tldr'], target_language)
-        
-        # Translate Key points (list)
-        translated_points = []
-        for point in insights.get('key_points', []):
-            translated_points.append(aws_service.translate_text(point, target_language))
-        insights['key_points'] = translated_points
+        logger.debug("Translating insights to %s", target_language)
+        with span("generate.translate"):
+            aws_service.translate_insights(insights, target_language)
     
     # Pass the target_language to trigger the correct native Polly voices
-    audio_bytes = aws_service.generate_speech(insights['script'], target_language)
-    if not audio_bytes:
-        print("DEBUG ERROR: Polly generation failed")
+    # (one synthesis per configured encoding, e.g. default mp3 + 16 kHz mobile)
+    with span("generate.synthesize"):
+        audio_variants = aws_service.generate_speech_variants(insights['script'], target_language)
+    if not audio_variants:
+        logger.error("Polly generation failed for %s", cache_id)
         return {"error": "Polly generation failed", "status": "failed"}
 
     # Inject the voice names into the visual script for the UI (after audio generation)
@@ -287,32 +451,37 @@ async def generate_audio(request: Request, article_id: str):
     visual_script = insights['script'].replace("[HOST]", f"[HOST ({host_voice})]").replace("[EXPERT]", f"[EXPERT ({expert_voice})]")
     insights['script'] = visual_script
     
-    file_name = f"{cache_id}.mp3"
-    audio_url = aws_service.upload_audio(audio_bytes, file_name)
-    if not audio_url:
-        print("DEBUG ERROR: S3 upload failed")
+    with span("generate.upload"):
+        stored_variants = aws_service.upload_audio_variants(cache_id, audio_variants)
+    if not stored_variants:
+        logger.error("S3 upload failed for %s", cache_id)
         return {"error": "S3 upload failed", "status": "failed"}
+    audio_url = f"/audio/{cache_id}"
     
     # 4. Save to DynamoDB ON-DEMAND (Only on successful generation)
-    aws_service.save_article_metadata(cache_id, {
-        "article_id": article_id,  # Keep the original root ID
-        "language": target_language, # Tag the language
-        "status": "completed",
-        "title": title,
-        "source": source,
-        "time": time,
-        "summary": insights.get("summary", ""),
-        "key_points": insights.get("key_points", []),
-        "tldr": insights.get("tldr", ""),
-        "script": insights.get("script", ""),
-        "nlp_sentiment": nlp_insights.get("sentiment"),
-        "nlp_key_phrases": nlp_insights.get("key_phrases"),
-        "nlp_entities": nlp_insights.get("entities")
-    }, user_id=user)
+    with span("generate.save"):
+        aws_service.save_article_metadata(cache_id, {
+            "article_id": article_id,  # Keep the original root ID
+            "language": target_language, # Tag the language
+            "status": "completed",
+            "title": title,
+            "source": source,
+            "time": time,
+            "summary": insights.get("summary", ""),
+            "key_points": insights.get("key_points", []),
+            "tldr": insights.get("tldr", ""),
+            "script": insights.get("script", ""),
+            "nlp_sentiment": nlp_insights.get("sentiment"),
+            "nlp_key_phrases": nlp_insights.get("key_phrases"),
+            "nlp_entities": nlp_insights.get("entities"),
+            "audio_variants": stored_variants,
+            "aws_usage": usage_item(usage_ledger.take_podcast(cache_id))
+        }, user_id=user)
     
-    print(f"DEBUG: Success! Audio generated and saved for {cache_id}")
+    logger.info("Audio generated and saved for %s", cache_id)
     return {
         "audio_url": audio_url, 
+        "audio_variants": audio_variant_urls(cache_id, stored_variants),
         "status": "generated",
         "summary": insights.get("summary"),
         "key_points": insights.get("key_points"),
@@ -324,9 +493,81 @@ async def generate_audio(request: Request, article_id: str):
         "language": target_language
     }
 
+@app.post("/api/briefing/{category}")
+async def generate_briefing(request: Request, category: str):
+    """
+    One combined episode of a category's top stories, shared by everyone who asks within the hour.
+    """
+    try:
+        body = await request.json()
+        target_language = body.get("language", "en")
+    except:
+        target_language = "en"
+
+    user = request.state.user
+    if not user:
+        return {"error": "Unauthorized. Please log in.", "status": "failed"}
+    if category not in BRIEFING_CATEGORIES:
+        return {"error": f"Unknown category '{category}'", "status": "failed"}
+    logger.info("Briefing request for %s by %s in %s", category, user, target_language)
+
+    try:
+        # Blocking pipeline (and the wait for another worker's generation) runs off the event loop
+        cache_id, record, status = await run_in_threadpool(get_briefing, RealAWSService(), category, target_language, user)
+    except BriefingUnavailable as e:
+        logger.error("Briefing %s/%s failed: %s", category, target_language, e)
+        return {"error": str(e), "status": "failed"}
+    response = episode_response(cache_id, record, status, target_language)
+    response["title"] = record.get("title")
+    response["stories"] = record.get("stories", [])
+    return response
+
+# When running behind nginx, set AUDIO_ACCEL_REDIRECT (e.g. "/_audio_cache/") so nginx sends
+# the cached file itself with sendfile instead of streaming it through the Python worker.
+AUDIO_ACCEL_REDIRECT = os.getenv("AUDIO_ACCEL_REDIRECT")
+AUDIO_CACHE_CONTROL = "private, max-age=86400"
+
+@app.get("/audio/{article_id}")
+def stream_audio(request: Request, article_id: str, variant: str = "standard"):
+    """Serves podcast audio from the local disk cache, with Range (206), ETag and caching headers"""
+    user = request.state.user
+    if not user:
+        return Response(status_code=401)
+
+    aws_service = RealAWSService()
+    path, content_type = aws_service.get_local_audio_variant(article_id, variant)
+    if not path:
+        return Response(status_code=404)
+
+    if AUDIO_ACCEL_REDIRECT:
+        return Response(headers={
+            "X-Accel-Redirect": AUDIO_ACCEL_REDIRECT + os.path.basename(path),
+            "Content-Type": content_type,
+            "Cache-Control": AUDIO_CACHE_CONTROL
+        })
+
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        # Evicted by another worker since the lookup: fetch it again once
+        path, content_type = aws_service.get_local_audio_variant(article_id, variant)
+        try:
+            stat_result = os.stat(path) if path else None
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None:
+            return Response(status_code=404)
+
+    # FileResponse handles Range/If-Range itself; we only add the If-None-Match short-circuit
+    response = FileResponse(path, media_type=content_type, stat_result=stat_result, headers={"Cache-Control": AUDIO_CACHE_CONTROL})
+    etag = response.headers.get("etag")
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL})
+    return response
+
 @app.post("/api/process_link")
 async def process_link(request: Request, url: str = Form(...)):
-    user = request.cookies.get("session")
+    user = request.state.user
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     article = news_service.extract_article(url)
@@ -354,17 +595,104 @@ async def process_link(request: Request, url: str = Form(...)):
     })
 
 
+def library_entry(item: dict) -> dict:
+    """Compact JSON form of a library record. changed_at covers regeneration and new subscriptions."""
+    article_id = item["ArticleID"]
+    return {
+        "id": article_id,
+        "title": item.get("title"),
+        "source": item.get("source"),
+        "time": item.get("time"),
+        "language": item.get("language"),
+        "tldr": item.get("tldr"),
+        "sentiment": item.get("nlp_sentiment"),
+        "status": item.get("status"),
+        "audio": audio_variant_urls(article_id, item.get("audio_variants")),
+        "changed_at": int(max(item.get("updated_at", 0), item.get("last_subscribed_at", 0)))
+    }
+
+@app.get("/api/library")
+def library_api(request: Request, since: Optional[int] = None):
+    """
+    JSON library for the current user. `since` is the `cursor` from a previous response;
+    only podcasts changed after it are returned (without it, all of them: records saved before
+    change stamps existed have changed_at 0), and `ids` lists the whole library so
+    clients can drop deleted entries. Responses carry a strong ETag (304 on If-None-Match).
+    """
+    user = request.state.user
+    if not user:
+        return JSONResponse({"error": "Unauthorized. Please log in."}, status_code=401)
+
+    aws_service = RealAWSService()
+    entries = [library_entry(item) for item in aws_service.get_user_library_index(user)]
+    entries.sort(key=lambda e: (-e["changed_at"], e["id"]))
+
+    payload = json.dumps({
+        "podcasts": [e for e in entries if since is None or e["changed_at"] > since],
+        "ids": sorted(e["id"] for e in entries),
+        "cursor": max([since or 0] + [e["changed_at"] for e in entries])
+    }, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+    # Hash of the exact bytes sent, so the ETag is strong
+    etag = f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+    # Weak comparison (RFC 9110): the gzip middleware sends this ETag as W/"..."
+    if_none_match = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+SEARCH_SCOPES = ["library", "catalogue"]
+
+@app.get("/api/search")
+def search_api(request: Request, q: str = "", scope: str = "library", entity: str = None, sentiment: str = None,
+               language: str = None, limit: int = 20, offset: int = 0):
+    """
+    Ranked search over the user's library (scope=library) or every generated podcast
+    (scope=catalogue), matching titles, summaries, key points, key phrases, entities and
+    scripts. entity / sentiment / language narrow it to one facet value each.
+    """
+    user = request.state.user
+    if not user:
+        return JSONResponse({"error": "Unauthorized. Please log in."}, status_code=401)
+    if scope not in SEARCH_SCOPES:
+        return JSONResponse({"error": f"scope must be one of {SEARCH_SCOPES}"}, status_code=400)
+
+    aws_service = RealAWSService()
+    with span("search.query"):
+        found = aws_service.search_podcasts(q, user_id=user if scope == "library" else None, entity=entity,
+                                            sentiment=sentiment, language=language, limit=limit, offset=offset)
+    if found is None:
+        return JSONResponse({"error": "Search is unavailable right now."}, status_code=503)
+    for result in found["results"]:
+        result["audio_url"] = f"/audio/{result['id']}"
+    return found
+
 @app.get("/library")
-def library_page(request: Request):
-    user = request.cookies.get("session")
+def library_page(request: Request, q: str = "", scope: str = "library", entity: str = None,
+                 sentiment: str = None, language: str = None):
+    user = request.state.user
     if not user:
         return RedirectResponse(url="/login")
     
     aws_service = RealAWSService()
-    podcasts = aws_service.get_user_library(user)
+    search = None
+    if q or entity or sentiment or language or scope != "library":
+        # Search mode: the index ranks, the (cached) records render the same cards
+        scope = scope if scope in SEARCH_SCOPES else "library"
+        with span("search.query"):
+            search = aws_service.search_podcasts(q, user_id=user if scope == "library" else None, entity=entity,
+                                                 sentiment=sentiment, language=language)
+        search = search or {"results": [], "total": 0, "facets": {}}
+        records = [aws_service.get_article_metadata(result["id"]) for result in search["results"]]
+        podcasts = [record for record in records if record]
+        search.update(query=q, scope=scope, entity=entity, sentiment=sentiment, language=language)
+    else:
+        podcasts = aws_service.get_user_library(user)
     
     return templates.TemplateResponse("library.html", {
         "request": request,
         "user": user,
-        "podcasts": podcasts
+        "search": search,
+        "podcast_cards": fragment_cache.render_all(templates.env, "_library_card.html", podcasts)
     })
@@ -1,9 +1,14 @@
 
 import os
+import logging
 import requests
 import hashlib
 from typing import List, Dict
+from backend.telemetry import trace_methods, record_cache
 
+logger = logging.getLogger(__name__)
+
+@trace_methods("news")
 class NewsService:
     def __init__(self, api_key: str = None):
         # We can still read from the same env var so you don't have to rename it
@@ -16,10 +21,18 @@ class NewsService:
         title_hash = hashlib.md5(title.encode('utf-8')).hexdigest()[:8]
         return f"{prefix}-{title_hash}"
 
+    def _remember(self, article: Dict) -> Dict:
+        """Stores a discovered article, keeping full text already extracted for it (enrichment.py)"""
+        cached = self.cache.get(article["id"])
+        if cached and cached.get("full_text"):
+            article = dict(article, content=cached["content"], full_text=True)
+        self.cache[article["id"]] = article
+        return article
+
     def get_top_headlines(self, category: str = "general", country: str = "us") -> List[Dict]:
         """Fetches top headlines from GNews API"""
         if not self.api_key:
-            print("Warning: No GNews API Key provided. Returning empty list.")
+            logger.warning("No GNews API key provided. Returning empty list.")
             return []
 
         url = f"{self.base_url}/top-headlines"
@@ -32,7 +45,7 @@ class NewsService:
         }
 
         try:
-            print(f"DEBUG: Fetching headlines for category: {category} via GNews")
+            logger.debug("Fetching headlines for category %s via GNews", category)
             response = requests.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -52,12 +65,11 @@ class NewsService:
                     "content": item.get("content") or item.get("description") or "No content available.",
                     "url": item.get("url")
                 }
-                articles.append(article)
-                self.cache[article_id] = article 
+                articles.append(self._remember(article))
             
             return articles
         except Exception as e:
-            print(f"Error fetching news: {e}")
+            logger.error("Fetching headlines failed: %s", e)
             return []
 
     def search_news(self, query: str, language: str = "en", sort_by: str = "relevancy") -> List[Dict]:
@@ -70,11 +82,13 @@ class NewsService:
             "apikey": self.api_key,
             "q": query,
             "lang": language,
-            "max": 10
+            "max": 10,
+            # GNews orders by "relevance" or "publishedAt"
+            "sortby": "publishedAt" if sort_by in ("publishedAt", "newest", "date") else "relevance"
         }
 
         try:
-            print(f"DEBUG: Searching news for: {query} via GNews")
+            logger.debug("Searching news for %r via GNews", query)
             response = requests.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -94,41 +108,47 @@ class NewsService:
                     "content": item.get("content") or item.get("description") or "No content available.",
                     "url": item.get("url")
                 }
-                articles.append(article)
-                self.cache[article_id] = article
+                articles.append(self._remember(article))
             
             return articles
         except Exception as e:
-            print(f"Error searching news: {e}")
+            logger.error("News search failed: %s", e)
             return []
 
     def get_article_by_id(self, article_id: str) -> Dict:
         """Retrieves an article from the current discovery cache"""
-        return self.cache.get(article_id)
+        article = self.cache.get(article_id)
+        record_cache("discovered_article", article is not None)
+        return article
+
+    def fetch_full_text(self, url: str) -> tuple:
+        """Downloads a page and returns its (title, paragraph text); raises on HTTP errors"""
+        from bs4 import BeautifulSoup
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        response = requests.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        
+        soup = BeautifulSoup(response.text, 'lxml')
+        
+        # Remove scripts and styles
+        for script in soup(["script", "style"]):
+            script.extract()
+
+        # Extract title
+        title = soup.find('h1').get_text().strip() if soup.find('h1') else "Custom Article"
+        
+        # Extract content (grab all paragraphs)
+        paragraphs = soup.find_all('p')
+        content = " ".join([p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 20])
+        return title, content
 
     def extract_article(self, url: str) -> Dict:
         """Extracts content from a raw URL using BeautifulSoup"""
-        from bs4 import BeautifulSoup
         try:
-            print(f"DEBUG: Extracting content from: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.extract()
-
-            # Extract title
-            title = soup.find('h1').get_text().strip() if soup.find('h1') else "Custom Article"
-            
-            # Extract content (grab all paragraphs)
-            paragraphs = soup.find_all('p')
-            content = " ".join([p.get_text().strip() for p in paragraphs if len(p.get_text().strip()) > 20])
+            logger.info("Extracting content from %s", url)
+            title, content = self.fetch_full_text(url)
             
             if len(content) < 100:
                 content = "Could not extract sufficient text from this page."
@@ -148,7 +168,7 @@ class NewsService:
             self.cache[article_id] = article
             return article
         except Exception as e:
-            print(f"Extraction Error: {e}")
+            logger.error("Extraction failed for %s: %s", url, e)
             return None
 
 # Singleton instance
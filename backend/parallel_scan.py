@@ -0,0 +1,183 @@
+
+import argparse
+import csv
+import json
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import Attr
+
+# Sentinel pushed onto the page queue by each segment worker when it finishes
+_SEGMENT_DONE = object()
+
+class ParallelScanner:
+    """Runs a DynamoDB Scan across N segments concurrently and streams the pages back"""
+
+    def __init__(self, table, total_segments: int = 4, max_workers: int = None, max_buffered_pages: int = 8):
+        self.table = table
+        self.total_segments = max(1, int(total_segments))
+        # Fewer workers than segments is allowed: the remaining segments simply queue up
+        self.max_workers = max(1, int(max_workers or self.total_segments))
+        # Backpressure: workers block once this many pages are waiting to be consumed
+        self.max_buffered_pages = max(1, int(max_buffered_pages))
+
+    def _scan_segment(self, segment: int, scan_kwargs: dict, pages: queue.Queue, stop: threading.Event):
+        """Walks one segment page by page and pushes every raw response onto the shared queue"""
+        try:
+            kwargs = dict(scan_kwargs)
+            if self.total_segments > 1:
+                kwargs["Segment"] = segment
+                kwargs["TotalSegments"] = self.total_segments
+
+            while not stop.is_set():
+                # Table.scan is a stateless call on the (thread-safe) underlying client,
+                # so sharing the Table between segment workers is fine.
+                response = self.table.scan(**kwargs)
+                if not self._put(pages, response, stop):
+                    return
+                if "LastEvaluatedKey" not in response:
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            self._put(pages, e, stop)
+        finally:
+            self._put(pages, _SEGMENT_DONE, stop)
+
+    def _put(self, pages: queue.Queue, value, stop: threading.Event) -> bool:
+        """Blocking put that gives up once the consumer has gone away"""
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def iter_responses(self, **scan_kwargs):
+        """Yields raw Scan responses from all segments in completion order"""
+        pages = queue.Queue(maxsize=self.max_buffered_pages)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ddb-scan")
+        try:
+            for segment in range(self.total_segments):
+                executor.submit(self._scan_segment, segment, scan_kwargs, pages, stop)
+
+            remaining = self.total_segments
+            while remaining:
+                value = pages.get()
+                if value is _SEGMENT_DONE:
+                    remaining -= 1
+                elif isinstance(value, Exception):
+                    raise value
+                else:
+                    yield value
+        finally:
+            # Also reached when the caller stops iterating early: unblock and release the workers
+            stop.set()
+            executor.shutdown(wait=False)
+
+    def iter_pages(self, **scan_kwargs):
+        """Yields one list of items per Scan page"""
+        for response in self.iter_responses(**scan_kwargs):
+            yield response.get("Items", [])
+
+    def iter_items(self, **scan_kwargs):
+        """Yields every matching item, one at a time"""
+        for page in self.iter_pages(**scan_kwargs):
+            yield from page
+
+    def scan_all(self, **scan_kwargs) -> list:
+        """Materializes every matching item into a list"""
+        return list(self.iter_items(**scan_kwargs))
+
+    def count(self, **scan_kwargs) -> int:
+        """Live item count, summed across all segments"""
+        scan_kwargs["Select"] = "COUNT"
+        return sum(response.get("Count", 0) for response in self.iter_responses(**scan_kwargs))
+
+
+# --- Catalogue Export CLI ---
+# Usage: python -m backend.parallel_scan --format csv --output podcasts.csv --segments 8
+
+EXPORT_FIELDS = [
+    "ArticleID", "article_id", "language", "status", "title", "source", "time",
+    "tldr", "summary", "nlp_sentiment", "nlp_key_phrases", "nlp_entities", "subscribers"
+]
+
+def _to_plain(value):
+    """Converts DynamoDB types (Decimal, sets) into JSON friendly values"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(_to_plain(v) for v in value)
+    if isinstance(value, list):
+        return [_to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+def _csv_row(item: dict) -> dict:
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = _to_plain(item.get(field))
+        if isinstance(value, list):
+            value = "; ".join(str(v) for v in value)
+        row[field] = value
+    return row
+
+def export_catalogue(scanner: ParallelScanner, out, fmt: str = "jsonl", include_all: bool = False) -> int:
+    """Streams the podcast table to JSONL or CSV without holding it in memory. Returns rows written."""
+    scan_kwargs = {}
+    if not include_all:
+        scan_kwargs["FilterExpression"] = Attr("status").eq("completed")
+
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+
+    written = 0
+    for item in scanner.iter_items(**scan_kwargs):
+        if writer:
+            writer.writerow(_csv_row(item))
+        else:
+            out.write(json.dumps(_to_plain(item), ensure_ascii=False) + "\n")
+        written += 1
+    return written
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from backend.logs import configure_logging
+    from backend.real_aws import RealAWSService
+    configure_logging(name="")
+
+    parser = argparse.ArgumentParser(description="Export the Papercast catalogue using a parallel DynamoDB scan")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", default="-", help="Output file path ('-' for stdout)")
+    parser.add_argument("--segments", type=int, default=None, help="Total scan segments (default: SCAN_TOTAL_SEGMENTS)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent segment workers (default: one per segment)")
+    parser.add_argument("--all", action="store_true", help="Include records that are not 'completed'")
+    args = parser.parse_args()
+
+    aws_service = RealAWSService()
+    if aws_service.config["storage_backend"] != "aws":
+        print("The catalogue export scans DynamoDB; STORAGE_BACKEND is not 'aws'", file=sys.stderr)
+        sys.exit(1)
+    scanner = ParallelScanner(
+        aws_service.metadata.table,
+        total_segments=args.segments or aws_service.config["scan_segments"],
+        max_workers=args.workers or aws_service.config["scan_workers"]
+    )
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        rows = export_catalogue(scanner, out, fmt=args.format, include_all=args.all)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {rows} records ({args.format}) using {scanner.total_segments} segments", file=sys.stderr)
@@ -5,49 +5,344 @@ import os
 import hmac
 import hashlib
 import base64
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape as xml_escape
 from botocore.exceptions import ClientError
+from backend.ttl_cache import TTLCache
+from backend.subscriber_queue import subscriber_queue
+from backend.search_index import PodcastSearchIndex, IndexSyncer
+from backend.storage import STORAGE_BACKENDS, S3AudioStore, LocalAudioStore, DynamoMetadataStore, SQLiteMetadataStore
+from backend.telemetry import trace_methods, with_trace, record_cache, FALLBACKS, BEDROCK_JSON_FAILURES
+from backend.aws_usage import instrument_client, cost_report, worker_report
+from backend.aws_limits import service_limits, ServiceBusy, LIMITED_CLIENT_CONFIG
+from backend.voices import voice_capabilities
 
+logger = logging.getLogger(__name__)
+
+# Per-worker read-through cache of completed podcast records (keyed by ArticleID).
+# Other workers see changes after at most one TTL.
+completed_podcast_cache = TTLCache(
+    ttl=float(os.getenv("PODCAST_CACHE_TTL", "300")),
+    max_size=int(os.getenv("PODCAST_CACHE_SIZE", "1024"))
+)
+
+# Per-worker snapshot cache of admin user directory pages, keyed by (filters, page token).
+# Cleared by toggle_user_status / sign_up_user; other workers catch up within one TTL.
+user_directory_cache = TTLCache(
+    ttl=float(os.getenv("USER_DIRECTORY_CACHE_TTL", "30")),
+    max_size=256
+)
+
+# Attributes returned by the JSON library API (scripts and summaries stay on the HTML page)
+LIBRARY_INDEX_FIELDS = ["ArticleID", "title", "source", "time", "language", "tldr", "nlp_sentiment", "audio_variants", "status", "updated_at", "last_subscribed_at"]
+
+BEDROCK_MODEL_ID = "amazon.nova-micro-v1:0"
+
+# Comprehend's Batch* APIs accept at most 25 documents per call
+COMPREHEND_BATCH_SIZE = 25
+
+# Shared by the single-article and briefing prompts
+DIALOGUE_RULES = (
+    "The 'script' part must be a professional dialogue between two people: [HOST] and [EXPERT].\n"
+    "- [HOST]: Inquisitive, sets the stage, and asks the expert to clarify.\n"
+    "- [EXPERT]: Explains the news in simple, precise, and authoritative terms.\n\n"
+)
+JSON_RULES = (
+    "CRITICAL: Do not include ANY text before or after the JSON. \n"
+    "Ensure all quotes inside strings are correctly escaped with a backslash (\\\"). \n"
+    "Do not include raw newlines within JSON string values; use '\\n' instead.\n\n"
+)
+
+# Briefings send every story in one prompt: each article is cut to this many characters,
+# and the reply gets room for a dialogue that covers all of them
+BRIEFING_ARTICLE_CHARS = int(os.getenv("BRIEFING_ARTICLE_CHARS", "2500"))
+BRIEFING_MAX_TOKENS = 2000
+
+# Articles longer than SUMMARY_CHUNK_THRESHOLD characters are summarized map-reduce style:
+# chunks of about SUMMARY_CHUNK_CHARS are condensed to notes concurrently, then one call writes the insights
+SUMMARY_CHUNK_THRESHOLD = int(os.getenv("SUMMARY_CHUNK_THRESHOLD", "12000"))
+SUMMARY_CHUNK_CHARS = int(os.getenv("SUMMARY_CHUNK_CHARS", "6000"))
+SUMMARY_NOTES_MAX_TOKENS = 400
+# Concurrent map calls per article; keep it at or below the bedrock-runtime AI_CONCURRENCY ceiling,
+# or queued chunks count against AI_QUEUE_TIMEOUT
+SUMMARY_MAP_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "4"))
+
+# Cognito UserStatus values accepted by the admin directory filter
+COGNITO_USER_STATUSES = ["CONFIRMED", "UNCONFIRMED", "FORCE_CHANGE_PASSWORD", "RESET_REQUIRED", "ARCHIVED", "COMPROMISED", "UNKNOWN", "EXTERNAL_PROVIDER"]
+
+# Audio encodings produced per episode. "standard" is always generated and keeps the
+# historical "<id>.mp3" key; the others are stored as "<id>.<variant>.<ext>".
+# Select extra variants with AUDIO_VARIANTS (comma separated, e.g. "mobile,mobile_ogg"). None by
+# default: each extra variant is another full Polly synthesis per episode.
+AUDIO_VARIANT_SPECS = {
+    "standard": {"format": "mp3", "sample_rate": None, "ext": "mp3", "content_type": "audio/mpeg"},
+    "mobile": {"format": "mp3", "sample_rate": "16000", "ext": "mp3", "content_type": "audio/mpeg"},
+    "mobile_ogg": {"format": "ogg_vorbis", "sample_rate": "16000", "ext": "ogg", "content_type": "audio/ogg"},
+}
+AUDIO_VARIANTS = ["standard"] + [
+    v.strip() for v in os.getenv("AUDIO_VARIANTS", "").split(",")
+    if v.strip() in AUDIO_VARIANT_SPECS and v.strip() != "standard"
+]
+
+# Polly requests in flight per synthesized encoding (long scripts and briefings have dozens of segments)
+POLLY_SEGMENT_WORKERS = int(os.getenv("POLLY_SEGMENT_WORKERS", "4"))
+
+# SynthesizeSpeech limits: 3000 billed characters and 6000 characters including SSML tags per request
+POLLY_MAX_CHARS = 3000
+POLLY_MAX_INPUT_CHARS = 6000
+# Pause between fragments of one speaker that are packed into a single SSML request
+POLLY_FRAGMENT_BREAK = '<break time="400ms"/>'
+
+def audio_file_name(article_id: str, variant: str = "standard") -> str:
+    """S3 / disk cache key of one encoding of an episode"""
+    if variant not in AUDIO_VARIANT_SPECS or variant == "standard":
+        return f"{article_id}.mp3"
+    return f"{article_id}.{variant}.{AUDIO_VARIANT_SPECS[variant]['ext']}"
+
+def audio_file_names(article_id: str) -> list:
+    """Every key an episode may have in S3 (used for deletes)"""
+    return [audio_file_name(article_id, variant) for variant in AUDIO_VARIANT_SPECS]
+
+_aws_config = None
+
+def chunk_text(text: str, max_chars: int) -> list:
+    """Splits text into chunks of at most max_chars, breaking at paragraphs, then sentences, then words"""
+    import re
+    pieces = []  # (text, separator from the previous piece)
+    for paragraph in re.split(r'\n\s*\n', text):
+        if len(paragraph) <= max_chars:
+            pieces.append((paragraph, "\n\n"))
+            continue
+        separator = "\n\n"
+        for sentence in re.split(r'(?<=[.!?])\s+', paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append((sentence[:cut], separator))
+                sentence = sentence[cut:].lstrip()
+                separator = " "
+            pieces.append((sentence, separator))
+            separator = " "
+
+    chunks, current = [], ""
+    for piece, separator in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def plan_speech_requests(segments: list, max_chars: int = POLLY_MAX_CHARS) -> list:
+    """
+    Packs [(text, voice)] script fragments into as few Polly requests as possible: adjacent
+    fragments of the same voice are merged into one SSML request (with a short <break> between
+    them) and fragments over the limit are split at sentence boundaries.
+    Returns [(text, voice, text_type)] in script order.
+    """
+    packed = []
+    for text, voice in segments:
+        for piece in chunk_text(text, max_chars):
+            last = packed[-1] if packed else None
+            ssml_chars = len(xml_escape(piece)) + len(POLLY_FRAGMENT_BREAK)
+            if (last and last["voice"] == voice and last["chars"] + len(piece) <= max_chars
+                    and last["ssml_chars"] + ssml_chars <= POLLY_MAX_INPUT_CHARS - len("<speak></speak>")):
+                last["pieces"].append(piece)
+                last["chars"] += len(piece)
+                last["ssml_chars"] += ssml_chars
+            else:
+                packed.append({"voice": voice, "pieces": [piece], "chars": len(piece), "ssml_chars": ssml_chars})
+
+    requests = []
+    for request in packed:
+        if len(request["pieces"]) == 1:
+            requests.append((request["pieces"][0], request["voice"], "text"))
+        else:
+            ssml = "<speak>" + POLLY_FRAGMENT_BREAK.join(xml_escape(piece) for piece in request["pieces"]) + "</speak>"
+            requests.append((ssml, request["voice"], "ssml"))
+    return requests
+
+def load_aws_config() -> dict:
+    """
+    Builds the service configuration from environment variables, then infrastructure/aws_config.json.
+    Read once per process; every RealAWSService shares the result.
+    """
+    global _aws_config
+    if _aws_config is not None:
+        return _aws_config
+
+    # 1. Start with defaults or environment variables
+    config = {
+        "s3_bucket": os.getenv("S3_BUCKET_NAME"),
+        "dynamodb_table": os.getenv("DYNAMODB_TABLE_NAME", "PapercastCache"),
+        "user_pool_id": os.getenv("COGNITO_USER_POOL_ID"),
+        "client_id": os.getenv("COGNITO_CLIENT_ID"),
+        "client_secret": os.getenv("COGNITO_CLIENT_SECRET"),
+        "region": os.getenv("AWS_REGION", "us-east-1"),
+        "aws_access_key": os.getenv("AWS_ACCESS_KEY_ID"),
+        "aws_secret_key": os.getenv("AWS_SECRET_ACCESS_KEY"),
+        # Parallel Scan tuning for whole-table operations (library, admin, purge, exports)
+        "scan_segments": os.getenv("SCAN_TOTAL_SEGMENTS"),
+        "scan_workers": os.getenv("SCAN_MAX_WORKERS"),
+        # Where audio and podcast records live (see storage.py): "aws" (S3 + DynamoDB) or "local"
+        "storage_backend": os.getenv("STORAGE_BACKEND"),
+        "local_audio_dir": os.getenv("LOCAL_AUDIO_DIR"),
+        "sqlite_path": os.getenv("SQLITE_PATH"),
+        # SQLite FTS5 index over completed podcasts (see search_index.py)
+        "search_index_path": os.getenv("SEARCH_INDEX_PATH")
+    }
+
+    # 2. If a local config file exists, use it to fill in blanks (backward compatibility)
+    config_path = "infrastructure/aws_config.json"
+    if os.path.exists(config_path):
+        with open(config_path, "r") as f:
+            file_config = json.load(f)
+            for key, value in file_config.items():
+                if not config.get(key): # Only fill if environment variable is NOT set
+                    config[key] = value
+
+    config["scan_segments"] = int(config.get("scan_segments") or 4)
+    config["scan_workers"] = int(config.get("scan_workers") or config["scan_segments"])
+    config["storage_backend"] = config.get("storage_backend") or "aws"
+    if config["storage_backend"] not in STORAGE_BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of {STORAGE_BACKENDS}, not {config['storage_backend']!r}")
+    config["local_audio_dir"] = config.get("local_audio_dir") or "/var/lib/papercast/audio"
+    config["sqlite_path"] = config.get("sqlite_path") or "/var/lib/papercast/papercast.db"
+    config["search_index_path"] = config.get("search_index_path") or "/var/lib/papercast/search.db"
+    _aws_config = config
+    return config
+
+# Services RealAWSService talks to through boto3 clients
+AWS_CLIENT_SERVICES = ["s3", "cognito-idp", "bedrock-runtime", "polly", "comprehend", "translate"]
+
+# Per-process boto3 clients, shared by every RealAWSService (clients are thread-safe and cost
+# tens of milliseconds each to build). Keyed by pid so a forked worker never reuses the parent's.
+_aws_clients = {}
+_aws_clients_pid = None
+_aws_clients_lock = threading.RLock()
+
+def _session_kwargs(config: dict) -> dict:
+    session_kwargs = {
+        "region_name": config["region"]
+    }
+    if config["aws_access_key"] and config["aws_secret_key"]:
+        session_kwargs["aws_access_key_id"] = config["aws_access_key"]
+        session_kwargs["aws_secret_access_key"] = config["aws_secret_key"]
+    return session_kwargs
+
+def _shared(key, factory):
+    global _aws_clients, _aws_clients_pid
+    with _aws_clients_lock:
+        if _aws_clients_pid != os.getpid():
+            _aws_clients, _aws_clients_pid = {}, os.getpid()
+        if key not in _aws_clients:
+            _aws_clients[key] = factory()
+        return _aws_clients[key]
+
+def aws_client(service_name: str):
+    """
+    Shared boto3 client for this process, created on first use (with usage accounting hooks, see
+    aws_usage.py). Clients of rate-limited AI services leave retries to their limiter (aws_limits.py).
+    """
+    def build():
+        config = LIMITED_CLIENT_CONFIG if service_limits.manages(service_name) else None
+        return instrument_client(boto3.client(service_name, config=config, **_session_kwargs(load_aws_config())))
+    return _shared(("client", service_name), build)
+
+def aws_table():
+    """Shared DynamoDB Table resource for the configured table"""
+    def build():
+        dynamodb = boto3.resource("dynamodb", **_session_kwargs(load_aws_config()))
+        instrument_client(dynamodb.meta.client)
+        return dynamodb.Table(load_aws_config()["dynamodb_table"])
+    return _shared(("table",), build)
+
+def audio_store():
+    """Shared audio store for the configured STORAGE_BACKEND"""
+    def build():
+        config = load_aws_config()
+        if config["storage_backend"] == "local":
+            return LocalAudioStore(config["local_audio_dir"])
+        return S3AudioStore(aws_client("s3"), config["s3_bucket"])
+    return _shared(("audio_store",), build)
+
+def metadata_store():
+    """Shared podcast record store for the configured STORAGE_BACKEND"""
+    def build():
+        config = load_aws_config()
+        if config["storage_backend"] == "local":
+            return SQLiteMetadataStore(config["sqlite_path"])
+        return DynamoMetadataStore(aws_table(), scan_segments=config["scan_segments"], scan_workers=config["scan_workers"])
+    return _shared(("metadata_store",), build)
+
+def search_index():
+    """
+    Shared podcast search index (one SQLite file per host, shared by its workers). Its syncer
+    backfills an empty index and picks up writes made on other hosts (see IndexSyncer).
+    """
+    def build():
+        index = PodcastSearchIndex(load_aws_config()["search_index_path"])
+        IndexSyncer(index, metadata_store()).start()
+        return index
+    return _shared(("search_index",), build)
+
+def preload_service_models():
+    """
+    Loads botocore's service models and endpoint data into the default session without creating
+    shared clients or resolving credentials. Called in the gunicorn master (preload_app) so the
+    forked workers share the parsed models copy-on-write instead of each loading them.
+    """
+    preload_kwargs = {
+        "region_name": load_aws_config()["region"],
+        # Explicit placeholder keys stop the credential chain (e.g. the EC2 metadata service) from running
+        "aws_access_key_id": "preload",
+        "aws_secret_access_key": "preload"
+    }
+    for service_name in AWS_CLIENT_SERVICES:
+        boto3.client(service_name, **preload_kwargs)
+    boto3.resource("dynamodb", **preload_kwargs)
+
+@trace_methods("aws")
 class RealAWSService:
     def __init__(self):
-        # 1. Start with defaults or environment variables
-        self.config = {
-            "s3_bucket": os.getenv("S3_BUCKET_NAME"),
-            "dynamodb_table": os.getenv("DYNAMODB_TABLE_NAME", "PapercastCache"),
-            "user_pool_id": os.getenv("COGNITO_USER_POOL_ID"),
-            "client_id": os.getenv("COGNITO_CLIENT_ID"),
-            "client_secret": os.getenv("COGNITO_CLIENT_SECRET"),
-            "region": os.getenv("AWS_REGION", "us-east-1"),
-            "aws_access_key": os.getenv("AWS_ACCESS_KEY_ID"),
-            "aws_secret_key": os.getenv("AWS_SECRET_ACCESS_KEY")
-        }
+        self.config = load_aws_config()
 
-        # 2. If a local config file exists, use it to fill in blanks (backward compatibility)
-        config_path = "infrastructure/aws_config.json"
-        if os.path.exists(config_path):
-            with open(config_path, "r") as f:
-                file_config = json.load(f)
-                for key, value in file_config.items():
-                    if not self.config.get(key): # Only fill if environment variable is NOT set
-                        self.config[key] = value
-
-        # 3. Initialize clients explicitly with credentials
-        session_kwargs = {
-            "region_name": self.config["region"]
-        }
-        if self.config["aws_access_key"] and self.config["aws_secret_key"]:
-            session_kwargs["aws_access_key_id"] = self.config["aws_access_key"]
-            session_kwargs["aws_secret_access_key"] = self.config["aws_secret_key"]
-
-        self.s3 = boto3.client("s3", **session_kwargs)
-        self.dynamodb = boto3.resource("dynamodb", **session_kwargs)
-        self.table = self.dynamodb.Table(self.config["dynamodb_table"])
-        self.cognito = boto3.client("cognito-idp", **session_kwargs)
-        
-        self.bedrock = boto3.client("bedrock-runtime", **session_kwargs)
-        self.polly = boto3.client("polly", **session_kwargs)
+        # Clients and stores are process-wide (see aws_client), so constructing a service per request is cheap
+        self.audio = audio_store()
+        self.metadata = metadata_store()
+        subscriber_queue.bind(self.metadata)
+
+    @property
+    def s3(self):
+        return aws_client("s3")
+
+    @property
+    def cognito(self):
+        return aws_client("cognito-idp")
+
+    @property
+    def bedrock(self):
+        return aws_client("bedrock-runtime")
+
+    @property
+    def polly(self):
+        return aws_client("polly")
+
+    @property
+    def comprehend(self):
+        return aws_client("comprehend")
 
-        self.comprehend = boto3.client("comprehend", **session_kwargs)
-        self.translate = boto3.client("translate", **session_kwargs)
+    @property
+    def translate(self):
+        return aws_client("translate")
 
     def _get_secret_hash(self, username):
         """Calculates the HMAC-SHA256 secret hash for Cognito"""
@@ -62,121 +357,149 @@ class RealAWSService:
         ).digest()
         return base64.b64encode(dig).decode()
 
-    # --- S3 (File Storage) ---
-    def upload_audio(self, file_content: bytes, file_name: str) -> str:
-        """Uploads audio file to S3 and returns the URL"""
-        try:
-            print(f"DEBUG: Uploading {file_name} to S3 bucket {self.config['s3_bucket']}")
-            self.s3.put_object(
-                Bucket=self.config["s3_bucket"],
-                Key=file_name,
-                Body=file_content,
-                ContentType="audio/mpeg"
-            )
-            # Generating a pre-signed URL
-            url = self.s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.config['s3_bucket'], 'Key': file_name},
-                ExpiresIn=3600
-            )
-            print(f"DEBUG: S3 Upload success: {url[:50]}...")
-            return url
-        except ClientError as e:
-            print(f"DEBUG ERROR: S3 Upload Error: {e}")
+    # --- Audio storage (S3, or the local filesystem) ---
+    def upload_audio(self, file_content: bytes, file_name: str, content_type: str = "audio/mpeg") -> str:
+        """Stores an audio file and returns its URL (None when the write failed)"""
+        if not self.audio.put(file_name, file_content, content_type):
             return None
+        return self.audio.url(file_name)
+
+    def upload_audio_variants(self, cache_id: str, audio_variants: dict) -> dict:
+        """
+        Uploads every synthesized encoding of an episode. Returns the audio_variants map stored on
+        the record ({} when the "standard" upload failed; failed optional variants are left out).
+        """
+        stored_variants = {}
+        for variant, audio_bytes in audio_variants.items():
+            spec = AUDIO_VARIANT_SPECS[variant]
+            file_name = audio_file_name(cache_id, variant)
+            if not self.upload_audio(audio_bytes, file_name, content_type=spec["content_type"]):
+                if variant == "standard":
+                    return {}
+                continue
+            stored_variants[variant] = {
+                "key": file_name,
+                "format": spec["format"],
+                "sample_rate": spec["sample_rate"] or "default",
+                "bytes": len(audio_bytes)
+            }
+        return stored_variants
+
+    def presign_audio_url(self, file_name: str) -> str:
+        """Returns a playable URL without checking the store (S3: a cached pre-signed URL)"""
+        return self.audio.url(file_name)
 
     def get_audio_url(self, file_name: str) -> str:
-        """Check if file exists and return a pre-signed URL"""
-        try:
-            self.s3.head_object(Bucket=self.config["s3_bucket"], Key=file_name)
-            url = self.s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.config['s3_bucket'], 'Key': file_name},
-                ExpiresIn=3600
-            )
-            return url
-        except ClientError:
-            return None
+        """Check if file exists and return its URL"""
+        return self.audio.checked_url(file_name)
 
-    # --- DynamoDB (Metadata Cache) ---
+    def get_local_audio_path(self, file_name: str) -> str:
+        """Local path of the audio file (S3: in the disk cache, downloading it on a miss)"""
+        return self.audio.local_path(file_name)
+
+    def get_local_audio_variant(self, article_id: str, variant: str = "standard") -> tuple:
+        """(path, content_type) for the requested encoding, falling back to the standard mp3 if it doesn't exist"""
+        if variant in AUDIO_VARIANT_SPECS and variant != "standard":
+            path = self.get_local_audio_path(audio_file_name(article_id, variant))
+            if path:
+                return path, AUDIO_VARIANT_SPECS[variant]["content_type"]
+        return self.get_local_audio_path(audio_file_name(article_id)), "audio/mpeg"
+
+    # --- Podcast records (DynamoDB, or SQLite) ---
     def get_article_metadata(self, article_id: str):
-        """Fetch metadata from DynamoDB"""
+        """Fetch a podcast record (read-through cached for completed podcasts)"""
+        cached = completed_podcast_cache.get(article_id)
+        record_cache("podcast_record", cached is not None)
+        if cached:
+            return dict(cached)
+
         try:
-            response = self.table.get_item(Key={'ArticleID': article_id})
-            return response.get('Item')
-        except ClientError as e:
-            print(f"DEBUG ERROR: DynamoDB Get Error: {e}")
+            item = self.metadata.get(article_id)
+        except Exception as e:
+            logger.error("Metadata get failed for %s: %s", article_id, e)
             return None
 
+        # Only finished podcasts are immutable enough to cache
+        if item and item.get('status') == 'completed':
+            completed_podcast_cache.set(article_id, dict(item))
+        return item
+
     def save_article_metadata(self, article_id: str, data: dict, user_id: str = "system"):
-        """Save/Update metadata to DynamoDB, injecting the user into the subscribers Set"""
+        """Save/Update a podcast record (upsert), injecting the user into the subscribers Set"""
         try:
-            print(f"DEBUG: Saving/Updating metadata for {article_id} to DynamoDB")
-            
-            # Using UpdateItem allows us to Upsert. 
-            # If the record doesn't exist, it creates it.
-            # If it does exist, it appends the user to the subscribers String Set (SS).
-            
-            # 1. Build the UpdateExpression dynamically from the data dict
-            update_expression = "SET "
-            expression_attribute_values = {
-                ":user": {user_id} # The curly braces make this a Python Set, which Boto3 translates to DynamoDB SS (String Set)
-            }
-            expression_attribute_names = {}
+            logger.debug("Saving metadata for %s", article_id)
             
-            set_parts = []
-            for k, v in data.items():
-                if v is not None:
-                    # We use ExpressionAttributeNames to avoid conflict with reserved DynamoDB words (like 'status', 'source', 'time')
-                    attr_name = f"#{k}"
-                    attr_val = f":{k}"
-                    
-                    expression_attribute_names[attr_name] = k
-                    expression_attribute_values[attr_val] = v
-                    set_parts.append(f"{attr_name} = {attr_val}")
-                    
-            update_expression += ", ".join(set_parts)
-            
-            # Add the ADD clause for the subscribers String Set
-            update_expression += " ADD subscribers :user"
-            
-            self.table.update_item(
-                Key={'ArticleID': article_id},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
-            print("DEBUG: DynamoDB Update success")
-        except ClientError as e:
-            print(f"DEBUG ERROR: DynamoDB Update Error: {e}")
+            # Stamp content changes so caches keyed on the record version (rendered fragments) roll over
+            if data:
+                data = dict(data, updated_at=int(time.time() * 1000))
+            self.metadata.update(article_id, data or {}, user_id)
+            logger.debug("Metadata update succeeded for %s", article_id)
+
+            # Keep the completed-podcast cache coherent with what we just wrote
+            if any(v is not None for v in (data or {}).values()):
+                completed_podcast_cache.delete(article_id)
+                if data.get("status"):
+                    self._update_search_index("index", article_id, data, {user_id})
+            else:
+                self._cache_add_subscriber(article_id, user_id)
+                self._update_search_index("add_subscribers", article_id, {user_id})
+        except Exception as e:
+            logger.error("Metadata update failed for %s: %s", article_id, e)
+
+    def _update_search_index(self, operation: str, *args):
+        # Search is secondary: a failed index write is logged, never failed to the caller
+        try:
+            getattr(search_index(), operation)(*args)
+        except Exception as e:
+            logger.warning("Search index %s failed: %s", operation, e)
+
+    def claim_generation(self, article_id: str, lease_seconds: int = 300) -> bool:
+        """
+        Marks a record 'processing' so only one worker generates it. Fails when it is already
+        completed or another claim is younger than lease_seconds (a crashed worker's claim expires).
+        """
+        try:
+            return self.metadata.claim(article_id, lease_seconds)
+        except Exception as e:
+            logger.error("Metadata claim failed for %s: %s", article_id, e)
+            return False
+
+    def release_generation(self, article_id: str):
+        """Drops a 'processing' claim after a failed generation so the next request can retry at once"""
+        try:
+            self.metadata.release(article_id)
+        except Exception as e:
+            logger.error("Metadata claim release failed for %s: %s", article_id, e)
+
+    def _cache_add_subscriber(self, article_id: str, user_id: str):
+        cached = completed_podcast_cache.get(article_id)
+        if cached:
+            cached = dict(cached)
+            cached['subscribers'] = set(cached.get('subscribers') or ()) | {user_id}
+            completed_podcast_cache.set(article_id, cached)
+
+    def add_subscriber(self, article_id: str, user_id: str):
+        """Queues the user for the subscribers String Set; written off the request path in coalesced batches"""
+        subscriber_queue.add(article_id, user_id)
+        # Reflect it locally right away so repeat plays don't queue it again
+        self._cache_add_subscriber(article_id, user_id)
+        self._update_search_index("add_subscribers", article_id, {user_id})
 
     def get_user_library(self, user_id: str):
         """Fetches all podcasts generated by a specific user"""
         try:
-            # We use CONTAINS to check if the user is in the mathematical String Set of subscribers
-            response = self.table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('subscribers').contains(user_id)
-            )
-            items = response.get('Items', [])
-            
-            # Handle pagination
-            while 'LastEvaluatedKey' in response:
-                response = self.table.scan(
-                    FilterExpression=boto3.dynamodb.conditions.Attr('subscribers').contains(user_id),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response.get('Items', []))
-            
-            # Inject fresh pre-signed URLs
-            for item in items:
-                if 'ArticleID' in item:
-                    fresh_url = self.get_audio_url(f"{item['ArticleID']}.mp3")
-                    if fresh_url:
-                        item['audio_url'] = fresh_url
-                        
-            return items
+            # DynamoDB: parallel scan filtered on the subscribers String Set; SQLite: indexed by user
+            return self.metadata.scan(user_id=user_id)
+        except Exception as e:
+            logger.error("Library scan failed: %s", e)
+            return []
+
+    def get_user_library_index(self, user_id: str):
+        """Compact library listing (no scripts/summaries) for the JSON library API"""
+        try:
+            return self.metadata.scan(user_id=user_id, fields=LIBRARY_INDEX_FIELDS)
         except Exception as e:
-            print(f"DynamoDB Library Error: {e}")
+            logger.error("Library index scan failed: %s", e)
             return []
 
     # --- AI Services (Comprehend, Bedrock, Polly) ---
@@ -188,18 +511,18 @@ class RealAWSService:
             # Production apps should chunk the text and aggregate the results.
             text_to_analyze = text[:4800] 
             
-            print("DEBUG: Sending text to Comprehend...")
+            logger.debug("Sending %d characters to Comprehend", len(text_to_analyze))
             
             # 1. Sentiment
-            sentiment_resp = self.comprehend.detect_sentiment(Text=text_to_analyze, LanguageCode='en')
+            sentiment_resp = service_limits.call("comprehend", self.comprehend.detect_sentiment, Text=text_to_analyze, LanguageCode='en')
             sentiment = sentiment_resp['Sentiment']
             
             # 2. Key Phrases (Top 5)
-            phrases_resp = self.comprehend.detect_key_phrases(Text=text_to_analyze, LanguageCode='en')
+            phrases_resp = service_limits.call("comprehend", self.comprehend.detect_key_phrases, Text=text_to_analyze, LanguageCode='en')
             key_phrases = [p['Text'] for p in phrases_resp['KeyPhrases'][:5]]
             
             # 3. Entities (Top 5 Unique Persons/Organizations/Locations)
-            entities_resp = self.comprehend.detect_entities(Text=text_to_analyze, LanguageCode='en')
+            entities_resp = service_limits.call("comprehend", self.comprehend.detect_entities, Text=text_to_analyze, LanguageCode='en')
             entities = []
             seen = set()
             for e in entities_resp['Entities']:
@@ -215,108 +538,171 @@ class RealAWSService:
                 "entities": entities
             }
         except Exception as e:
-            print(f"Comprehend Error: {e}")
+            logger.error("Comprehend failed: %s", e)
             return {
                 "sentiment": "UNKNOWN",
                 "key_phrases": [],
                 "entities": []
             }
             
+    def analyze_texts_comprehend(self, texts: list) -> list:
+        """
+        analyze_text_comprehend for several documents with Comprehend's batch APIs: three calls
+        for up to 25 texts instead of three per text. Returns one insights dict per text, in order.
+        """
+        results = [{"sentiment": "UNKNOWN", "key_phrases": [], "entities": []} for _ in texts]
+        for offset in range(0, len(texts), COMPREHEND_BATCH_SIZE):
+            batch = [text[:4800] for text in texts[offset:offset + COMPREHEND_BATCH_SIZE]]
+            try:
+                sentiment_resp = service_limits.call("comprehend", self.comprehend.batch_detect_sentiment, TextList=batch, LanguageCode='en')
+                for r in sentiment_resp['ResultList']:
+                    results[offset + r['Index']]["sentiment"] = r['Sentiment']
+
+                phrases_resp = service_limits.call("comprehend", self.comprehend.batch_detect_key_phrases, TextList=batch, LanguageCode='en')
+                for r in phrases_resp['ResultList']:
+                    results[offset + r['Index']]["key_phrases"] = [p['Text'] for p in r['KeyPhrases'][:5]]
+
+                entities_resp = service_limits.call("comprehend", self.comprehend.batch_detect_entities, TextList=batch, LanguageCode='en')
+                for r in entities_resp['ResultList']:
+                    entities, seen = [], set()
+                    for e in r['Entities']:
+                        if e['Type'] in ['PERSON', 'ORGANIZATION', 'LOCATION'] and e['Text'] not in seen:
+                            entities.append(f"{e['Text']} ({e['Type']})")
+                            seen.add(e['Text'])
+                            if len(entities) >= 5:
+                                break
+                    results[offset + r['Index']]["entities"] = entities
+            except Exception as e:
+                logger.error("Comprehend batch failed: %s", e)
+        return results
+
     def translate_text(self, text: str, target_language: str = "en") -> str:
         """Translates text to the target language using Amazon Translate."""
         if target_language in ["en", "en-IN"] or not text:
             return text
             
         try:
-            print(f"DEBUG: Translating text to {target_language}...")
+            logger.debug("Translating %d characters to %s", len(text), target_language)
             
             # Translate has a 10,000 byte limit, which is plenty for our scripts/summaries
-            response = self.translate.translate_text(
+            response = service_limits.call("translate", self.translate.translate_text, 
                 Text=text,
                 SourceLanguageCode="en", # Assuming English source from our Bedrock prompt
                 TargetLanguageCode=target_language
             )
             return response.get('TranslatedText', text)
+        except ServiceBusy:
+            # An English script in a translated podcast is worse than asking the user to retry
+            raise
         except Exception as e:
-            print(f"Translate Error: {e}")
+            logger.error("Translate to %s failed: %s", target_language, e)
             return text
             
+    def translate_insights(self, insights: dict, target_language: str) -> dict:
+        """Translates the script, summary, tldr and key points of an English insights dict in place"""
+        insights['script'] = self.translate_text(insights['script'], target_language)
+        insights['summary'] = self.translate_text(insights['summary'], target_language)
+        insights['tldr'] = self.translate_text(insights['tldr'], target_language)
+        
+        # Translate Key points (list)
+        translated_points = []
+        for point in insights.get('key_points', []):
+            translated_points.append(self.translate_text(point, target_language))
+        insights['key_points'] = translated_points
+        return insights
+
+    def _converse(self, system_prompt: str, user_prompt: str, max_tokens: int = 800) -> str:
+        """One Bedrock (Nova Micro) call; returns the reply text"""
+        response = service_limits.call("bedrock-runtime", self.bedrock.converse, 
+            modelId=BEDROCK_MODEL_ID,
+            messages=[
+                {
+                    "role": "user",
+                    "content": [{"text": user_prompt}]
+                }
+            ],
+            system=[{"text": system_prompt}],
+            inferenceConfig={
+                "maxTokens": max_tokens,
+                "temperature": 0.5,
+                "topP": 0.9
+            }
+        )
+        return response['output']['message']['content'][0]['text'].strip()
+
+    def _converse_json(self, system_prompt: str, user_prompt: str, max_tokens: int = 800) -> dict:
+        """One Bedrock (Nova Micro) call whose reply must be a JSON object; raises when it can't be parsed"""
+        raw_text = self._converse(system_prompt, user_prompt, max_tokens)
+        
+        # Robust JSON extraction: Find the first '{' and last '}'
+        try:
+            # 1. Basic Cleaning
+            start_idx = raw_text.find('{')
+            end_idx = raw_text.rfind('}')
+            if start_idx == -1 or end_idx == -1:
+                raise ValueError("No JSON object found in response")
+            
+            clean_json = raw_text[start_idx:end_idx + 1]
+            
+            # 2. Advanced Sanitization for Bedrock hallucinations
+            import re
+            
+            # Fix trailing commas before closing braces/brackets
+            sanitized_json = re.sub(r',\s*([\]}])', r'\1', clean_json)
+            
+            # Fix Invalid JSON Escapes (e.g. \ followed by something not in " \ / b f n r t u)
+            # This double-escapes the backslash so the JSON parser accepts it as a literal backslash.
+            sanitized_json = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', sanitized_json)
+            
+            data = json.loads(sanitized_json, strict=False)
+            
+            # Normalize 'script' to string if it's a list
+            if 'script' in data and isinstance(data['script'], list):
+                data['script'] = " ".join(data['script'])
+                
+            return data
+            
+        except Exception as e:
+            logger.warning("Bedrock JSON parse failed after cleanup: %s", e)
+            # Last resort: try just raw parsing if cleanup failed
+            try:
+                data = json.loads(raw_text[raw_text.find('{'):raw_text.rfind('}')+1], strict=False)
+                BEDROCK_JSON_FAILURES.labels("recovered").inc()
+                return data
+            except:
+                BEDROCK_JSON_FAILURES.labels("failed").inc()
+                raise
+
     def summarize_article(self, text: str) -> dict:
         """Uses Bedrock (Nova Micro) to generate a full suite of AI insights: Script, Summary, Key Points, and TLDR"""
         try:
-            model_id = "amazon.nova-micro-v1:0"
             system_prompt = (
                 "You are an AI news analyst ensemble. Your task is to extract insights from an article and return them in VALID JSON format.\n"
-                "The 'script' part must be a professional dialogue between two people: [HOST] and [EXPERT].\n"
-                "- [HOST]: Inquisitive, sets the stage, and asks the expert to clarify.\n"
-                "- [EXPERT]: Explains the news in simple, precise, and authoritative terms.\n\n"
-                "CRITICAL: Do not include ANY text before or after the JSON. \n"
-                "Ensure all quotes inside strings are correctly escaped with a backslash (\\\"). \n"
-                "Do not include raw newlines within JSON string values; use '\\n' instead.\n\n"
+                + DIALOGUE_RULES + JSON_RULES +
                 "Return a JSON object with exactly these keys:\n"
                 "- 'script': A dialogue script using [HOST] and [EXPERT] markers.\n"
                 "- 'summary': A 1-2 paragraph professional summary for visual reading.\n"
                 "- 'key_points': A list of the most important facts as bullet points.\n"
                 "- 'tldr': A single, punchy 'too long didn't read' sentence."
             )
-            user_prompt = f"Analyze the following article and provide the insights in the requested JSON format.\n\nArticle: {text}"
-            
-            response = self.bedrock.converse(
-                modelId=model_id,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [{"text": user_prompt}]
-                    }
-                ],
-                system=[{"text": system_prompt}],
-                inferenceConfig={
-                    "maxTokens": 800,
-                    "temperature": 0.5,
-                    "topP": 0.9
-                }
-            )
-            
-            raw_text = response['output']['message']['content'][0]['text'].strip()
-            
-            # Robust JSON extraction: Find the first '{' and last '}'
-            try:
-                # 1. Basic Cleaning
-                start_idx = raw_text.find('{')
-                end_idx = raw_text.rfind('}')
-                if start_idx == -1 or end_idx == -1:
-                    raise ValueError("No JSON object found in response")
-                
-                clean_json = raw_text[start_idx:end_idx + 1]
-                
-                # 2. Advanced Sanitization for Bedrock hallucinations
-                import re
-                
-                # Fix trailing commas before closing braces/brackets
-                sanitized_json = re.sub(r',\s*([\]}])', r'\1', clean_json)
-                
-                # Fix Invalid JSON Escapes (e.g. \ followed by something not in " \ / b f n r t u)
-                # This double-escapes the backslash so the JSON parser accepts it as a literal backslash.
-                sanitized_json = re.sub(r'\\(?!["\\/bfnrtu])', r'\\\\', sanitized_json)
-                
-                data = json.loads(sanitized_json, strict=False)
-                
-                # Normalize 'script' to string if it's a list
-                if 'script' in data and isinstance(data['script'], list):
-                    data['script'] = " ".join(data['script'])
-                    
-                return data
-                
-            except Exception as e:
-                print(f"DEBUG ERROR: JSON Parse failed after deep cleanup. Error: {e}")
-                # Last resort: try just raw parsing if cleanup failed
-                try:
-                    return json.loads(raw_text[raw_text.find('{'):raw_text.rfind('}')+1], strict=False)
-                except:
-                    raise
+            if len(text) > SUMMARY_CHUNK_THRESHOLD:
+                # Long article: the script is written from per-chunk notes (map) in one reduce call
+                notes = self._summarize_chunks(text)
+                user_prompt = (
+                    "The following notes cover consecutive parts of one long article, in order. "
+                    "Analyze the article they describe and provide the insights in the requested JSON format.\n\n"
+                    + "\n\n".join(f"Part {i}:\n{part}" for i, part in enumerate(notes, 1))
+                )
+            else:
+                user_prompt = f"Analyze the following article and provide the insights in the requested JSON format.\n\nArticle: {text}"
+            return self._converse_json(system_prompt, user_prompt)
                 
+        except ServiceBusy:
+            # Throttled through every retry: fail the generation rather than store a truncated summary
+            raise
         except Exception as e:
-            print(f"Bedrock Error: {e}. Falling back to simple summary.")
+            logger.error("Bedrock failed: %s. Falling back to simple summary.", e)
+            FALLBACKS.labels("bedrock_plain_summary").inc()
             return {
                 "script": text[:200] + "...",
                 "summary": text[:500] + "...",
@@ -324,6 +710,49 @@ class RealAWSService:
                 "tldr": "News summary unavailable."
             }
 
+    def _summarize_chunks(self, text: str) -> list:
+        """Map stage: condenses each chunk of a long article to factual notes, concurrently (bounded by the Bedrock limiter)"""
+        chunks = chunk_text(text, SUMMARY_CHUNK_CHARS)
+        logger.debug("Summarizing %d characters in %d chunks", len(text), len(chunks))
+        system_prompt = (
+            "You are a news research assistant. You receive one part of a longer article. "
+            "Write concise plain-text notes of everything newsworthy in it: who, what, when, where, numbers, "
+            "quotes and claims, attributed as in the text. Do not add anything that is not in the text. "
+            "At most 200 words, no preamble."
+        )
+
+        def notes(numbered):
+            i, chunk = numbered
+            return self._converse(system_prompt, f"Part {i} of {len(chunks)}:\n\n{chunk}", max_tokens=SUMMARY_NOTES_MAX_TOKENS)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(SUMMARY_MAP_WORKERS, len(chunks)))) as executor:
+            return list(executor.map(with_trace(notes), enumerate(chunks, 1)))
+
+    def summarize_briefing(self, articles: list) -> dict:
+        """
+        One Bedrock call for a multi-story briefing: a single dialogue that walks through every
+        article in order, plus a summary, one key point per story and a tldr. Raises on failure
+        (a briefing with a truncated-text script is not worth caching for an hour).
+        """
+        system_prompt = (
+            "You are an AI news analyst ensemble producing a news briefing that covers several articles in one episode. "
+            "Return the insights in VALID JSON format.\n"
+            + DIALOGUE_RULES +
+            "Cover every story, in the order given, with a short spoken transition between stories.\n\n"
+            + JSON_RULES +
+            "Return a JSON object with exactly these keys:\n"
+            "- 'script': One dialogue script for the whole briefing using [HOST] and [EXPERT] markers.\n"
+            "- 'summary': One or two sentences per story, in order, for visual reading.\n"
+            "- 'key_points': A list with the single most important fact of each story, in order.\n"
+            "- 'tldr': A single, punchy sentence about the briefing as a whole."
+        )
+        stories = "\n\n".join(
+            f"Story {i}: {article.get('title', '')} ({article.get('source', 'Unknown')})\n{article.get('content', '')[:BRIEFING_ARTICLE_CHARS]}"
+            for i, article in enumerate(articles, 1)
+        )
+        user_prompt = f"Produce the briefing for the following {len(articles)} stories in the requested JSON format.\n\n{stories}"
+        return self._converse_json(system_prompt, user_prompt, max_tokens=BRIEFING_MAX_TOKENS)
+
     def get_voice_names(self, language: str) -> tuple:
         """Returns the (Host Voice, Expert Voice) mapping for a given language."""
         voice_map = {
@@ -334,8 +763,44 @@ class RealAWSService:
         }
         return voice_map.get(language, voice_map["en"])
 
-    def generate_speech(self, text: str, language: str = "en") -> bytes:
+    def _synthesize_segment(self, text: str, voice: str, language: str, audio_kwargs: dict, text_type: str = "text") -> bytes:
+        """
+        Synthesizes one segment with the first (voice, engine) not known to fail in this region:
+        the requested voice (neural), then Joanna neural, then Joanna standard. Outcomes are
+        remembered, so an unavailable voice costs one failed request per worker, not one per segment.
+        """
+        region = self.config["region"]
+        voice_capabilities.ensure_seeded(region, self.polly, call=lambda func, **kwargs: service_limits.call("polly", func, **kwargs))
+        last_error = None
+        for candidate, engine in voice_capabilities.candidates(region, voice, language):
+            try:
+                resp = service_limits.call("polly", self.polly.synthesize_speech,
+                    Text=text,
+                    TextType=text_type,
+                    **audio_kwargs,
+                    VoiceId=candidate,
+                    Engine=engine
+                )
+            except ServiceBusy:
+                # Throttling is not a voice problem; Joanna would be throttled too
+                raise
+            except Exception as e:
+                remembered = voice_capabilities.record_failure(region, candidate, engine, language, e)
+                logger.warning("Synthesis with %s (%s) failed%s: %s", candidate, engine, ", will skip it from now on" if remembered else "", e)
+                last_error = e
+                continue
+            voice_capabilities.record(region, candidate, engine, language, True)
+            if candidate != voice:
+                FALLBACKS.labels(f"polly_{candidate.lower()}_{engine}").inc()
+            return resp['AudioStream'].read()
+        raise last_error or RuntimeError(f"No Polly voice/engine available for {voice} ({language}) in {region}")
+
+    def generate_speech(self, text: str, language: str = "en", output_format: str = "mp3", sample_rate: str = None) -> bytes:
         """Converts text to speech using AWS Polly with Multi-Voice support via separate calls"""
+        # Polly picks the engine's default sample rate unless one is given
+        audio_kwargs = {"OutputFormat": output_format}
+        if sample_rate:
+            audio_kwargs["SampleRate"] = sample_rate
         try:
             # Handle cases where Bedrock returns the script as a list instead of a string
             if isinstance(text, list):
@@ -345,7 +810,7 @@ class RealAWSService:
             
             # Check if text contains [HOST] or [EXPERT] markers
             if "[HOST]" in text or "[EXPERT]" in text:
-                print(f"DEBUG: Generating Multi-Voice audio ({language}) via segment concatenation")
+                logger.debug("Generating multi-voice audio (%s) via segment concatenation", language)
                 
                 # Split text into segments by [HOST] and [EXPERT] markers
                 # Using regex to find all segments
@@ -353,7 +818,7 @@ class RealAWSService:
                 pattern = r'(\[HOST\]:|\[EXPERT\]:|\[HOST\]|\[EXPERT\])'
                 parts = re.split(pattern, text)
                 
-                combined_audio = b""
+                segments = []
                 current_voice = host_voice # Default
                 
                 for part in parts:
@@ -367,59 +832,51 @@ class RealAWSService:
                         current_voice = expert_voice
                         continue
                         
-                    try:
-                        resp = self.polly.synthesize_speech(
-                            Text=clean_part,
-                            OutputFormat="mp3",
-                            VoiceId=current_voice,
-                            Engine="neural"
-                        )
-                        combined_audio += resp['AudioStream'].read()
-                    except Exception as e:
-                        print(f"DEBUG: Segment synthesis failed for voice {current_voice}: {e}. Falling back to Joanna (Neural).")
-                        # Fallback to Joanna if the chosen voice/engine is unavailable
-                        try:
-                            resp = self.polly.synthesize_speech(
-                                Text=clean_part,
-                                OutputFormat="mp3",
-                                VoiceId="Joanna",
-                                Engine="neural"
-                            )
-                        except Exception as inner_e:
-                            print(f"DEBUG: Joanna Neural fallback failed, trying Standard: {inner_e}")
-                            resp = self.polly.synthesize_speech(
-                                Text=clean_part,
-                                OutputFormat="mp3",
-                                VoiceId="Joanna",
-                                Engine="standard"
-                            )
-                        combined_audio += resp['AudioStream'].read()
-                
-                return combined_audio
+                    segments.append((clean_part, current_voice))
             else:
                 # Legacy / Single Voice
-                try:
-                    response = self.polly.synthesize_speech(
-                        Text=text,
-                        OutputFormat="mp3",
-                        VoiceId=host_voice,
-                        Engine="neural"
-                    )
-                    return response['AudioStream'].read()
-                except Exception as e:
-                    print(f"DEBUG: Single voice synthesis failed for {host_voice}: {e}. Falling back to Joanna.")
-                    response = self.polly.synthesize_speech(
-                        Text=text,
-                        OutputFormat="mp3",
-                        VoiceId="Joanna",
-                        Engine="neural"
-                    )
-                    return response['AudioStream'].read()
+                segments = [(text, host_voice)]
+
+            # Same-speaker fragments share a request and over-limit turns are split
+            requests = plan_speech_requests(segments)
+            logger.debug("Packed %d script segments into %d Polly requests", len(segments), len(requests))
+
+            # Requests are synthesized concurrently (bounded by the Polly limiter) and joined in script order
+            def synthesize(request):
+                return self._synthesize_segment(request[0], request[1], language, audio_kwargs, text_type=request[2])
+
+            with ThreadPoolExecutor(max_workers=max(1, min(POLLY_SEGMENT_WORKERS, len(requests)))) as executor:
+                return b"".join(executor.map(with_trace(synthesize), requests))
                 
+        except ServiceBusy:
+            raise
         except Exception as e:
-            print(f"Polly Global Error: {e}")
+            logger.error("Polly synthesis failed: %s", e)
             return None
 
+    def generate_speech_variants(self, text: str, language: str = "en") -> dict:
+        """
+        Synthesizes every configured AUDIO_VARIANTS encoding concurrently.
+        Returns {variant: bytes}; a failed optional variant is skipped, a failed "standard" returns {}
+        (or raises ServiceBusy when Polly stayed throttled).
+        """
+        def synthesize(variant):
+            spec = AUDIO_VARIANT_SPECS[variant]
+            try:
+                return self.generate_speech(text, language, output_format=spec["format"], sample_rate=spec["sample_rate"])
+            except ServiceBusy:
+                if variant == "standard":
+                    raise
+                logger.warning("Skipping %s audio variant, Polly is throttled", variant)
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(AUDIO_VARIANTS)) as executor:
+            results = dict(zip(AUDIO_VARIANTS, executor.map(with_trace(synthesize), AUDIO_VARIANTS)))
+
+        if not results.get("standard"):
+            return {}
+        return {variant: audio for variant, audio in results.items() if audio}
+
     # --- Cognito (Authentication) ---
     def authenticate_user(self, username, password):
         """Authenticates user with Cognito and returns tokens"""
@@ -440,7 +897,25 @@ class RealAWSService:
             )
             return response['AuthenticationResult']
         except ClientError as e:
-            print(f"Cognito Auth Error: {e}")
+            logger.warning("Cognito authentication failed: %s", e)
+            return None
+
+    def refresh_tokens(self, refresh_token, username):
+        """Exchanges a refresh token for fresh ID/access tokens"""
+        try:
+            auth_params = {'REFRESH_TOKEN': refresh_token}
+            secret_hash = self._get_secret_hash(username)
+            if secret_hash:
+                auth_params['SECRET_HASH'] = secret_hash
+
+            response = self.cognito.initiate_auth(
+                ClientId=self.config["client_id"],
+                AuthFlow='REFRESH_TOKEN_AUTH',
+                AuthParameters=auth_params
+            )
+            return response['AuthenticationResult']
+        except ClientError as e:
+            logger.warning("Cognito token refresh failed: %s", e)
             return None
 
     def sign_up_user(self, username, password, email):
@@ -462,69 +937,113 @@ class RealAWSService:
                 Password=password,
                 Permanent=True
             )
+            user_directory_cache.clear()
             return True
         except ClientError as e:
             error_code = e.response['Error']['Code']
             if error_code == 'UsernameExistsException':
                 return "EXISTS"
-            print(f"Cognito Sign-up Error: {e}")
+            logger.warning("Cognito sign-up failed: %s", e)
             return False
 
-    def get_user_groups(self, username):
-        """Fetches the groups a user belongs to in Cognito"""
-        try:
-            response = self.cognito.admin_list_groups_for_user(
-                UserPoolId=self.config["user_pool_id"],
-                Username=username
-            )
-            return [group['GroupName'] for group in response.get('Groups', [])]
-        except ClientError as e:
-            print(f"Cognito Groups Error: {e}")
-            return []
-
     def get_admin_metrics(self):
         """Fetches real metrics from Cognito and DynamoDB for the Admin Dashboard"""
         metrics = {
             "total_users": 0,
             "articles_generated": 0,
-            "api_cost": "Calculated..."
+            "api_cost": "$0.00",
+            "cost_report": cost_report([]),
+            "worker_usage": worker_report()
         }
         try:
             # 1. Total Users from Cognito (Estimated but very fast)
             cognito_res = self.cognito.describe_user_pool(UserPoolId=self.config["user_pool_id"])
             metrics["total_users"] = cognito_res['UserPool'].get('EstimatedNumberOfUsers', 0)
             
-            # 2. Total Articles from DynamoDB (Live Scan Count)
-            # While 'item_count' is fast but delayed (6h), scan(Select='COUNT') is live.
-            # For smaller tables, this is the most reliable way to get an exact live count.
-            dynamo_res = self.table.scan(Select='COUNT')
-            metrics["articles_generated"] = dynamo_res.get('Count', 0)
+            # 2. Total Articles and AWS spend from DynamoDB (live, one projected parallel scan).
+            # While 'item_count' is fast but delayed (6h), a scan is live; reading only the usage
+            # fields costs the same capacity as scan(Select='COUNT').
+            items = self.metadata.scan(fields=["ArticleID", "title", "updated_at", "aws_usage"])
+            metrics["articles_generated"] = len(items)
+            metrics["cost_report"] = cost_report(items)
+            metrics["api_cost"] = f"${metrics['cost_report']['total_cost']:.2f}"
             
         except Exception as e:
-            print(f"Admin Metrics Error: {e}")
+            logger.error("Admin metrics failed: %s", e)
             
         return metrics
 
     # --- Admin Advanced Management ---
-    def list_all_users(self):
-        """Fetches all users from the Cognito User Pool with pagination support"""
+    def _format_user(self, user: dict) -> dict:
+        attrs = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
+        return {
+            "username": user['Username'],
+            "email": attrs.get('email', 'N/A'),
+            "enabled": user['Enabled'],
+            "status": user['UserStatus'],
+            "created": user['UserCreateDate'].strftime('%Y-%m-%d %H:%M')
+        }
+
+    def list_users_page(self, page_size: int = 50, page_token: str = None, status: str = None,
+                        enabled: bool = None, email_prefix: str = None) -> dict:
+        """
+        One page of the Cognito user directory: {"users": [...], "next_token": str or None}.
+        Cognito accepts a single Filter per ListUsers call, so the most selective filter is pushed
+        down (email prefix, then status, then enabled) and any others are applied to the page.
+        page_token is opaque to callers and bound to the filters it was issued for.
+        """
+        page_size = max(1, min(int(page_size), 60))  # ListUsers caps Limit at 60
+        email_prefix = (email_prefix or "").replace('"', '').replace('\\', '').strip() or None
+        status = status if status in COGNITO_USER_STATUSES else None
+
+        filters = {"status": status, "enabled": enabled, "email_prefix": email_prefix, "page_size": page_size}
+        filter_key = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:16]
+
+        cognito_token = None
+        if page_token:
+            try:
+                decoded = json.loads(base64.urlsafe_b64decode(page_token.encode()).decode())
+                if decoded.get("f") == filter_key:
+                    cognito_token = decoded.get("t")
+            except Exception:
+                pass  # Malformed or stale token: start from the first page
+
+        cache_key = (filter_key, cognito_token)
+        cached = user_directory_cache.get(cache_key)
+        if cached:
+            return cached
+
+        list_kwargs = {"UserPoolId": self.config["user_pool_id"], "Limit": page_size}
+        if email_prefix:
+            list_kwargs["Filter"] = f'email ^= "{email_prefix}"'
+        elif status:
+            list_kwargs["Filter"] = f'cognito:user_status = "{status}"'
+        elif enabled is not None:
+            list_kwargs["Filter"] = f'status = "{"Enabled" if enabled else "Disabled"}"'
+        if cognito_token:
+            list_kwargs["PaginationToken"] = cognito_token
+
         try:
-            users = []
-            paginator = self.cognito.get_paginator('list_users')
-            for page in paginator.paginate(UserPoolId=self.config["user_pool_id"]):
-                for user in page.get('Users', []):
-                    attrs = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
-                    users.append({
-                        "username": user['Username'],
-                        "email": attrs.get('email', 'N/A'),
-                        "enabled": user['Enabled'],
-                        "status": user['UserStatus'],
-                        "created": user['UserCreateDate'].strftime('%Y-%m-%d %H:%M')
-                    })
-            return users
+            response = self.cognito.list_users(**list_kwargs)
         except ClientError as e:
-            print(f"Cognito List Users Error: {e}")
-            return []
+            logger.error("Cognito list users failed: %s", e)
+            return {"users": [], "next_token": None}
+
+        users = [self._format_user(user) for user in response.get('Users', [])]
+        # Filters Cognito couldn't take in the same call
+        if status:
+            users = [u for u in users if u["status"] == status]
+        if enabled is not None:
+            users = [u for u in users if u["enabled"] == enabled]
+
+        next_token = None
+        if response.get('PaginationToken'):
+            payload = json.dumps({"f": filter_key, "t": response['PaginationToken']})
+            next_token = base64.urlsafe_b64encode(payload.encode()).decode()
+
+        page = {"users": users, "next_token": next_token}
+        user_directory_cache.set(cache_key, page)
+        return page
 
     def toggle_user_status(self, username, enabled: bool):
         """Enables or Disables a user in Cognito"""
@@ -539,78 +1058,61 @@ class RealAWSService:
                     UserPoolId=self.config["user_pool_id"],
                     Username=username
                 )
+            user_directory_cache.clear()
             return True
         except ClientError as e:
-            print(f"Cognito Toggle Error: {e}")
+            logger.error("Cognito user toggle failed: %s", e)
             return False
 
+    def search_podcasts(self, query: str, user_id: str = None, entity: str = None, sentiment: str = None,
+                        language: str = None, limit: int = 20, offset: int = 0) -> dict:
+        """Ranked full-text search with facets (search_index.py); user_id limits it to that user's library"""
+        try:
+            return search_index().search(query, user_id=user_id, entity=entity, sentiment=sentiment,
+                                         language=language, limit=limit, offset=offset)
+        except Exception as e:
+            logger.error("Podcast search failed for %r: %s", query, e)
+            return None
+
     def get_all_podcasts(self):
-        """Fetches all records from the DynamoDB table with pagination support"""
+        """Fetches all completed records (DynamoDB: streamed from a segmented parallel scan)"""
         try:
             results = []
-            response = self.table.scan(
-                FilterExpression=boto3.dynamodb.conditions.Attr('status').eq('completed')
-            )
-            items = response.get('Items', [])
-            for item in items:
-                if 'ArticleID' in item:
-                    item['audio_url'] = self.get_audio_url(f"{item['ArticleID']}.mp3")
-            results.extend(items)
-
-            # Handle pagination
-            while 'LastEvaluatedKey' in response:
-                response = self.table.scan(
-                    FilterExpression=boto3.dynamodb.conditions.Attr('status').eq('completed'),
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items = response.get('Items', [])
-                for item in items:
-                    if 'ArticleID' in item:
-                        item['audio_url'] = self.get_audio_url(f"{item['ArticleID']}.mp3")
+            for items in self.metadata.iter_pages(status='completed'):
                 results.extend(items)
 
             return results
         except Exception as e:
-            print(f"DynamoDB Global Scan Error: {e}")
+            logger.error("Global podcast scan failed: %s", e)
             return []
 
     def delete_podcast(self, article_id: str):
-        """Deletes podcast metadata from DynamoDB and the .mp3 file from S3"""
+        """Deletes the podcast record and every audio encoding"""
         try:
-            # 1. Delete from S3
-            file_name = f"{article_id}.mp3"
-            self.s3.delete_object(Bucket=self.config["s3_bucket"], Key=file_name)
+            # 1. Delete the audio (all variants; missing files are ignored)
+            self.audio.delete(audio_file_names(article_id))
             
-            # 2. Delete from DynamoDB
-            self.table.delete_item(Key={'ArticleID': article_id})
+            # 2. Delete the record
+            self.metadata.delete(article_id)
+            completed_podcast_cache.delete(article_id)
+            self._update_search_index("remove", article_id)
             return True
         except Exception as e:
-            print(f"Podcast Deletion Error: {e}")
+            logger.error("Podcast deletion failed for %s: %s", article_id, e)
             return False
 
     def purge_all_podcasts(self):
-        """Wipes ALL generated podcasts from S3 and DynamoDB"""
+        """Wipes ALL generated podcasts and their audio (DynamoDB + S3: streamed, in concurrent 1000-key chunks)"""
         try:
-            # 1. Get all podcast records
-            podcasts = self.get_all_podcasts()
-            if not podcasts:
-                return True
-            
-            # 2. Delete from S3 (Bulk)
-            delete_objects = [{'Key': f"{p['ArticleID']}.mp3"} for p in podcasts]
-            self.s3.delete_objects(
-                Bucket=self.config["s3_bucket"],
-                Delete={'Objects': delete_objects}
-            )
-            
-            # 3. Delete from DynamoDB (Batch)
-            with self.table.batch_writer() as batch:
-                for podcast in podcasts:
-                    batch.delete_item(Key={'ArticleID': podcast['ArticleID']})
-            
-            return True
+            # Drop cached records up front so nothing half-purged is served from this worker
+            completed_podcast_cache.clear()
+            self.audio.forget_all()
+            result = self.metadata.purge(self.audio, audio_file_names, max_workers=self.config["scan_workers"])
+            completed_podcast_cache.clear()
+            self._update_search_index("clear")
+            return result["failed"] == 0
         except Exception as e:
-            print(f"Global Purge Error: {e}")
+            logger.error("Global purge failed: %s", e)
             return False
 
 # Singleton Instance (Optional: but useful for FastAPI)
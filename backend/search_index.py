@@ -0,0 +1,357 @@
+
+import html
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from backend.storage import SQLiteDatabase
+from backend.telemetry import job_trace
+
+logger = logging.getLogger(__name__)
+
+# Searchable text of a podcast, one FTS5 column each. bm25 weights in the same order: a hit in
+# the title or the extracted entities/key phrases outranks one deep in the script.
+TEXT_COLUMNS = ["title", "tldr", "summary", "key_points", "key_phrases", "entities", "script"]
+COLUMN_WEIGHTS = [10.0, 4.0, 2.0, 3.0, 5.0, 5.0, 1.0]
+
+# Every SEARCH_SYNC_INTERVAL seconds one worker per host reconciles the index with the record
+# store (0 disables it), so podcasts written, subscribed to or deleted on other hosts show up
+SEARCH_SYNC_INTERVAL = float(os.getenv("SEARCH_SYNC_INTERVAL", "300"))
+# Changes stamped this close to the last sync's watermark are re-read (clock skew between hosts)
+SYNC_MARGIN_MS = 60 * 1000
+SYNC_FIELDS = ["ArticleID", "status", "updated_at", "last_subscribed_at"]
+
+FACET_FIELDS = ["entity", "sentiment", "language"]
+FACET_SIZE = 10
+MAX_RESULTS = 50
+
+# Snippet markers: control characters that never occur in indexed text, swapped for <mark> after escaping
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+_SPEAKER_TAG = re.compile(r"\[(?:HOST|EXPERT)[^\]]*\]:?")
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(query: str) -> str:
+    """
+    User input -> FTS5 MATCH expression: every word must appear, the last one as a prefix (so
+    results follow the search box as the user types). Words are quoted, so FTS5 operators and
+    punctuation in the input are never interpreted. '' when there are no words.
+    """
+    tokens = _TOKEN.findall((query or "").lower())[:16]
+    if not tokens:
+        return ""
+    return " ".join(f'"{token}"' for token in tokens[:-1]) + (" " if len(tokens) > 1 else "") + f'"{tokens[-1]}"*'
+
+def _joined(value) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return "\n".join(str(v) for v in value)
+    return str(value or "")
+
+def document_text(record: dict) -> dict:
+    """Text of a completed record per TEXT_COLUMNS (briefings also match on their stories' titles)"""
+    key_points = list(record.get("key_points") or [])
+    key_points += [story.get("title", "") for story in record.get("stories") or []]
+    return {
+        "title": _joined(record.get("title")),
+        "tldr": _joined(record.get("tldr")),
+        "summary": _joined(record.get("summary")),
+        "key_points": _joined(key_points),
+        "key_phrases": _joined(record.get("nlp_key_phrases")),
+        "entities": _joined(record.get("nlp_entities")),
+        # "[HOST (Matthew)]:" markers would make every script match "host"
+        "script": _SPEAKER_TAG.sub(" ", _joined(record.get("script")))
+    }
+
+class PodcastSearchIndex(SQLiteDatabase):
+    """
+    Inverted index (SQLite FTS5) over completed podcasts: scripts, summaries, key points, key
+    phrases and entities, plus the facets and subscribers needed to filter without touching the
+    record store. It is updated incrementally as podcasts are saved, subscribed to and deleted
+    (see RealAWSService), so a search is one local indexed query instead of a table scan.
+    """
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS docs (
+            id INTEGER PRIMARY KEY,
+            article_id TEXT NOT NULL UNIQUE,
+            title TEXT,
+            source TEXT,
+            time TEXT,
+            language TEXT,
+            sentiment TEXT,
+            kind TEXT,
+            updated_at INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS docs_sentiment ON docs (sentiment);
+        CREATE INDEX IF NOT EXISTS docs_language ON docs (language);
+        CREATE TABLE IF NOT EXISTS doc_entities (
+            entity TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (entity, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS doc_entities_doc ON doc_entities (doc_id);
+        CREATE TABLE IF NOT EXISTS doc_subscribers (
+            user_id TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, doc_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS doc_subscribers_doc ON doc_subscribers (doc_id);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(
+            {", ".join(TEXT_COLUMNS)},
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        );
+    """
+
+    def _doc_id(self, db, article_id: str):
+        row = db.execute("SELECT id FROM docs WHERE article_id = ?", (article_id,)).fetchone()
+        return row[0] if row else None
+
+    def _remove(self, db, doc_id: int):
+        db.execute("DELETE FROM doc_text WHERE rowid = ?", (doc_id,))
+        db.execute("DELETE FROM doc_entities WHERE doc_id = ?", (doc_id,))
+        db.execute("DELETE FROM doc_subscribers WHERE doc_id = ?", (doc_id,))
+        db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+    def _index(self, db, article_id: str, record: dict, subscribers):
+        doc_id = self._doc_id(db, article_id)
+        if doc_id is not None:
+            # A regenerated podcast keeps its listeners
+            subscribers = set(subscribers) | {user for (user,) in db.execute(
+                "SELECT user_id FROM doc_subscribers WHERE doc_id = ?", (doc_id,))}
+            self._remove(db, doc_id)
+        doc_id = db.execute(
+            "INSERT INTO docs (article_id, title, source, time, language, sentiment, kind, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (article_id, record.get("title"), record.get("source"), record.get("time"), record.get("language") or "en",
+             record.get("nlp_sentiment") or "UNKNOWN", record.get("kind") or "article", int(record.get("updated_at") or 0))
+        ).lastrowid
+        text = document_text(record)
+        db.execute(f"INSERT INTO doc_text (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?{', ?' * len(TEXT_COLUMNS)})",
+                   [doc_id] + [text[column] for column in TEXT_COLUMNS])
+        db.executemany("INSERT OR IGNORE INTO doc_entities (entity, doc_id) VALUES (?, ?)",
+                       [(entity, doc_id) for entity in set(record.get("nlp_entities") or [])])
+        db.executemany("INSERT OR IGNORE INTO doc_subscribers (user_id, doc_id) VALUES (?, ?)",
+                       [(user, doc_id) for user in subscribers])
+
+    def index(self, article_id: str, record: dict, subscribers=()):
+        """Adds or replaces a podcast. Records that are not 'completed' are removed instead."""
+        with self._transaction() as db:
+            if record.get("status") != "completed":
+                doc_id = self._doc_id(db, article_id)
+                if doc_id is not None:
+                    self._remove(db, doc_id)
+                return
+            self._index(db, article_id, record, subscribers)
+
+    def add_subscribers(self, article_id: str, users):
+        """Adds listeners to an indexed podcast (a podcast that isn't indexed yet is left alone)"""
+        with self._transaction() as db:
+            doc_id = self._doc_id(db, article_id)
+            if doc_id is not None:
+                db.executemany("INSERT OR IGNORE INTO doc_subscribers (user_id, doc_id) VALUES (?, ?)",
+                               [(user, doc_id) for user in users])
+
+    def remove(self, article_id: str):
+        with self._transaction() as db:
+            doc_id = self._doc_id(db, article_id)
+            if doc_id is not None:
+                self._remove(db, doc_id)
+
+    def clear(self):
+        with self._transaction() as db:
+            for table in ("doc_text", "doc_entities", "doc_subscribers", "docs"):
+                db.execute(f"DELETE FROM {table}")
+
+    def rebuild(self, pages) -> int:
+        """Re-indexes from scratch from pages of records (the metadata store's iter_pages). Returns the count."""
+        indexed, watermark = 0, 0
+        self.clear()
+        for page in pages:
+            with self._transaction() as db:
+                for record in page:
+                    watermark = max(watermark, _stamp(record))
+                    if record.get("status") == "completed":
+                        self._index(db, record["ArticleID"], record, record.get("subscribers") or ())
+                        indexed += 1
+        self._set_state("watermark", watermark)
+        self.db.execute("INSERT INTO doc_text (doc_text) VALUES ('optimize')")
+        return indexed
+
+    def _state(self, name: str) -> int:
+        row = self.db.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_state(self, name: str, value: int):
+        self.db.execute("INSERT INTO sync_state (name, value) VALUES (?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET value = excluded.value", (name, int(value)))
+
+    def claim_sync(self, interval: float) -> bool:
+        """Whether this worker should sync now: at most one sync per `interval` across the host's workers"""
+        now = int(time.time())
+        with self._transaction() as db:
+            row = db.execute("SELECT value FROM sync_state WHERE name = 'sync_started_at'").fetchone()
+            if row and now - row[0] < interval:
+                return False
+            self._set_state("sync_started_at", now)
+            return True
+
+    def sync(self, store) -> dict:
+        """
+        Reconciles the index with the record store (storage.py). An empty index is rebuilt in full.
+        Otherwise one scan of the records' keys and change stamps finds what to re-read: records
+        changed since the last sync's watermark (regenerated or subscribed to anywhere) and records
+        the index doesn't have. Indexed podcasts the store no longer has are removed.
+        """
+        if not self.db.execute("SELECT 1 FROM docs LIMIT 1").fetchone():
+            return {"rebuilt": self.rebuild(store.iter_pages())}
+
+        watermark = self._state("watermark")
+        indexed = {article_id for (article_id,) in self.db.execute("SELECT article_id FROM docs")}
+        present, changed, newest = set(), [], watermark
+        for page in store.iter_pages(status="completed", fields=SYNC_FIELDS):
+            for record in page:
+                article_id, stamp = record["ArticleID"], _stamp(record)
+                present.add(article_id)
+                newest = max(newest, stamp)
+                if article_id not in indexed or stamp > watermark - SYNC_MARGIN_MS:
+                    changed.append(article_id)
+
+        updated = 0
+        for article_id in changed:
+            record = store.get(article_id)
+            if record:
+                self.index(article_id, record, record.get("subscribers") or ())
+                updated += 1
+        removed = indexed - present
+        for article_id in removed:
+            self.remove(article_id)
+        self._set_state("watermark", newest)
+        return {"updated": updated, "removed": len(removed)}
+
+    def _filters(self, match: str, user_id: str, entity: str, sentiment: str, language: str) -> tuple:
+        """FROM/WHERE clause and parameters shared by the result, count and facet queries"""
+        clause, conditions, params = " FROM docs d", [], []
+        if match:
+            clause += " JOIN doc_text ON doc_text.rowid = d.id"
+            conditions.append("doc_text MATCH ?")
+            params.append(match)
+        if user_id:
+            conditions.append("d.id IN (SELECT doc_id FROM doc_subscribers WHERE user_id = ?)")
+            params.append(user_id)
+        if entity:
+            conditions.append("d.id IN (SELECT doc_id FROM doc_entities WHERE entity = ?)")
+            params.append(entity)
+        if sentiment:
+            conditions.append("d.sentiment = ?")
+            params.append(sentiment)
+        if language:
+            conditions.append("d.language = ?")
+            params.append(language)
+        if conditions:
+            clause += " WHERE " + " AND ".join(conditions)
+        return clause, params
+
+    def search(self, query: str = "", user_id: str = None, entity: str = None, sentiment: str = None,
+               language: str = None, limit: int = 20, offset: int = 0) -> dict:
+        """
+        Ranked search. `user_id` limits it to that user's library (None = the whole catalogue);
+        entity / sentiment / language are exact facet filters. Without query words the facets
+        alone select podcasts, newest first. Returns results, the total and facet counts.
+        """
+        match = match_expression(query)
+        if not match and not (user_id or entity or sentiment or language):
+            return {"results": [], "total": 0, "facets": {field: [] for field in FACET_FIELDS}}
+
+        clause, params = self._filters(match, user_id, entity, sentiment, language)
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        db = self.db
+        if match:
+            weights = ", ".join(str(w) for w in COLUMN_WEIGHTS)
+            columns = (f", snippet(doc_text, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 16) AS snippet"
+                       f", bm25(doc_text, {weights}) AS score")
+            order = "score, d.updated_at DESC"
+        else:
+            columns, order = ", NULL AS snippet, NULL AS score", "d.updated_at DESC"
+        rows = db.execute(
+            f"SELECT d.article_id, d.title, d.source, d.time, d.language, d.sentiment, d.kind{columns}"
+            f"{clause} ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, max(0, int(offset))]
+        ).fetchall()
+        total = db.execute(f"SELECT COUNT(*){clause}", params).fetchone()[0]
+
+        facets = {
+            "entity": db.execute(
+                f"SELECT e.entity, COUNT(*) FROM doc_entities e WHERE e.doc_id IN (SELECT d.id{clause}) "
+                f"GROUP BY e.entity ORDER BY COUNT(*) DESC, e.entity LIMIT {FACET_SIZE}", params).fetchall(),
+            "sentiment": db.execute(
+                f"SELECT d.sentiment, COUNT(*){clause} GROUP BY d.sentiment ORDER BY COUNT(*) DESC", params).fetchall(),
+            "language": db.execute(
+                f"SELECT d.language, COUNT(*){clause} GROUP BY d.language ORDER BY COUNT(*) DESC", params).fetchall()
+        }
+        return {
+            "results": [{
+                "id": article_id, "title": title, "source": source, "time": time, "language": lang,
+                "sentiment": sent, "kind": kind, "snippet_html": highlight(snippet) if snippet else None,
+                "score": round(-score, 4) if score is not None else None
+            } for article_id, title, source, time, lang, sent, kind, snippet, score in rows],
+            "total": total,
+            "facets": {field: [{"value": value, "count": count} for value, count in values] for field, values in facets.items()}
+        }
+
+def _stamp(record: dict) -> int:
+    """When the record last changed in a way the index cares about (content or subscribers)"""
+    return int(max(record.get("updated_at") or 0, record.get("last_subscribed_at") or 0))
+
+class IndexSyncer:
+    """Background thread that runs PodcastSearchIndex.sync every `interval` seconds (first run at start)"""
+
+    def __init__(self, index: PodcastSearchIndex, store, interval: float = SEARCH_SYNC_INTERVAL):
+        self.index = index
+        self.store = store
+        self.interval = interval
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="search-index-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with job_trace("search-sync"):
+                try:
+                    if self.index.claim_sync(self.interval):
+                        result = self.index.sync(self.store)
+                        logger.info("Search index synced: %s", result)
+                except Exception as e:
+                    logger.warning("Search index sync failed: %s", e)
+            time.sleep(self.interval)
+
+def highlight(snippet: str) -> str:
+    """FTS5 snippet -> HTML-escaped text with the matched words in <mark>"""
+    return html.escape(snippet).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from backend.logs import configure_logging
+    from backend.real_aws import RealAWSService, search_index
+    configure_logging(name="")
+
+    parser = argparse.ArgumentParser(description="Rebuild the podcast search index from the record store")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every completed podcast")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        sys.exit(1)
+
+    aws_service = RealAWSService()
+    count = search_index().rebuild(aws_service.metadata.iter_pages())
+    print(f"Indexed {count} podcasts into {search_index().path}")
@@ -1,7 +1,59 @@
 // Custom Vintage Audio Player Logic
 
-async function generateAudio(articleId) {
+// Picks the smallest adequate audio encoding for this device/connection.
+// `variants` maps variant name -> URL (always contains 'standard').
+function pickAudioUrl(variants) {
+    if (!variants) return null;
+    const conn = navigator.connection || {};
+    const constrained = conn.saveData
+        || /(^|slow-)2g|3g/.test(conn.effectiveType || '')
+        || window.matchMedia('(max-width: 768px)').matches;
+
+    if (constrained) {
+        const probe = document.createElement('audio');
+        if (variants.mobile_ogg && probe.canPlayType('audio/ogg; codecs="vorbis"')) return variants.mobile_ogg;
+        if (variants.mobile) return variants.mobile;
+    }
+    return variants.standard;
+}
+
+// Server-rendered players (library) list their encodings in data-variants
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('audio[data-variants]').forEach(audio => {
+        const base = audio.getAttribute('src');
+        const variants = { standard: base };
+        audio.dataset.variants.split(',').filter(v => v && v !== 'standard').forEach(v => {
+            variants[v] = `${base}?variant=${v}`;
+        });
+        audio.setAttribute('src', pickAudioUrl(variants));
+    });
+});
+
+// Story titles, links and sources come from third-party feeds: escape them before they reach innerHTML
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, c => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[c]);
+}
+
+// Only http(s) links become hrefs (no javascript:/data: URLs)
+function safeHref(url) {
+    return /^https?:\/\//i.test(url || '') ? escapeHtml(url) : null;
+}
+
+function generateAudio(articleId) {
     const button = document.querySelector(`button[onclick="generateAudio('${articleId}')"]`);
+    return tuneIn(articleId, `/api/generate_audio/${articleId}`, button);
+}
+
+// One combined episode of the category's top stories (shared by everyone for the hour)
+function generateBriefing(category) {
+    const button = document.querySelector(`button[onclick="generateBriefing('${category}')"]`);
+    return tuneIn(`briefing-${category}`, `/api/briefing/${category}`, button);
+}
+
+// Requests an episode from `url` and renders its player into #player-<articleId>
+async function tuneIn(articleId, url, button) {
     const playerContainer = document.getElementById(`player-${articleId}`);
 
     // Get the selected language from the UI if available, else default to English
@@ -24,7 +76,7 @@ async function generateAudio(articleId) {
     `;
 
     try {
-        const response = await fetch(`/api/generate_audio/${articleId}`, {
+        const response = await fetch(url, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -55,6 +107,15 @@ async function generateAudio(articleId) {
             ? data.nlp_key_phrases.map(p => `<span class="badge border border-dark text-dark me-1 mb-1" style="background:transparent;">${p}</span>`).join('')
             : '';
 
+        // Briefings list the stories they cover
+        const storiesHtml = (data.stories && data.stories.length > 0)
+            ? data.stories.map(s => {
+                const title = escapeHtml(s.title);
+                const href = safeHref(s.url);
+                return `<li>${href ? `<a href="${href}" target="_blank" rel="noopener">${title}</a>` : title} <span class="text-muted">(${escapeHtml(s.source)})</span></li>`;
+            }).join('')
+            : '';
+
         // Sentiment Badge Color Logic
         let sentimentColor = "bg-secondary";
         if (data.nlp_sentiment === "POSITIVE") sentimentColor = "bg-success";
@@ -93,7 +154,7 @@ async function generateAudio(articleId) {
                 </div>
             </div>
             
-            <audio id="audio-${articleId}" src="${data.audio_url}" 
+            <audio id="audio-${articleId}" src="${pickAudioUrl(data.audio_variants) || data.audio_url}" 
                 ontimeupdate="updateProgress('${articleId}')" 
                 onloadedmetadata="initDuration('${articleId}')"
                 onended="resetPlayer('${articleId}')"></audio>
@@ -125,6 +186,13 @@ async function generateAudio(articleId) {
                 ${keyPointsHtml || '<li>No key points available.</li>'}
             </ul>
 
+            ${storiesHtml ? `
+            <h6 class="text-uppercase fw-bold mt-4 mb-2 small" style="opacity: 0.6;">Stories In This Briefing</h6>
+            <ol class="small ps-3 mb-4" style="font-family: var(--font-news);">
+                ${storiesHtml}
+            </ol>
+            ` : ''}
+
             ${scriptHtml ? `
             <div class="mt-4 pt-3 border-top border-dark">
                 <h6 class="text-uppercase fw-bold mb-3 small" style="font-family: var(--font-console);">Radio Script (Dialogue):</h6>
@@ -0,0 +1,488 @@
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from decimal import Decimal
+import boto3
+from botocore.exceptions import ClientError
+from backend.audio_cache import audio_cache
+from backend.bulk_purge import BulkPurger
+from backend.parallel_scan import ParallelScanner
+from backend.telemetry import record_cache
+from backend.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Presigned URLs are minted for an hour and reused until shortly before they expire,
+# so a listener always gets at least PRESIGNED_URL_MIN_REMAINING seconds of playback time.
+PRESIGNED_URL_EXPIRY = 3600
+PRESIGNED_URL_MIN_REMAINING = int(os.getenv("PRESIGNED_URL_MIN_REMAINING", "900"))
+presigned_url_cache = TTLCache(
+    ttl=PRESIGNED_URL_EXPIRY - PRESIGNED_URL_MIN_REMAINING,
+    max_size=int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "4096"))
+)
+
+# Episode audio and podcast records live in S3 + DynamoDB ("aws") or on this machine ("local":
+# LOCAL_AUDIO_DIR + a SQLite database at SQLITE_PATH), for single-node deployments and offline runs
+STORAGE_BACKENDS = ["aws", "local"]
+
+# --- Audio ---
+
+class S3AudioStore:
+    """Episode audio in S3, played from the shared local disk cache (audio_cache.py)"""
+
+    def __init__(self, s3, bucket: str):
+        self.s3 = s3
+        self.bucket = bucket
+
+    def put(self, file_name: str, content: bytes, content_type: str) -> bool:
+        try:
+            logger.debug("Uploading %s to S3 bucket %s", file_name, self.bucket)
+            self.s3.put_object(Bucket=self.bucket, Key=file_name, Body=content, ContentType=content_type)
+        except ClientError as e:
+            logger.error("S3 upload failed for %s: %s", file_name, e)
+            return False
+        # Seed the local disk cache so the first plays never go back to S3
+        audio_cache.put_bytes(file_name, content)
+        # The object was just replaced, so the next URL is minted fresh
+        presigned_url_cache.delete(file_name)
+        logger.info("Uploaded %s to S3", file_name)
+        return True
+
+    def url(self, file_name: str) -> str:
+        """Pre-signed URL without checking S3, reusing a cached one while it still has enough lifetime"""
+        url = presigned_url_cache.get(file_name)
+        record_cache("presigned_url", url is not None)
+        if url:
+            return url
+        url = self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': file_name},
+            ExpiresIn=PRESIGNED_URL_EXPIRY
+        )
+        presigned_url_cache.set(file_name, url)
+        return url
+
+    def checked_url(self, file_name: str) -> str:
+        """URL if the object exists, else None"""
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=file_name)
+            return self.url(file_name)
+        except ClientError:
+            return None
+
+    def local_path(self, file_name: str) -> str:
+        """Path in the local disk cache, downloading from S3 on a miss (None if the object doesn't exist)"""
+        return audio_cache.fetch(self.s3, self.bucket, file_name)
+
+    def delete(self, file_names: list):
+        # Missing keys are ignored by S3
+        self.s3.delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': [{'Key': name} for name in file_names], 'Quiet': True}
+        )
+        self.forget(file_names)
+
+    def forget(self, file_names: list):
+        """Drops this worker's cached URLs and local copies of the files"""
+        for file_name in file_names:
+            presigned_url_cache.delete(file_name)
+            audio_cache.discard(file_name)
+
+    def forget_all(self):
+        presigned_url_cache.clear()
+        audio_cache.clear()
+
+class LocalAudioStore:
+    """
+    Episode audio as flat files in one directory, served from there directly (the /audio
+    endpoint, or nginx sendfile via AUDIO_ACCEL_REDIRECT). Writes are atomic (temp file + rename).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, file_name: str) -> str:
+        # Only ever a flat file inside the audio directory
+        return os.path.join(self.directory, os.path.basename(file_name))
+
+    def put(self, file_name: str, content: bytes, content_type: str) -> bool:
+        tmp_path = self.path_for(f".{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, self.path_for(file_name))
+            return True
+        except OSError as e:
+            logger.error("Audio write failed for %s: %s", file_name, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def url(self, file_name: str) -> str:
+        """The app's own /audio URL ("<id>.mp3" or "<id>.<variant>.<ext>")"""
+        parts = os.path.basename(file_name).split(".")
+        return f"/audio/{parts[0]}" + (f"?variant={parts[1]}" if len(parts) > 2 else "")
+
+    def checked_url(self, file_name: str) -> str:
+        return self.url(file_name) if os.path.exists(self.path_for(file_name)) else None
+
+    def local_path(self, file_name: str) -> str:
+        path = self.path_for(file_name)
+        exists = os.path.exists(path)
+        record_cache("audio_disk", exists)
+        return path if exists else None
+
+    def delete(self, file_names: list):
+        for file_name in file_names:
+            try:
+                os.remove(self.path_for(file_name))
+            except OSError:
+                pass
+
+    def forget(self, file_names: list):
+        pass
+
+    def forget_all(self):
+        pass
+
+# --- Podcast records ---
+
+class DynamoMetadataStore:
+    """Podcast records in DynamoDB (one item per ArticleID, subscribers as a String Set)"""
+
+    def __init__(self, table, scan_segments: int = 4, scan_workers: int = None):
+        self.table = table
+        self.scanner = ParallelScanner(table, total_segments=scan_segments, max_workers=scan_workers)
+
+    def get(self, article_id: str) -> dict:
+        return self.table.get_item(Key={'ArticleID': article_id}).get('Item')
+
+    def update(self, article_id: str, data: dict, user_id: str):
+        """Upserts the non-None fields of data and adds user_id to the subscribers"""
+        # Using UpdateItem allows us to Upsert.
+        # If the record doesn't exist, it creates it.
+        # If it does exist, it appends the user to the subscribers String Set (SS).
+
+        # 1. Build the UpdateExpression dynamically from the data dict
+        expression_attribute_values = {
+            ":user": {user_id} # The curly braces make this a Python Set, which Boto3 translates to DynamoDB SS (String Set)
+        }
+        expression_attribute_names = {}
+
+        set_parts = []
+        for k, v in data.items():
+            if v is not None:
+                # We use ExpressionAttributeNames to avoid conflict with reserved DynamoDB words (like 'status', 'source', 'time')
+                attr_name = f"#{k}"
+                attr_val = f":{k}"
+
+                expression_attribute_names[attr_name] = k
+                expression_attribute_values[attr_val] = v
+                set_parts.append(f"{attr_name} = {attr_val}")
+
+        # An empty SET clause (subscriber-only update) is a syntax error, so only emit it when needed
+        update_expression = f"SET {', '.join(set_parts)} " if set_parts else ""
+
+        # Add the ADD clause for the subscribers String Set
+        update_expression += "ADD subscribers :user"
+
+        update_kwargs = {
+            "Key": {'ArticleID': article_id},
+            "UpdateExpression": update_expression,
+            "ExpressionAttributeValues": expression_attribute_values
+        }
+        # DynamoDB rejects an empty ExpressionAttributeNames map
+        if expression_attribute_names:
+            update_kwargs["ExpressionAttributeNames"] = expression_attribute_names
+        self.table.update_item(**update_kwargs)
+
+    def add_subscribers(self, article_id: str, users: set) -> bool:
+        """Returns False (and writes nothing) if the podcast was deleted in the meantime"""
+        try:
+            self.table.update_item(
+                Key={'ArticleID': article_id},
+                # last_subscribed_at lets incremental library syncs pick up newly joined podcasts
+                UpdateExpression="ADD subscribers :users SET last_subscribed_at = :now",
+                # Without it UpdateItem would upsert a stub record for a deleted podcast
+                ConditionExpression="attribute_exists(ArticleID)",
+                ExpressionAttributeValues={":users": set(users), ":now": int(time.time() * 1000)}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def claim(self, article_id: str, lease_seconds: int) -> bool:
+        now = int(time.time())
+        try:
+            self.table.update_item(
+                Key={'ArticleID': article_id},
+                UpdateExpression="SET #status = :processing, claimed_at = :now",
+                ConditionExpression="attribute_not_exists(ArticleID) OR (#status <> :completed AND (attribute_not_exists(claimed_at) OR claimed_at < :stale))",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":processing": "processing", ":completed": "completed", ":now": now, ":stale": now - lease_seconds}
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def release(self, article_id: str):
+        try:
+            self.table.delete_item(
+                Key={'ArticleID': article_id},
+                ConditionExpression="#status = :processing",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":processing": "processing"}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+    def iter_pages(self, user_id: str = None, status: str = None, fields: list = None):
+        """
+        Pages of records, optionally only those user_id subscribes to and/or with the given status,
+        reduced to `fields` (segmented parallel scan, pagination is handled per segment)
+        """
+        scan_kwargs = {}
+        conditions = []
+        if user_id:
+            # We use CONTAINS to check if the user is in the mathematical String Set of subscribers
+            conditions.append(boto3.dynamodb.conditions.Attr('subscribers').contains(user_id))
+        if status:
+            conditions.append(boto3.dynamodb.conditions.Attr('status').eq(status))
+        if conditions:
+            condition = conditions[0]
+            for extra in conditions[1:]:
+                condition = condition & extra
+            scan_kwargs["FilterExpression"] = condition
+        if fields:
+            names = {f"#{field}": field for field in fields}
+            scan_kwargs["ProjectionExpression"] = ", ".join(names)
+            scan_kwargs["ExpressionAttributeNames"] = names
+        return self.scanner.iter_pages(**scan_kwargs)
+
+    def scan(self, user_id: str = None, status: str = None, fields: list = None) -> list:
+        return [item for items in self.iter_pages(user_id, status, fields) for item in items]
+
+    def delete(self, article_id: str):
+        self.table.delete_item(Key={'ArticleID': article_id})
+
+    def purge(self, audio_store, audio_keys, max_workers: int = 4) -> dict:
+        """Deletes every record and its S3 audio (streamed, in concurrent 1000-key chunks)"""
+        purger = BulkPurger(
+            audio_store.s3,
+            self.table,
+            audio_store.bucket,
+            self.scanner,
+            max_workers=max_workers,
+            audio_keys=audio_keys
+        )
+        return purger.run()
+
+def _json_default(value):
+    # DynamoDB-style values that end up in records (usage costs, subscriber sets)
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class SQLiteDatabase:
+    """
+    A SQLite file shared by every worker on the box: WAL mode (readers never block the writer),
+    one connection per thread and process, and BEGIN IMMEDIATE write transactions. SCHEMA is
+    created on first open.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._connect()
+        try:
+            db.executescript(self.SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=30000")
+        return db
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """One connection per thread (and per process: connections must not cross a fork)"""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.db, local.pid = self._connect(), os.getpid()
+        return local.db
+
+    def _transaction(self):
+        return _Transaction(self.db)
+
+class SQLiteMetadataStore(SQLiteDatabase):
+    """
+    Podcast records in a local SQLite database (see SQLiteDatabase). Each record is a JSON document
+    keyed by ArticleID, with status / updated_at columns and a (user, podcast) subscribers table
+    indexed by user for libraries.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS podcasts (
+            article_id TEXT PRIMARY KEY,
+            status TEXT,
+            updated_at INTEGER,
+            claimed_at INTEGER,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS podcasts_status ON podcasts (status, updated_at);
+        CREATE TABLE IF NOT EXISTS subscribers (
+            article_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (article_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS subscribers_user ON subscribers (user_id, article_id);
+    """
+
+    def _record(self, row, subscribers=None) -> dict:
+        item = json.loads(row[0])
+        if subscribers is not None:
+            item["subscribers"] = subscribers
+        return item
+
+    def _subscribers(self, article_id: str) -> set:
+        return {user for (user,) in self.db.execute("SELECT user_id FROM subscribers WHERE article_id = ?", (article_id,))}
+
+    def _write(self, db, article_id: str, item: dict):
+        db.execute(
+            "INSERT INTO podcasts (article_id, status, updated_at, claimed_at, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (article_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+            "claimed_at = excluded.claimed_at, data = excluded.data",
+            (article_id, item.get("status"), item.get("updated_at"), item.get("claimed_at"),
+             json.dumps({k: v for k, v in item.items() if k != "subscribers"}, default=_json_default))
+        )
+
+    def _load(self, db, article_id: str) -> dict:
+        row = db.execute("SELECT data FROM podcasts WHERE article_id = ?", (article_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def get(self, article_id: str) -> dict:
+        row = self.db.execute("SELECT data FROM podcasts WHERE article_id = ?", (article_id,)).fetchone()
+        if not row:
+            return None
+        return self._record(row, self._subscribers(article_id))
+
+    def update(self, article_id: str, data: dict, user_id: str):
+        with self._transaction() as db:
+            item = self._load(db, article_id) or {"ArticleID": article_id}
+            item.update({k: v for k, v in data.items() if v is not None})
+            self._write(db, article_id, item)
+            db.execute("INSERT OR IGNORE INTO subscribers (article_id, user_id) VALUES (?, ?)", (article_id, user_id))
+
+    def add_subscribers(self, article_id: str, users: set) -> bool:
+        """Returns False (and writes nothing) if the podcast was deleted in the meantime"""
+        with self._transaction() as db:
+            item = self._load(db, article_id)
+            if item is None:
+                return False
+            item["last_subscribed_at"] = int(time.time() * 1000)
+            self._write(db, article_id, item)
+            db.executemany("INSERT OR IGNORE INTO subscribers (article_id, user_id) VALUES (?, ?)",
+                           [(article_id, user) for user in users])
+        return True
+
+    def claim(self, article_id: str, lease_seconds: int) -> bool:
+        now = int(time.time())
+        with self._transaction() as db:
+            item = self._load(db, article_id)
+            if item and (item.get("status") == "completed" or (item.get("claimed_at") and item["claimed_at"] >= now - lease_seconds)):
+                return False
+            item = item or {"ArticleID": article_id}
+            item.update(status="processing", claimed_at=now)
+            self._write(db, article_id, item)
+            return True
+
+    def release(self, article_id: str):
+        with self._transaction() as db:
+            if db.execute("DELETE FROM podcasts WHERE article_id = ? AND status = 'processing'", (article_id,)).rowcount:
+                db.execute("DELETE FROM subscribers WHERE article_id = ?", (article_id,))
+
+    def scan(self, user_id: str = None, status: str = None, fields: list = None) -> list:
+        query, params = "SELECT p.data, p.article_id FROM podcasts p", []
+        conditions = []
+        if user_id:
+            query += " JOIN subscribers s ON s.article_id = p.article_id AND s.user_id = ?"
+            params.append(user_id)
+        if status:
+            conditions.append("p.status = ?")
+            params.append(status)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self.db.execute(query, params).fetchall()
+
+        with_subscribers = not fields or "subscribers" in fields
+        subscribers = {}
+        if with_subscribers:
+            subscriber_query, subscriber_params = "SELECT article_id, user_id FROM subscribers", []
+            if user_id:
+                subscriber_query += " WHERE article_id IN (SELECT article_id FROM subscribers WHERE user_id = ?)"
+                subscriber_params.append(user_id)
+            for article_id, user in self.db.execute(subscriber_query, subscriber_params):
+                subscribers.setdefault(article_id, set()).add(user)
+        items = []
+        for data, article_id in rows:
+            item = self._record((data,), subscribers.get(article_id, set()) if with_subscribers else None)
+            if fields:
+                item = {k: v for k, v in item.items() if k in fields}
+            items.append(item)
+        return items
+
+    def iter_pages(self, user_id: str = None, status: str = None, fields: list = None):
+        yield self.scan(user_id, status, fields)
+
+    def delete(self, article_id: str):
+        with self._transaction() as db:
+            db.execute("DELETE FROM podcasts WHERE article_id = ?", (article_id,))
+            db.execute("DELETE FROM subscribers WHERE article_id = ?", (article_id,))
+
+    def purge(self, audio_store, audio_keys, max_workers: int = 4) -> dict:
+        started = time.time()
+        with self._transaction() as db:
+            ids = [article_id for (article_id,) in db.execute("SELECT article_id FROM podcasts")]
+            db.execute("DELETE FROM podcasts")
+            db.execute("DELETE FROM subscribers")
+        objects = 0
+        for article_id in ids:
+            names = audio_keys(article_id)
+            audio_store.delete(names)
+            objects += len(names)
+        return {"records_seen": len(ids), "records_deleted": len(ids), "objects_deleted": objects, "failed": 0,
+                "started": started, "elapsed": time.time() - started}
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: read-modify-write updates hold the write lock throughout"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
@@ -0,0 +1,107 @@
+
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+from backend.telemetry import job_trace
+
+logger = logging.getLogger(__name__)
+
+class SubscriberWriteBehind:
+    """
+    Write-behind buffer for `ADD subscribers` updates.
+    Plays only enqueue (article_id, user); a background thread coalesces them per ArticleID
+    and writes one UpdateItem per article every `flush_interval` seconds, with retries.
+    """
+
+    def __init__(self, flush_interval: float = 2.0, max_attempts: int = 3, max_requeues: int = 5):
+        self.flush_interval = float(flush_interval)
+        self.max_attempts = max(1, int(max_attempts))
+        self.max_requeues = max(0, int(max_requeues))
+        self.store = None
+        self._pending = {}   # article_id -> set of user ids
+        self._requeues = {}  # article_id -> times the batch has been put back after failing
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+
+    def bind(self, store):
+        """Sets the podcast record store (storage.py) the flusher writes to"""
+        self.store = store
+
+    def add(self, article_id: str, user_id: str):
+        with self._lock:
+            self._pending.setdefault(article_id, set()).add(user_id)
+            # Started lazily so it lives in the worker process, not in a pre-fork master
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="subscriber-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with job_trace("subscriber-flush"):
+                self.flush()
+
+    def _write(self, article_id: str, users: set) -> bool:
+        for attempt in range(self.max_attempts):
+            try:
+                # Also stamps last_subscribed_at, so incremental library syncs pick up newly joined podcasts
+                if not self.store.add_subscribers(article_id, users):
+                    logger.info("Dropping %d subscriber(s) for %s: the podcast was deleted", len(users), article_id)
+                return True
+            except Exception as e:
+                logger.warning("Subscriber flush failed for %s (attempt %d): %s", article_id, attempt + 1, e)
+                # Jittered exponential backoff: ~0.2s, 0.4s, 0.8s...
+                time.sleep((0.2 * (2 ** attempt)) * (0.5 + random.random()))
+        return False
+
+    def flush(self) -> int:
+        """Writes everything queued so far. Returns the number of UpdateItem calls made."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch or self.store is None:
+            with self._lock:
+                for article_id, users in batch.items():
+                    self._pending.setdefault(article_id, set()).update(users)
+            return 0
+
+        writes = 0
+        for article_id, users in batch.items():
+            writes += 1
+            if self._write(article_id, users):
+                self._requeues.pop(article_id, None)
+                continue
+
+            requeues = self._requeues.get(article_id, 0) + 1
+            if requeues > self.max_requeues:
+                logger.error("Dropping %d subscriber(s) for %s after repeated failures", len(users), article_id)
+                self._requeues.pop(article_id, None)
+                continue
+            self._requeues[article_id] = requeues
+            with self._lock:
+                self._pending.setdefault(article_id, set()).update(users)
+
+        if writes:
+            logger.debug("Flushed subscriber additions for %d podcast(s)", writes)
+        return writes
+
+    def drain(self):
+        """Stops the background thread and flushes whatever is still queued (called on shutdown)"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(users) for users in self._pending.values())
+
+# Singleton instance (one queue per worker process)
+subscriber_queue = SubscriberWriteBehind(flush_interval=float(os.getenv("SUBSCRIBER_FLUSH_INTERVAL", "2")))
+atexit.register(subscriber_queue.drain)
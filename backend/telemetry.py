@@ -0,0 +1,124 @@
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Trace ID of the request (or background job) currently running, shared by its spans and log lines
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+
+# Incoming X-Request-ID values we are willing to reuse as trace IDs (e.g. nginx's $request_id)
+TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# Spans at least this slow are also logged (with the trace ID, see logs.py)
+SPAN_LOG_THRESHOLD = float(os.getenv("SPAN_LOG_THRESHOLD_MS", "250")) / 1000
+
+# Seconds. AI stages run from tens of milliseconds (cache hits) up to the 120s worker timeout.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 120)
+
+SPAN_SECONDS = Histogram("papercast_span_seconds", "Duration of traced operations", ["span"], buckets=LATENCY_BUCKETS)
+SPAN_ERRORS = Counter("papercast_span_errors_total", "Traced operations that raised", ["span"])
+REQUEST_SECONDS = Histogram("papercast_http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS)
+CACHE_EVENTS = Counter("papercast_cache_events_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"])
+FALLBACKS = Counter("papercast_fallbacks_total", "Degraded-path fallbacks taken (Joanna voice, standard engine, plain summary)", ["kind"])
+ENRICHMENTS = Counter("papercast_enrichments_total", "Background full-text extractions of headlines by result (ok/short/failed)", ["result"])
+BEDROCK_JSON_FAILURES = Counter("papercast_bedrock_json_failures_total", "Bedrock responses whose JSON needed the last-resort parse or could not be parsed", ["outcome"])
+
+# Per AWS API call, recorded by the botocore hooks in aws_usage.py
+AWS_CALLS = Counter("papercast_aws_calls_total", "AWS API calls by service, operation and outcome (ok/error)", ["service", "operation", "outcome"])
+AWS_CALL_SECONDS = Histogram("papercast_aws_call_seconds", "AWS API call latency including retries", ["service", "operation"], buckets=LATENCY_BUCKETS)
+AWS_RETRIES = Counter("papercast_aws_retries_total", "Retry attempts made by botocore", ["service", "operation"])
+AWS_THROTTLES = Counter("papercast_aws_throttles_total", "Attempts rejected with a throttling error", ["service", "operation"])
+AWS_BILLABLE_UNITS = Counter("papercast_aws_billable_units_total", "Billable units (tokens, characters, Comprehend units, requests)", ["service", "unit"])
+AWS_COST = Counter("papercast_aws_cost_usd_total", "Estimated AWS spend at list prices", ["service"])
+
+# Adaptive concurrency limiters for the AI services (aws_limits.py); the limit gauge sums across live workers
+AWS_CONCURRENCY_LIMIT = Gauge("papercast_aws_concurrency_limit", "Current adaptive concurrency limit", ["service"], multiprocess_mode="livesum")
+AWS_LIMITER_WAIT_SECONDS = Histogram("papercast_aws_limiter_wait_seconds", "Time spent waiting for a concurrency slot", ["service"], buckets=LATENCY_BUCKETS)
+AWS_LIMITER_RETRIES = Counter("papercast_aws_limiter_retries_total", "Calls retried by the limiter after a throttle or transient error", ["service", "reason"])
+AWS_BUSY = Counter("papercast_aws_busy_total", "Calls given up on because the service stayed throttled or saturated", ["service"])
+
+def new_trace_id(candidate: str = None) -> str:
+    """Reuses a well-formed upstream request ID, otherwise mints a new one"""
+    if candidate and TRACE_ID_PATTERN.match(candidate):
+        return candidate
+    return uuid.uuid4().hex
+
+def current_trace_id() -> str:
+    return trace_id_var.get()
+
+def record_cache(cache: str, hit: bool):
+    CACHE_EVENTS.labels(cache, "hit" if hit else "miss").inc()
+
+@contextmanager
+def span(name: str):
+    """Times a block into papercast_span_seconds{span=name}; slow spans are logged with the trace ID"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SPAN_ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_SECONDS.labels(name).observe(elapsed)
+        if elapsed >= SPAN_LOG_THRESHOLD:
+            logger.info("%s took %.0fms", name, elapsed * 1000)
+
+def traced(name: str):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def trace_methods(prefix: str):
+    """Class decorator: wraps every public method in a span named '<prefix>.<method>'"""
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not attr.startswith("_") and inspect.isfunction(value):
+                setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+@contextmanager
+def job_trace(prefix: str):
+    """Gives a background job (e.g. a subscriber flush) its own trace ID for its spans and log lines"""
+    token = trace_id_var.set(f"{prefix}-{uuid.uuid4().hex[:12]}")
+    try:
+        yield
+    finally:
+        trace_id_var.reset(token)
+
+def with_trace(func):
+    """
+    Carries the caller's context (trace ID, podcast cost attribution) into a function run on
+    another thread (e.g. a ThreadPoolExecutor). Each call runs in its own copy, so the wrapper
+    can be mapped over a pool concurrently.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def render_metrics() -> tuple:
+    """(body, content type) in the Prometheus text format. With PROMETHEUS_MULTIPROC_DIR set, all gunicorn workers are aggregated."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
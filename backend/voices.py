@@ -0,0 +1,162 @@
+
+import json
+import logging
+import os
+import threading
+import time
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Tried in order after the requested voice's neural engine
+FALLBACK_VOICES = [("Joanna", "neural"), ("Joanna", "standard")]
+
+# Errors that mean "this voice/engine/language combination can't work here" (as opposed to
+# throttling, bad text or a network hiccup), so the outcome is worth remembering. ValidationException
+# is left out on purpose: Polly also raises it for bad input, which says nothing about the voice
+CAPABILITY_ERROR_CODES = {"EngineNotSupportedException", "LanguageNotSupportedException"}
+
+# How long a describe_voices snapshot is trusted; refreshed lazily after that
+VOICE_CAPABILITY_TTL = float(os.getenv("VOICE_CAPABILITY_TTL", "86400"))
+# Retry a failed describe_voices after this many seconds instead of on every segment
+SEED_RETRY_INTERVAL = 300
+
+# Optional JSON file shared by every worker on the host (e.g. /tmp/papercast-voices.json),
+# so describe_voices runs once per host and a learned failure is skipped everywhere
+VOICE_CAPABILITY_FILE = os.getenv("VOICE_CAPABILITY_FILE")
+
+class VoiceCapabilities:
+    """
+    Known outcomes of (region, voice, engine, language) for Polly. describe_voices seeds which
+    engines each voice supports (language None = any language); synthesis results add
+    language-specific outcomes. candidates() then skips every combination known to fail.
+    """
+
+    def __init__(self, ttl: float = VOICE_CAPABILITY_TTL, path: str = VOICE_CAPABILITY_FILE):
+        self.ttl = ttl
+        self.path = path
+        self._outcomes = {}   # (region, voice, engine, language or None) -> bool
+        self._seeded_at = {}  # region -> unix time of the describe_voices snapshot
+        self._voices = {}     # region -> voice ids offered there (a voice missing from it can't work)
+        self._file_mtime = None
+        self._lock = threading.Lock()
+
+    def known(self, region: str, voice: str, engine: str, language: str):
+        """True/False when the outcome is known, None when it has to be tried"""
+        offered = self._voices.get(region)
+        if offered and voice not in offered:
+            return False
+        outcome = self._outcomes.get((region, voice, engine, language))
+        if outcome is None:
+            outcome = self._outcomes.get((region, voice, engine, None))
+        return outcome
+
+    def candidates(self, region: str, voice: str, language: str) -> list:
+        """(voice, engine) pairs to try in order, leaving out the ones known to fail"""
+        ordered = [(voice, "neural")] + [pair for pair in FALLBACK_VOICES if pair != (voice, "neural")]
+        return [(v, engine) for v, engine in ordered if self.known(region, v, engine, language) is not False]
+
+    def record(self, region: str, voice: str, engine: str, language: str, ok: bool):
+        if self.known(region, voice, engine, language) == ok:
+            return
+        with self._lock:
+            self._outcomes[(region, voice, engine, language)] = ok
+        self._save()
+
+    def record_failure(self, region: str, voice: str, engine: str, language: str, error: Exception) -> bool:
+        """Remembers the failure when it is a capability error. Returns whether it was remembered."""
+        if not isinstance(error, ClientError) or error.response.get("Error", {}).get("Code") not in CAPABILITY_ERROR_CODES:
+            return False
+        self.record(region, voice, engine, language, False)
+        return True
+
+    def seed(self, region: str, voices: list):
+        """Records which engines each voice in a describe_voices response supports"""
+        engines = {engine for v in voices for engine in v.get("SupportedEngines", [])} | {"standard", "neural"}
+        with self._lock:
+            for key in [key for key in self._outcomes if key[0] == region and key[3] is None]:
+                del self._outcomes[key]
+            for v in voices:
+                supported = set(v.get("SupportedEngines", []))
+                for engine in engines:
+                    self._outcomes[(region, v["Id"], engine, None)] = engine in supported
+            self._seeded_at[region] = time.time()
+            if voices:
+                self._voices[region] = {v["Id"] for v in voices}
+        logger.info("Polly voice capabilities seeded for %s: %d voices", region, len(voices))
+        self._save()
+
+    def ensure_seeded(self, region: str, polly, call=None):
+        """
+        Seeds the region from describe_voices once per TTL (from the shared file when another
+        worker already did). `call` wraps the request (e.g. the Polly concurrency limiter).
+        """
+        self._load()
+        if time.time() - self._seeded_at.get(region, 0) < self.ttl:
+            return
+        with self._lock:
+            if time.time() - self._seeded_at.get(region, 0) < self.ttl:
+                return
+            # Claim the refresh; on failure the next attempt waits SEED_RETRY_INTERVAL
+            self._seeded_at[region] = time.time() - self.ttl + SEED_RETRY_INTERVAL
+        try:
+            voices, kwargs = [], {"IncludeAdditionalLanguageCodes": True}
+            while True:
+                response = call(polly.describe_voices, **kwargs) if call else polly.describe_voices(**kwargs)
+                voices.extend(response.get("Voices", []))
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+        except Exception as e:
+            logger.warning("Polly describe_voices failed, voices will be learned from synthesis: %s", e)
+            return
+        self.seed(region, voices)
+
+    def _read_file(self, overwrite: bool):
+        """Merges the shared file into memory; file values win when `overwrite` (they are newer)"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._file_mtime:
+                return
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for region, seeded_at in data.get("seeded_at", {}).items():
+                self._seeded_at[region] = max(self._seeded_at.get(region, 0), seeded_at)
+            for region, offered in data.get("voices", {}).items():
+                if overwrite or region not in self._voices:
+                    self._voices[region] = set(offered)
+            for region, voice, engine, language, ok in data.get("outcomes", []):
+                key = (region, voice, engine, language)
+                if overwrite or key not in self._outcomes:
+                    self._outcomes[key] = ok
+            self._file_mtime = mtime
+
+    def _load(self):
+        """Picks up outcomes written by other workers (cheap stat when the file is unchanged)"""
+        if self.path:
+            self._read_file(overwrite=True)
+
+    def _save(self):
+        if not self.path:
+            return
+        # Keep what other workers wrote since our last read, without undoing what we just learned
+        self._read_file(overwrite=False)
+        with self._lock:
+            data = {
+                "seeded_at": dict(self._seeded_at),
+                "voices": {region: sorted(offered) for region, offered in self._voices.items()},
+                "outcomes": [list(key) + [ok] for key, ok in self._outcomes.items()]
+            }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._file_mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.warning("Could not write voice capability file %s: %s", self.path, e)
+
+voice_capabilities = VoiceCapabilities()
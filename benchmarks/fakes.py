@@ -0,0 +1,160 @@
+"""
+Deterministic local stand-ins for the external services used by the benchmark harness:
+a GNews HTTP server and Bedrock / Polly / Comprehend / Translate clients with configurable latency.
+S3, DynamoDB and Cognito are provided by moto (see benchmarks/run.py).
+"""
+import hashlib
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SENTENCE = "Officials said the new policy would take effect next month after a lengthy review by regulators."
+
+def fake_article_text(seed: str, sentences: int = 12) -> str:
+    words = SENTENCE.split()
+    offset = int(hashlib.md5(seed.encode()).hexdigest()[:4], 16) % len(words)
+    return " ".join(" ".join(words[offset:] + words[:offset]) for _ in range(sentences))
+
+class _LatencyMixin:
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+class FakeBedrock(_LatencyMixin):
+    """bedrock-runtime converse() returning the JSON insights document the prompt asks for"""
+
+    def __init__(self, latency_ms: float = 0, script_turns: int = 8):
+        super().__init__(latency_ms)
+        self.script_turns = script_turns
+
+    def converse(self, modelId, messages, **kwargs):
+        self._wait()
+        prompt = messages[-1]["content"][0]["text"]
+        speakers = ["[HOST]", "[EXPERT]"]
+        script = " ".join(f"{speakers[i % 2]}: {SENTENCE}" for i in range(self.script_turns))
+        body = {
+            "summary": SENTENCE * 3,
+            "key_points": [SENTENCE] * 3,
+            "tldr": SENTENCE,
+            "script": script
+        }
+        input_tokens = len(prompt) // 4
+        output_text = json.dumps(body)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": output_text}]}},
+            "usage": {"inputTokens": input_tokens, "outputTokens": len(output_text) // 4, "totalTokens": input_tokens + len(output_text) // 4},
+            "stopReason": "end_turn"
+        }
+
+class FakePolly(_LatencyMixin):
+    """synthesize_speech() returning a deterministic byte stream (~1 KB per 10 characters)"""
+
+    def synthesize_speech(self, Text, OutputFormat="mp3", VoiceId=None, Engine="neural", **kwargs):
+        self._wait()
+        return {"AudioStream": io.BytesIO(b"\xff\xfb" * (50 * max(1, len(Text) // 10))), "RequestCharacters": len(Text)}
+
+    def describe_voices(self, **kwargs):
+        self._wait()
+        return {"Voices": []}
+
+class FakeComprehend(_LatencyMixin):
+    def detect_sentiment(self, Text, LanguageCode):
+        self._wait()
+        return {"Sentiment": "NEUTRAL", "SentimentScore": {"Positive": 0.1, "Negative": 0.1, "Neutral": 0.7, "Mixed": 0.1}}
+
+    def detect_key_phrases(self, Text, LanguageCode):
+        self._wait()
+        return {"KeyPhrases": [{"Text": phrase, "Score": 0.9} for phrase in ["the new policy", "next month", "a lengthy review"]]}
+
+    def detect_entities(self, Text, LanguageCode):
+        self._wait()
+        return {"Entities": [{"Text": "Regulators", "Type": "ORGANIZATION", "Score": 0.9}]}
+
+class FakeTranslate(_LatencyMixin):
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        self._wait()
+        return {"TranslatedText": f"[{TargetLanguageCode}] {Text}", "SourceLanguageCode": SourceLanguageCode, "TargetLanguageCode": TargetLanguageCode}
+
+class FakeGNewsServer:
+    """
+    Serves /api/v4/top-headlines and /api/v4/search with deterministic articles on 127.0.0.1,
+    and each article's full-text page under /articles/ (fetched by the app's background enrichment)
+    """
+
+    def __init__(self, latency_ms: float = 0, articles: int = 10):
+        self.latency = latency_ms / 1000
+        self.articles = articles
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.endswith("/top-headlines"):
+                    seed = params.get("category", "general")
+                elif url.path.endswith("/search"):
+                    seed = "search-" + params.get("q", "")
+                elif url.path.startswith("/articles/"):
+                    self.send_page(server.article_page(url.path[len("/articles/"):]))
+                    return
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps({"totalArticles": server.articles, "articles": server.build_articles(seed, int(params.get("max", 10)))}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def send_page(self, html: bytes):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(html)))
+                self.end_headers()
+                self.wfile.write(html)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fake-gnews", daemon=True)
+
+    def build_articles(self, seed: str, limit: int) -> list:
+        return [{
+            "title": f"{seed.title()} story {i}: {SENTENCE[:40]}",
+            "description": SENTENCE,
+            "content": fake_article_text(f"{seed}-{i}"),
+            "url": f"http://127.0.0.1:{self.httpd.server_address[1]}/articles/{seed}/{i}",
+            "publishedAt": "2026-01-01T00:00:00Z",
+            "source": {"name": "Example Wire", "url": "https://news.example.com"}
+        } for i in range(min(limit, self.articles))]
+
+    def article_page(self, key: str) -> bytes:
+        paragraphs = "".join(f"<p>{fake_article_text(f'{key}-{n}', 4)}</p>" for n in range(10))
+        return f"<html><body><h1>{key}</h1>{paragraphs}</body></html>".encode()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/api/v4"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,384 @@
+"""
+Offline load benchmark for the Papercast web app.
+
+Everything external is local: GNews is a fake HTTP server, S3 / DynamoDB / Cognito are moto,
+and Bedrock / Polly / Comprehend / Translate are deterministic fakes with configurable latency.
+The app runs under uvicorn in this process and each scenario is driven at a fixed concurrency.
+
+Run from the repository root (needs benchmarks/requirements.txt):
+    python -m benchmarks.run --concurrency 8 --requests 200 --table-size 1000 --output report.json
+    python -m benchmarks.run --scenarios library,admin_podcasts --baseline report.json
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.fakes import FakeBedrock, FakeComprehend, FakeGNewsServer, FakePolly, FakeTranslate, fake_article_text
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_USER = "bench-user"
+BENCH_ADMIN = "bench-admin"
+CATEGORIES = ["general", "world", "business", "technology", "science", "sports", "health"]
+
+SCENARIOS = ["dashboard", "generate_cold", "generate_cached", "library", "library_api", "search_api", "search_library", "admin", "admin_podcasts", "admin_users"]
+
+def configure_environment(args, work_dir: str):
+    """Must run before any backend module is imported (they read their settings at import time)"""
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_REGION": "us-east-1",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "S3_BUCKET_NAME": "papercast-bench",
+        "DYNAMODB_TABLE_NAME": "PapercastBench",
+        "NEWS_API_KEY": "bench",
+        "AUDIO_CACHE_DIR": os.path.join(work_dir, "audio"),
+        "JINJA_BYTECODE_CACHE_DIR": os.path.join(work_dir, "jinja"),
+        "SPAN_LOG_THRESHOLD_MS": str(args.span_log_ms),
+        # Every fake article page is on one host; don't throttle enrichment like a real publisher
+        "ENRICH_PER_DOMAIN": "4",
+        "ENRICH_DOMAIN_INTERVAL": "0",
+        "STORAGE_BACKEND": args.storage,
+        "LOCAL_AUDIO_DIR": os.path.join(work_dir, "local-audio"),
+        "SQLITE_PATH": os.path.join(work_dir, "papercast.db"),
+        "SEARCH_INDEX_PATH": os.path.join(work_dir, "search.db")
+    })
+    # App logging would otherwise interleave with the results table
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.pop("COGNITO_CLIENT_SECRET", None)
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+def create_aws_resources(args) -> dict:
+    import boto3
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket=os.environ["S3_BUCKET_NAME"])
+
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    table = dynamodb.create_table(
+        TableName=os.environ["DYNAMODB_TABLE_NAME"],
+        KeySchema=[{'AttributeName': 'ArticleID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ArticleID', 'AttributeType': 'S'}],
+        BillingMode="PAY_PER_REQUEST"
+    )
+
+    cognito = boto3.client("cognito-idp", region_name="us-east-1")
+    pool_id = cognito.create_user_pool(PoolName="papercast-bench")["UserPool"]["Id"]
+    client_id = cognito.create_user_pool_client(UserPoolId=pool_id, ClientName="bench")["UserPoolClient"]["ClientId"]
+    for i in range(args.users):
+        cognito.admin_create_user(UserPoolId=pool_id, Username=f"user{i:05d}",
+                                  UserAttributes=[{"Name": "email", "Value": f"user{i:05d}@example.com"}])
+    os.environ["COGNITO_USER_POOL_ID"] = pool_id
+    os.environ["COGNITO_CLIENT_ID"] = client_id
+    return {"table": table}
+
+def seeded_podcasts(table_size: int, library_size: int):
+    """Completed podcasts with realistic script/summary sizes; the first library_size belong to BENCH_USER"""
+    script = " ".join(f"[{'HOST' if i % 2 == 0 else 'EXPERT'}]: {fake_article_text(str(i), 2)}" for i in range(12))
+    now = int(time.time() * 1000)
+    for i in range(table_size):
+        yield {
+            "ArticleID": f"seed-{i:06d}",
+            "status": "completed",
+            "language": "en",
+            "title": f"Seeded story {i}",
+            "source": "Example Wire",
+            "time": "2026-01-01T00:00:00Z",
+            "summary": fake_article_text(f"summary-{i}", 4),
+            "tldr": "A seeded story for benchmarking.",
+            "key_points": ["Point one", "Point two", "Point three"],
+            "script": script,
+            "nlp_sentiment": "NEUTRAL",
+            "nlp_key_phrases": ["policy", "review"],
+            "nlp_entities": ["Regulators (ORGANIZATION)"],
+            "subscribers": {BENCH_USER if i < library_size else "someone-else"},
+            "audio_variants": {"standard": {"key": f"seed-{i:06d}.mp3", "format": "mp3", "sample_rate": "default", "bytes": 1024}},
+            "updated_at": now - i
+        }
+
+def seed_podcasts(args, resources: dict):
+    items = seeded_podcasts(args.table_size, args.library_size)
+    if args.storage == "local":
+        from backend.storage import SQLiteMetadataStore
+        store = SQLiteMetadataStore(os.environ["SQLITE_PATH"])
+        for item in items:
+            subscribers = item.pop("subscribers")
+            store.update(item["ArticleID"], item, subscribers.pop())
+        return
+    with resources["table"].batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+class StaticJWKS:
+    """Stands in for PyJWKClient: every token is checked against the harness's own key"""
+
+    def __init__(self, public_key):
+        self.public_key = public_key
+
+    def get_signing_key_from_jwt(self, token):
+        return type("SigningKey", (), {"key": self.public_key})()
+
+def install_auth(main_module) -> dict:
+    """Points the app's ID token verifier at a local RSA key and mints user/admin tokens"""
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from backend.auth import ADMIN_GROUP, get_verifier
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = get_verifier(main_module.AUTH_CONFIG)
+    verifier.jwks = StaticJWKS(key.public_key())
+
+    def mint(username, groups):
+        claims = {
+            "iss": verifier.issuer, "aud": verifier.client_id, "token_use": "id",
+            "exp": int(time.time()) + 24 * 3600, "cognito:username": username, "cognito:groups": groups
+        }
+        return jwt.encode(claims, key, algorithm="RS256")
+
+    return {"user": f"id_token={mint(BENCH_USER, [])}", "admin": f"id_token={mint(BENCH_ADMIN, [ADMIN_GROUP])}"}
+
+def install_ai_fakes(args) -> dict:
+    from backend import real_aws
+    fakes = {
+        "bedrock-runtime": FakeBedrock(args.bedrock_ms),
+        "polly": FakePolly(args.polly_ms),
+        "comprehend": FakeComprehend(args.comprehend_ms),
+        "translate": FakeTranslate(args.translate_ms)
+    }
+    shared_client = real_aws.aws_client
+    real_aws.aws_client = lambda service_name: fakes.get(service_name) or shared_client(service_name)
+    return fakes
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, lifespan="off"))
+    thread = threading.Thread(target=server.run, name="bench-uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+def build_scenarios(args, cookies: dict, news_service) -> dict:
+    """name -> (cookie, request factory(i) -> (method, path, body))"""
+    def cold_article(i):
+        article_id = f"bench-cold-{i:06d}"
+        news_service.cache[article_id] = {
+            "id": article_id, "title": f"Cold story {i}", "source": "Example Wire", "category": "General",
+            "time": "2026-01-01T00:00:00Z", "content": fake_article_text(article_id, args.article_sentences),
+            "url": f"https://news.example.com/cold/{i}"
+        }
+        return article_id
+
+    cold_ids = itertools.count()
+    cached_id = cold_article(10 ** 6)
+    generate_body = json.dumps({"language": args.language})
+
+    return {
+        "dashboard": ("user", lambda i: ("GET", f"/dashboard?category={CATEGORIES[i % len(CATEGORIES)]}", None)),
+        "generate_cold": ("user", lambda i: ("POST", f"/api/generate_audio/{cold_article(next(cold_ids))}", generate_body)),
+        "generate_cached": ("user", lambda i: ("POST", f"/api/generate_audio/{cached_id}", generate_body)),
+        "library": ("user", lambda i: ("GET", "/library", None)),
+        "library_api": ("user", lambda i: ("GET", "/api/library", None)),
+        "search_api": ("user", lambda i: ("GET", f"/api/search?scope=catalogue&q=seeded+story+{i % 50}", None)),
+        "search_library": ("user", lambda i: ("GET", "/library?q=regulators+policy&sentiment=NEUTRAL", None)),
+        "admin": ("admin", lambda i: ("GET", "/admin", None)),
+        "admin_podcasts": ("admin", lambda i: ("GET", "/admin/podcasts", None)),
+        "admin_users": ("admin", lambda i: ("GET", "/admin/users", None))
+    }
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def run_scenario(port: int, cookie: str, make_request, total: int, concurrency: int, warmup: int) -> dict:
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def worker(measured: bool, limit: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        try:
+            while True:
+                with lock:
+                    i = next(counter)
+                if i >= limit:
+                    return
+                method, path, body = make_request(i)
+                headers = {"Cookie": cookie}
+                if body is not None:
+                    headers["Content-Type"] = "application/json"
+                started = time.perf_counter()
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+                    status = repr(e)
+                elapsed = time.perf_counter() - started
+                if measured:
+                    with lock:
+                        latencies.append(elapsed)
+                        if status not in (200, 304):
+                            errors.append(status)
+        finally:
+            conn.close()
+
+    if warmup:
+        worker(False, warmup)
+        counter = itertools.count(warmup)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, True, warmup + total) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": len(errors),
+        "error_samples": sorted({str(e) for e in errors})[:5],
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "rps": round(len(ordered) / duration, 2) if duration else 0.0,
+        "mean_ms": round(statistics.mean(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(report: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange vs {baseline_path} (commit {baseline.get('git_commit')}):")
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not before.get("rps"):
+            continue
+        rps_change = (result["rps"] - before["rps"]) / before["rps"] * 100
+        p99_change = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100 if before["p99_ms"] else 0.0
+        print(f"  {name:<16} rps {rps_change:+7.1f}%   p99 {p99_change:+7.1f}%")
+
+def main(args):
+    try:
+        from moto import mock_aws
+    except ImportError:
+        sys.exit("moto is required: pip install -r benchmarks/requirements.txt")
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(SCENARIOS)}")
+
+    work_dir = tempfile.mkdtemp(prefix="papercast-bench-")
+    configure_environment(args, work_dir)
+    gnews = FakeGNewsServer(latency_ms=args.gnews_ms).start()
+
+    with mock_aws():
+        resources = create_aws_resources(args)
+        seed_podcasts(args, resources)
+
+        # The app reads its configuration at import time, so it is imported only now
+        sys.path.insert(0, REPO_ROOT)
+        import backend.main as app_module
+        from backend.news_service import news_service
+        from backend.real_aws import RealAWSService, search_index
+        from backend.subscriber_queue import subscriber_queue
+
+        news_service.base_url = gnews.base_url
+        # Seeded records bypass the app, so index them the way an existing deployment would be
+        search_index().rebuild(RealAWSService().metadata.iter_pages())
+        fakes = install_ai_fakes(args)
+        cookies = install_auth(app_module)
+        scenarios = build_scenarios(args, cookies, news_service)
+
+        port = free_port()
+        server, thread = start_server(app_module.app, port)
+        print(f"Benchmarking {len(args.scenarios)} scenario(s): {args.requests} requests at concurrency {args.concurrency}, "
+              f"{args.table_size} podcasts ({args.library_size} in the user's library), {args.users} users")
+
+        report = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+            "scenarios": {}
+        }
+        try:
+            for name in args.scenarios:
+                cookie_kind, make_request = scenarios[name]
+                requests = args.cold_requests if name == "generate_cold" else args.requests
+                result = run_scenario(port, cookies[cookie_kind], make_request, requests, args.concurrency, 0 if name == "generate_cold" else args.warmup)
+                report["scenarios"][name] = result
+                print(f"  {name:<16} {result['rps']:>9.1f} req/s   p50 {result['p50_ms']:>8.1f} ms   "
+                      f"p99 {result['p99_ms']:>8.1f} ms   errors {result['errors']}")
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+            subscriber_queue.drain()
+            gnews.stop()
+
+        report["fake_calls"] = {service: fake.calls for service, fake in fakes.items()}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.baseline:
+        print_comparison(report, args.baseline)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline Papercast load benchmark (fake GNews, moto AWS, fake AI services)")
+    parser.add_argument("--scenarios", type=lambda v: [s.strip() for s in v.split(",") if s.strip()], default=SCENARIOS,
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--cold-requests", type=int, default=40, help="Measured requests for generate_cold (each generates a new podcast)")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--table-size", type=int, default=500, help="Completed podcasts seeded into DynamoDB")
+    parser.add_argument("--library-size", type=int, default=50, help="How many of them the benchmark user subscribes to")
+    parser.add_argument("--storage", choices=["aws", "local"], default="aws",
+                        help="STORAGE_BACKEND under test: moto S3/DynamoDB, or local files and SQLite")
+    parser.add_argument("--users", type=int, default=100, help="Cognito users created for the admin directory")
+    parser.add_argument("--language", default="en", help="Target language for generate_* (non-English adds Translate calls)")
+    parser.add_argument("--article-sentences", type=int, default=40, help="Length of generated article bodies")
+    parser.add_argument("--gnews-ms", type=float, default=80, help="Fake GNews latency per request")
+    parser.add_argument("--bedrock-ms", type=float, default=1500, help="Fake Bedrock latency per converse call")
+    parser.add_argument("--polly-ms", type=float, default=150, help="Fake Polly latency per synthesize_speech call")
+    parser.add_argument("--comprehend-ms", type=float, default=60, help="Fake Comprehend latency per call")
+    parser.add_argument("--translate-ms", type=float, default=80, help="Fake Translate latency per call")
+    parser.add_argument("--span-log-ms", type=float, default=60000, help="SPAN_LOG_THRESHOLD_MS for the app under test")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    main(parser.parse_args())
@@ -0,0 +1,154 @@
+"""
+Worker startup profile: import time of backend.main in a fresh interpreter, and the boot time
+and per-worker memory (RSS and PSS) of a real gunicorn server with and without preload_app.
+
+Run from the repository root (Linux only, reads /proc):
+    python benchmarks/startup.py --workers 3 --json startup_report.json
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import backend.main; print(time.perf_counter() - t)"
+
+def measure_import_time(runs: int) -> dict:
+    """Wall-clock import time of backend.main, each run in a new interpreter"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return {
+        "runs": runs,
+        "median_s": round(statistics.median(timings), 4),
+        "min_s": round(min(timings), 4),
+        "max_s": round(max(timings), 4)
+    }
+
+def slowest_imports(limit: int) -> list:
+    """Top modules by cumulative import time, from python -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.strip()))
+    rows.sort(reverse=True)
+    return [{"module": module, "cumulative_ms": round(us / 1000, 1)} for us, module in rows[:limit]]
+
+def read_memory_kb(pid: int) -> dict:
+    """RSS from /proc/<pid>/status and PSS (shared pages split between sharers) from smaps_rollup"""
+    memory = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                memory["rss_kb"] = int(line.split()[1])
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass  # older kernels
+    return memory
+
+def child_pids(parent_pid: int) -> list:
+    children = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                # The comm field may contain spaces, so split after its closing parenthesis
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            children.append(int(name))
+    return children
+
+def profile_gunicorn(workers: int, port: int, preload: bool, boot_timeout: float) -> dict:
+    """Starts gunicorn with deploy/gunicorn_conf.py, waits until every worker answers, then samples memory"""
+    env = dict(os.environ, GUNICORN_WORKERS=str(workers), GUNICORN_PRELOAD="1" if preload else "0")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "deploy/gunicorn_conf.py", "--bind", f"127.0.0.1:{port}", "backend.main:app"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        ready_at = None
+        while time.perf_counter() - started < boot_timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+            if len(child_pids(server.pid)) >= workers:
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/login", timeout=2).read()
+                    ready_at = time.perf_counter()
+                    break
+                except OSError:
+                    pass
+            time.sleep(0.05)
+        if ready_at is None:
+            raise RuntimeError(f"gunicorn did not become ready within {boot_timeout}s")
+
+        # Let the remaining workers finish booting before sampling
+        time.sleep(1.0)
+        worker_memory = [read_memory_kb(pid) for pid in child_pids(server.pid)]
+        return {
+            "preload_app": preload,
+            "workers": workers,
+            "boot_s": round(ready_at - started, 3),
+            "master": read_memory_kb(server.pid),
+            "worker_rss_kb_avg": round(statistics.mean(m["rss_kb"] for m in worker_memory)),
+            "worker_pss_kb_avg": round(statistics.mean(m.get("pss_kb", 0) for m in worker_memory)),
+            "total_pss_kb": sum(m.get("pss_kb", 0) for m in worker_memory) + read_memory_kb(server.pid).get("pss_kb", 0)
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile Papercast worker import time and per-worker memory")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter import runs")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    parser.add_argument("--boot-timeout", type=float, default=60)
+    parser.add_argument("--skip-gunicorn", action="store_true", help="Only measure import time")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "import": measure_import_time(args.runs),
+        "slowest_imports": slowest_imports(args.top)
+    }
+    print(f"Import backend.main: median {report['import']['median_s']}s (min {report['import']['min_s']}s, {args.runs} runs)")
+    for row in report["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:>8} ms  {row['module']}")
+
+    if not args.skip_gunicorn:
+        report["gunicorn"] = []
+        for preload in (True, False):
+            result = profile_gunicorn(args.workers, args.port, preload, args.boot_timeout)
+            report["gunicorn"].append(result)
+            print(
+                f"gunicorn preload_app={preload}: ready in {result['boot_s']}s, "
+                f"worker RSS {result['worker_rss_kb_avg'] // 1024} MB, PSS {result['worker_pss_kb_avg'] // 1024} MB, "
+                f"total PSS {result['total_pss_kb'] // 1024} MB ({args.workers} workers + master)"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
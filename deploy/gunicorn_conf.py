@@ -1,17 +1,39 @@
 
 # Gunicorn configuration file
 import multiprocessing
+import os
 
 # Bind to localhost on port 8000 (standard for our app)
 bind = "127.0.0.1:8000"
 
 # Number of worker processes
 # Formula: (2 x num_cores) + 1
-workers = (multiprocessing.cpu_count() * 2) + 1
+workers = int(os.getenv("GUNICORN_WORKERS", (multiprocessing.cpu_count() * 2) + 1))
 
 # Type of worker
 worker_class = "uvicorn.workers.UvicornWorker"
 
+# Import the app once in the master and fork workers from it, so imported modules and
+# preloaded AWS models are shared copy-on-write. Code changes then need a full restart
+# (not a HUP). Set GUNICORN_PRELOAD=0 to compare against per-worker imports.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+def when_ready(server):
+    # Runs in the master before any worker is forked
+    if not preload_app:
+        return
+    from backend.real_aws import preload_service_models
+    preload_service_models()
+    # Link extraction imports these lazily; load them once here instead of in every worker
+    import bs4, lxml.etree
+    server.log.info("Preloaded AWS service models and HTML parsers")
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the shared Prometheus multiprocess directory
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
 # Logging
 accesslog = "-" # Log to stdout
 errorlog = "-"  # Log to stderr
@@ -0,0 +1,83 @@
+"""
+GET /api/library sync semantics, run against the local storage backend (no AWS needed):
+    pip install -r tests/requirements.txt && python -m pytest -q tests
+"""
+import os
+import tempfile
+
+# The backend reads its configuration at import time
+_work_dir = tempfile.mkdtemp(prefix="papercast-tests-")
+os.environ.update({
+    "STORAGE_BACKEND": "local",
+    "LOCAL_AUDIO_DIR": os.path.join(_work_dir, "audio"),
+    "SQLITE_PATH": os.path.join(_work_dir, "papercast.db"),
+    "SEARCH_INDEX_PATH": os.path.join(_work_dir, "search.db"),
+    "AUDIO_CACHE_DIR": os.path.join(_work_dir, "audio-cache"),
+    "AWS_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "S3_BUCKET_NAME": "papercast-tests",
+    "DYNAMODB_TABLE_NAME": "PapercastTests",
+    "COGNITO_USER_POOL_ID": "us-east-1_tests",
+    "COGNITO_CLIENT_ID": "tests",
+    "NEWS_API_KEY": "tests"
+})
+
+import pytest
+from fastapi.testclient import TestClient
+import backend.auth as auth
+import backend.main as main
+from backend.real_aws import RealAWSService
+
+USER = "alice"
+
+class _Verifier:
+    """Accepts the token "valid" as USER"""
+
+    def verify(self, token, verify_exp=True):
+        return {"cognito:username": USER} if token == "valid" else None
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth, "_verifier", _Verifier())
+    with TestClient(main.app) as test_client:
+        test_client.cookies.set("id_token", "valid")
+        yield test_client
+
+def test_first_sync_returns_legacy_records(client):
+    store = RealAWSService().metadata
+    # Saved before records carried updated_at / last_subscribed_at
+    store.update("legacy-1", {"status": "completed", "title": "Old story"}, USER)
+
+    body = client.get("/api/library").json()
+    legacy = [p for p in body["podcasts"] if p["id"] == "legacy-1"]
+    assert "legacy-1" in body["ids"]
+    assert len(legacy) == 1
+    assert legacy[0]["title"] == "Old story"
+    assert legacy[0]["changed_at"] == 0
+
+    # An incremental sync from the returned cursor has nothing new
+    again = client.get("/api/library", params={"since": body["cursor"]}).json()
+    assert again["podcasts"] == []
+    assert "legacy-1" in again["ids"]
+
+def test_incremental_sync_returns_changed_records(client):
+    cursor = client.get("/api/library").json()["cursor"]
+    RealAWSService().save_article_metadata("fresh-1", {"status": "completed", "title": "New story"}, user_id=USER)
+
+    body = client.get("/api/library", params={"since": cursor}).json()
+    assert [p["id"] for p in body["podcasts"]] == ["fresh-1"]
+    assert body["cursor"] > cursor
+
+def test_gzipped_library_has_weak_etag_that_revalidates(client):
+    for i in range(20):
+        RealAWSService().save_article_metadata(f"gzip-{i}", {"status": "completed", "title": f"Story number {i}"}, user_id=USER)
+
+    identity = client.get("/api/library", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/api/library", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert not identity.headers["etag"].startswith("W/")
+    assert compressed.headers["etag"] == "W/" + identity.headers["etag"]
+
+    revalidated = client.get("/api/library", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]})
+    assert revalidated.status_code == 304